@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Production output for converter and template builder artifacts
+
+The converters write prettified HTML and the template builders ``indent=2``
+JSON, which is convenient to read but is also what gets served and stored.
+In production mode ``write_artifact`` minifies HTML (including its inline
+CSS) and JSON, and writes ``.gz`` and ``.br`` siblings so the web tier can
+serve precompressed files. ``SizeReport`` collects the sizes of every
+artifact written for a per-file summary.
+"""
+
+import os
+import re
+import json
+import gzip
+
+from atomic_io import atomic_write
+
+# Elements whose text content is kept byte for byte
+RAW_TEXT_TAGS = ('pre', 'textarea', 'script')
+
+# Whitespace between two of these tags never renders, so it can be dropped
+BLOCK_TAGS = {
+    '!doctype', 'html', 'head', 'body', 'meta', 'link', 'title', 'style', 'script',
+    'div', 'section', 'header', 'footer', 'main', 'nav', 'article', 'aside',
+    'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'table', 'thead',
+    'tbody', 'tfoot', 'tr', 'td', 'th', 'caption', 'colgroup', 'col', 'br', 'hr',
+    'svg', 'g', 'rect', 'line', 'polyline', 'path', 'circle', 'defs', 'text',
+}
+
+_TOKEN = re.compile(r'(<!--.*?-->|<[^>]*>)', re.S)
+_TAG_NAME = re.compile(r'</?\s*([!A-Za-z][A-Za-z0-9-]*)')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css):
+    """Drop comments and insignificant whitespace from a stylesheet"""
+    css = _CSS_COMMENT.sub('', css)
+    css = ' '.join(css.split())
+    css = _CSS_SPACE.sub(r'\1', css)
+    # "color: red" -> "color:red"; spaces before ':' are kept because they
+    # are significant in selectors such as "div :first-child"
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _tag_name(tag):
+    match = _TAG_NAME.match(tag)
+    return match.group(1).lower() if match else ''
+
+
+def minify_html(html):
+    """
+    Minify an HTML document: comments are removed, whitespace is collapsed and
+    dropped between block-level tags, and ``<style>`` contents are minified.
+    """
+    tokens = _TOKEN.split(html)
+    out = []
+    raw = None
+    style = False
+    for index, token in enumerate(tokens):
+        if index % 2:
+            if token.startswith('<!--'):
+                continue
+            name = _tag_name(token)
+            closing = token.startswith('</')
+            if raw is not None:
+                if closing and name == raw:
+                    raw = None
+                out.append(token)
+                continue
+            if not closing and name in RAW_TEXT_TAGS:
+                raw = name
+            style = name == 'style' and not closing
+            out.append(' '.join(token.split()) if '\n' in token else token)
+            continue
+        if not token:
+            continue
+        if raw is not None:
+            out.append(token)
+        elif style:
+            out.append(minify_css(token))
+        else:
+            text = ' '.join(token.split())
+            if not text:
+                before = _tag_name(tokens[index - 1]) if index else ''
+                after = _tag_name(tokens[index + 1]) if index + 1 < len(tokens) else ''
+                if before in BLOCK_TAGS or after in BLOCK_TAGS or not before or not after:
+                    continue
+                text = ' '
+            else:
+                if token[0].isspace():
+                    text = ' ' + text
+                if token[-1].isspace():
+                    text += ' '
+            out.append(text)
+    return ''.join(out)
+
+
+def dumps_json(data, production=False):
+    """Serialize a template dict; production output is compact with minified ``html_template``"""
+    if not production:
+        return json.dumps(data, ensure_ascii=False, indent=2)
+    if isinstance(data.get('html_template'), str):
+        data = dict(data, html_template=minify_html(data['html_template']))
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+_warned_brotli = False
+
+
+def _brotli():
+    global _warned_brotli
+    try:
+        import brotli
+    except ImportError:
+        if not _warned_brotli:
+            print("⚠️  brotli is not installed; skipping .br output")
+            _warned_brotli = True
+        return None
+    return brotli
+
+
+class SizeReport:
+    """Original, written and precompressed sizes of the artifacts of one run"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, path, original, written, gz=None, br=None):
+        self.rows.append({'path': str(path), 'original': original, 'written': written, 'gz': gz, 'br': br})
+
+    def lines(self):
+        lines = []
+        for row in self.rows:
+            smallest = min(size for size in (row['written'], row['gz'], row['br']) if size is not None)
+            parts = [f"{row['written'] / 1024:.1f} KB minified"]
+            if row['gz'] is not None:
+                parts.append(f"{row['gz'] / 1024:.1f} KB gz")
+            if row['br'] is not None:
+                parts.append(f"{row['br'] / 1024:.1f} KB br")
+            saved = (1 - smallest / row['original']) * 100 if row['original'] else 0.0
+            lines.append(f"📦 {os.path.basename(row['path'])}: {row['original'] / 1024:.1f} KB -> "
+                         f"{', '.join(parts)} (-{saved:.0f}%)")
+        return lines
+
+    def print(self):
+        for line in self.lines():
+            print(line)
+
+
+def write_artifact(path, text, production=False, report=None, original_size=None):
+    """
+    Write ``text`` to ``path``; in production mode also write ``.gz`` and ``.br``.
+    Every file is replaced atomically, so concurrent readers never see a partial artifact.
+
+    ``original_size`` is the size the artifact would have had in the readable
+    format, for the report. Returns the list of files written.
+    """
+    if not production:
+        atomic_write(path, text)
+        # Precompressed siblings of an earlier production run would now be stale
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(f'{path}{suffix}'):
+                os.remove(f'{path}{suffix}')
+        return [str(path)]
+
+    data = text.encode('utf-8')
+    atomic_write(path, data)
+    written = [str(path)]
+
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    atomic_write(f'{path}.gz', gz_data)
+    written.append(f'{path}.gz')
+
+    brotli = _brotli()
+    br_size = None
+    if brotli is not None:
+        br_data = brotli.compress(data, quality=11)
+        atomic_write(f'{path}.br', br_data)
+        written.append(f'{path}.br')
+        br_size = len(br_data)
+
+    if report is not None:
+        report.add(path, original_size if original_size is not None else len(data), len(data),
+                   len(gz_data), br_size)
+    return written
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Atomic artifact writes and advisory locks
+
+Builders that read each other's artifacts (``extract_all_templates`` merges
+every ``{stem}_*.json`` the other builders write) must never see a half
+written file. ``atomic_write`` writes to a temporary file in the target
+directory and renames it into place, so readers see either the old or the
+new content; ``atomic_writer`` does the same for content written
+piecewise to a file object. ``advisory_lock`` serialises whole build steps across threads
+and processes with ``flock`` (``msvcrt.locking`` on Windows).
+"""
+
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Lock taken by template builders writing or merging the JSON artifacts of one deck
+TEMPLATE_LOCK_SUFFIX = '.templates.lock'
+
+
+def _umask():
+    """The process umask, read without changing it where /proc allows"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+@contextmanager
+def atomic_writer(path, mode='w'):
+    """
+    File object (``mode`` 'w' for UTF-8 text, 'wb' for bytes) whose content
+    replaces ``path`` atomically when the block exits without an exception.
+
+    The file gets the permissions a plain ``open(path, mode)`` would give it,
+    and text mode translates newlines as that ``open`` would.
+    """
+    path = os.fspath(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            yield f
+        os.chmod(tmp, 0o666 & ~_umask())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def atomic_write(path, data):
+    """Replace ``path`` with ``data`` (str, written as UTF-8 text, or bytes) atomically"""
+    with atomic_writer(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+    return os.fspath(path)
+
+
+@contextmanager
+def advisory_lock(lock_path, shared=False):
+    """
+    Hold an advisory lock on ``lock_path`` (created if missing) for the block.
+
+    Shared holders run together and exclude exclusive ones. Windows only has
+    exclusive locks, so ``shared`` is ignored there. The lock file is left in
+    place: removing it would let a waiting process lock an orphaned inode.
+    """
+    fd = os.open(os.fspath(lock_path), os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ten seconds; keep waiting
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def template_lock(pptx_file, shared=False):
+    """
+    Lock on the template JSON artifacts of ``pptx_file``: shared to write one,
+    exclusive to merge them. The variations of a deck may be written at the
+    same time, but not while they are merged.
+    """
+    return advisory_lock(os.path.splitext(os.fspath(pptx_file))[0] + TEMPLATE_LOCK_SUFFIX, shared)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Resumable, shardable batch conversion driven by a shared SQLite queue
+
+A full library re-import is split into one job per PPTX file in a SQLite
+database that every worker node opens (e.g. on a shared volume). A worker
+claims a job inside a ``BEGIN IMMEDIATE`` transaction, so two nodes can never
+claim the same file, and holds a lease on it that it renews while the job
+runs. The job row is the checkpoint: finished files are never converted
+again, and a job whose node died is reclaimed once its lease expires, so
+restarting any number of workers resumes exactly where the last run stopped.
+
+``--shard K/N`` restricts a worker to a stable 1/N slice of the files, for
+nodes that should split a library without competing for the same jobs.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from slide_isolation import errors_path
+
+TASKS = ('build', 'html', 'advanced')
+
+DEFAULT_LEASE = 600
+DEFAULT_MAX_ATTEMPTS = 3
+# A single slide taking longer than this is given up on, so it cannot hold a worker's lease
+SLIDE_TIMEOUT = 120
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    task TEXT NOT NULL,
+    path TEXT NOT NULL,
+    shard_key INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    node TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    started_at REAL,
+    finished_at REAL,
+    source_stamp TEXT,
+    outputs TEXT,
+    error TEXT,
+    PRIMARY KEY (task, path)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (task, status);
+'''
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+def run_task(task, path):
+    """
+    Run one job in a worker process; returns the list of written paths.
+    HTML jobs isolate slide failures: the deck is written with placeholders
+    and the error report is listed among the outputs.
+    """
+    if task == 'build':
+        from build_template import build_template
+        results = build_template(path)
+        results.pop('_metrics')
+        return [p for result in results.values() for p in result['outputs']]
+    if task == 'html':
+        from convert_ppt_to_html_v2 import convert_ppt_to_html
+        output = os.path.splitext(path)[0] + '.html'
+    else:
+        from convert_ppt_to_html_advanced import convert_ppt_to_html
+        output = os.path.splitext(path)[0] + '_advanced.html'
+    if not convert_ppt_to_html(path, output, isolate_slides=True, slide_timeout=SLIDE_TIMEOUT):
+        raise RuntimeError(f"conversion failed for {path}")
+    report = errors_path(output)
+    return [output, report] if os.path.exists(report) else [output]
+
+
+class WorkQueue:
+    """
+    Job table shared by every node of a batch.
+
+    The database uses SQLite's default rollback journal rather than WAL,
+    because WAL needs shared memory that network file systems do not provide.
+    """
+
+    def __init__(self, db_path, timeout=60.0):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def enqueue(self, paths, task='build'):
+        """
+        Add jobs for ``paths``. Existing jobs are kept, except that a finished
+        job whose source file changed since it ran is queued again.
+        Returns the number of jobs (re)queued.
+        """
+        queued = 0
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            for path in paths:
+                path = os.path.abspath(path)
+                stamp = _source_stamp(path)
+                shard_key = zlib.crc32(path.encode('utf-8'))
+                row = self._db.execute('SELECT status, source_stamp FROM jobs WHERE task = ? AND path = ?',
+                                       (task, path)).fetchone()
+                if row is None:
+                    self._db.execute('INSERT INTO jobs (task, path, shard_key, source_stamp) VALUES (?, ?, ?, ?)',
+                                     (task, path, shard_key, stamp))
+                    queued += 1
+                elif row['status'] == 'done' and row['source_stamp'] != stamp:
+                    self._db.execute("UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, "
+                                     "source_stamp = ? WHERE task = ? AND path = ?", (stamp, task, path))
+                    queued += 1
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return queued
+
+    def claim(self, node, task='build', lease=DEFAULT_LEASE, shard=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Atomically claim the next runnable job and return its path, or None.
+
+        Pending jobs come first; running jobs whose lease expired (their node
+        stopped renewing it) are reclaimed after them.
+        """
+        now = time.time()
+        where = ("task = ? AND attempts < ? AND (status = 'pending' OR "
+                 "(status = 'running' AND lease_until < ?))")
+        params = [task, max_attempts, now]
+        if shard is not None:
+            index, count = shard
+            where += ' AND shard_key % ? = ?'
+            params.extend((count, index))
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._db.execute(f"SELECT path FROM jobs WHERE {where} "
+                                   f"ORDER BY status = 'running', path LIMIT 1", params).fetchone()
+            if row is None:
+                self._db.execute('COMMIT')
+                return None
+            self._db.execute("UPDATE jobs SET status = 'running', node = ?, attempts = attempts + 1, "
+                             "lease_until = ?, started_at = ?, error = NULL WHERE task = ? AND path = ?",
+                             (node, now + lease, now, task, row['path']))
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return row['path']
+
+    def renew(self, node, paths, task='build', lease=DEFAULT_LEASE):
+        """Extend the leases this node holds on ``paths``"""
+        if not paths:
+            return
+        until = time.time() + lease
+        self._db.executemany("UPDATE jobs SET lease_until = ? WHERE task = ? AND path = ? AND node = ? "
+                             "AND status = 'running'", [(until, task, path, node) for path in paths])
+
+    def complete(self, node, path, outputs, task='build'):
+        self._db.execute("UPDATE jobs SET status = 'done', finished_at = ?, outputs = ?, lease_until = NULL "
+                         "WHERE task = ? AND path = ? AND node = ?",
+                         (time.time(), json.dumps(outputs, ensure_ascii=False), task, path, node))
+
+    def fail(self, node, path, error, task='build', max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Record a failure; the job is retried until it has used ``max_attempts``"""
+        self._db.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                         "error = ?, lease_until = NULL WHERE task = ? AND path = ? AND node = ?",
+                         (max_attempts, error, task, path, node))
+
+    def requeue(self, task='build', statuses=('failed',)):
+        marks = ', '.join('?' * len(statuses))
+        cursor = self._db.execute(f"UPDATE jobs SET status = 'pending', attempts = 0, error = NULL "
+                                  f"WHERE task = ? AND status IN ({marks})", (task, *statuses))
+        return cursor.rowcount
+
+    def counts(self, task='build'):
+        rows = self._db.execute('SELECT status, COUNT(*) AS n FROM jobs WHERE task = ? GROUP BY status', (task,))
+        return {row['status']: row['n'] for row in rows}
+
+    def failures(self, task='build'):
+        return self._db.execute("SELECT path, node, attempts, error FROM jobs WHERE task = ? AND status = 'failed' "
+                                "ORDER BY path", (task,)).fetchall()
+
+
+def work(db_path, task='build', node=None, workers=None, lease=DEFAULT_LEASE, shard=None,
+         max_attempts=DEFAULT_MAX_ATTEMPTS, run=run_task):
+    """
+    Claim and run jobs until the queue has nothing left for this node.
+
+    Up to ``workers`` jobs run at once in a process pool; their leases are
+    renewed every ``lease / 3`` seconds. Returns (done, failed) counts.
+    """
+    node = node or f'{socket.gethostname()}:{os.getpid()}'
+    workers = workers or os.cpu_count() or 1
+    queue = WorkQueue(db_path)
+    running = {}
+    done = failed = 0
+    next_renewal = time.monotonic() + lease / 3
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                while len(running) < workers:
+                    path = queue.claim(node, task, lease, shard, max_attempts)
+                    if path is None:
+                        break
+                    running[pool.submit(run, task, path)] = (path, time.perf_counter())
+                if not running:
+                    break
+                finished, _ = wait(running, timeout=max(next_renewal - time.monotonic(), 0.1),
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, started = running.pop(future)
+                    try:
+                        outputs = future.result()
+                    except Exception as e:
+                        queue.fail(node, path, f'{type(e).__name__}: {e}', task, max_attempts)
+                        failed += 1
+                        print(f"❌ {path}: {e}")
+                    else:
+                        queue.complete(node, path, outputs, task)
+                        done += 1
+                        print(f"✅ {os.path.basename(path)} in {(time.perf_counter() - started) * 1000:.0f} ms")
+                if time.monotonic() >= next_renewal:
+                    queue.renew(node, [path for path, _ in running.values()], task, lease)
+                    next_renewal = time.monotonic() + lease / 3
+    finally:
+        queue.close()
+    return done, failed
+
+
+def _parse_shard(value):
+    index, _, count = value.partition('/')
+    index, count = int(index), int(count)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError('shard must be K/N with 0 <= K < N')
+    return index, count
+
+
+def _find_sources(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith('.pptx') and not name.startswith(('~$', '.')):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumable batch conversion over a shared SQLite job queue')
+    parser.add_argument('queue', help='Queue database, e.g. /shared/import.sqlite')
+    parser.add_argument('--task', choices=TASKS, default='build',
+                        help='build: all template artifacts; html / advanced: one converter')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Add PPTX files (or directories of them) to the queue')
+    enqueue.add_argument('paths', nargs='+')
+
+    worker = commands.add_parser('work', help='Claim and run jobs until none are left')
+    worker.add_argument('--workers', type=int, default=None, help='Jobs run concurrently on this node')
+    worker.add_argument('--node', help='Node name recorded on claimed jobs (default: host:pid)')
+    worker.add_argument('--shard', type=_parse_shard, help='Only take jobs of shard K out of N, e.g. 0/4')
+    worker.add_argument('--lease', type=float, default=DEFAULT_LEASE,
+                        help='Seconds before a job of a dead node may be reclaimed')
+    worker.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    commands.add_parser('status', help='Show job counts and failures')
+    requeue = commands.add_parser('requeue', help='Queue failed jobs again')
+    requeue.add_argument('--running', action='store_true', help='Also requeue jobs marked running')
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        queue = WorkQueue(args.queue)
+        sources = list(_find_sources(args.paths))
+        missing = [path for path in sources if not os.path.isfile(path)]
+        if missing:
+            print(f"Error: PPTX file not found: {missing[0]}")
+            sys.exit(1)
+        print(f"📥 Queued {queue.enqueue(sources, args.task)} of {len(sources)} files")
+    elif args.command == 'work':
+        done, failed = work(args.queue, args.task, args.node, args.workers, args.lease, args.shard,
+                            args.max_attempts)
+        print(f"🏁 {done} done, {failed} failed on this node")
+    elif args.command == 'status':
+        queue = WorkQueue(args.queue)
+        counts = queue.counts(args.task)
+        print(' | '.join(f"{status}: {counts.get(status, 0)}" for status in ('pending', 'running', 'done', 'failed')))
+        for row in queue.failures(args.task):
+            print(f"❌ {row['path']} ({row['attempts']} attempts, last on {row['node']}): {row['error']}")
+    else:
+        queue = WorkQueue(args.queue)
+        statuses = ('failed', 'running') if args.running else ('failed',)
+        print(f"🔁 Requeued {queue.requeue(args.task, statuses)} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Build every template artifact of a PPTX file in one process
+
+The HTML converters and the JSON template builders are modelled as stages in
+a dependency graph. The deck is parsed at most once and shared by the stages
+that need it, independent stages run concurrently, and a stage whose inputs
+(source file, the code it imports, the files it reads and its upstream
+stages) are unchanged since the last build is skipped.
+"""
+
+import os
+import ast
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from atomic_io import advisory_lock, atomic_write
+from conversion_metrics import ConversionMetrics
+
+BUILD_STATE_SUFFIX = '.build.json'
+
+
+class Stage:
+    """
+    One node of the build graph.
+
+    ``run(ctx)`` returns the list of paths it wrote. ``module`` names the
+    script implementing the stage; its source and the sources of the local
+    modules it imports are part of the stage fingerprint, so editing a
+    builder or one of its helpers invalidates its artifacts. ``inputs(ctx)``
+    lists any other files the stage reads; it is called once the upstream
+    stages have run.
+    """
+
+    def __init__(self, name, run, deps=(), outputs=(), module=None, inputs=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.outputs = tuple(outputs)
+        self.module = module
+        self.inputs = inputs
+
+
+class BuildContext:
+    """
+    State shared by the stages of one build.
+
+    python-pptx and lxml objects are not safe to use from several threads at
+    once, so stages that walk the shared deck hold ``deck_lock`` while they do.
+    Stages that do not touch the deck still run concurrently.
+    """
+
+    def __init__(self, pptx_path, max_rss_mb=None, production=False, css_dir=None, css_url=None,
+                 backgrounds_dir=None, index_path=None):
+        self.pptx_path = os.path.abspath(str(pptx_path))
+        self.base = os.path.splitext(self.pptx_path)[0]
+        self.max_rss_mb = max_rss_mb
+        self.production = production
+        self.css_dir = css_dir
+        self.css_url = css_url
+        self.backgrounds_dir = backgrounds_dir
+        self.index_path = os.path.abspath(index_path) if index_path else os.path.join(
+            os.path.dirname(self.pptx_path), 'template_index.sqlite')
+        self.metrics = ConversionMetrics(os.path.basename(self.pptx_path))
+        self._deck = None
+        self._slot_config = None
+        self.deck_lock = threading.RLock()
+
+    @property
+    def deck(self):
+        """The parsed presentation, loaded on first use"""
+        with self.deck_lock:
+            if self._deck is None:
+                with self.metrics.stage('parse'):
+                    if self.max_rss_mb:
+                        from memory_budget import MemoryBudget, open_presentation
+                        self._deck = open_presentation(self.pptx_path, MemoryBudget(self.max_rss_mb))
+                    else:
+                        from pptx import Presentation
+                        self._deck = Presentation(self.pptx_path)
+            return self._deck
+
+    @property
+    def slot_config(self):
+        """Slot configuration of the deck, derived once and shared by the JSON builders"""
+        with self.deck_lock:
+            if self._slot_config is None:
+                from ppt_slot_config import deck_slot_config
+                self._slot_config = deck_slot_config(self.pptx_path, self.deck, self.metrics)
+            return self._slot_config
+
+
+def _run_html_v2(ctx):
+    from convert_ppt_to_html_v2 import convert_ppt_to_html
+    output = ctx.base + '.html'
+    with ctx.deck_lock:
+        converted = convert_ppt_to_html(ctx.pptx_path, output, max_rss_mb=ctx.max_rss_mb, prs=ctx.deck,
+                                        production=ctx.production, css_dir=ctx.css_dir,
+                                        css_url=ctx.css_url, backgrounds_dir=ctx.backgrounds_dir)
+    if not converted:
+        raise RuntimeError(f"HTML conversion failed for {ctx.pptx_path}")
+    return [output]
+
+
+def _run_html_advanced(ctx):
+    from convert_ppt_to_html_advanced import convert_ppt_to_html
+    output = ctx.base + '_advanced.html'
+    with ctx.deck_lock:
+        converted = convert_ppt_to_html(ctx.pptx_path, output, max_rss_mb=ctx.max_rss_mb, prs=ctx.deck,
+                                        production=ctx.production, css_dir=ctx.css_dir,
+                                        css_url=ctx.css_url, backgrounds_dir=ctx.backgrounds_dir)
+    if not converted:
+        raise RuntimeError(f"Advanced HTML conversion failed for {ctx.pptx_path}")
+    return [output]
+
+
+def _run_original_style(ctx):
+    from extract_ppt_style import create_template_from_ppt
+    return [create_template_from_ppt(ctx.pptx_path, production=ctx.production, css_dir=ctx.css_dir,
+                                     css_url=ctx.css_url, slot_config=ctx.slot_config)]
+
+
+def _run_fixed(ctx):
+    from fix_template_json import fix_json_template
+    return [fix_json_template(ctx.pptx_path, production=ctx.production, css_dir=ctx.css_dir,
+                              css_url=ctx.css_url, slot_config=ctx.slot_config)]
+
+
+def _run_all_styles(ctx):
+    from extract_all_templates import create_comprehensive_template
+    return [create_comprehensive_template(ctx.pptx_path, production=ctx.production, css_dir=ctx.css_dir,
+                                          css_url=ctx.css_url)]
+
+
+def _run_index(ctx):
+    from template_index import TemplateIndex
+    with TemplateIndex(ctx.index_path) as index, ctx.deck_lock:
+        index.index_deck(ctx.pptx_path, ctx.deck)
+    return [ctx.index_path]
+
+
+def _template_files(ctx):
+    """Every {stem}_*.json template the index reads"""
+    return sorted(glob.glob(glob.escape(ctx.base) + '_*.json'))
+
+
+def _variation_files(ctx):
+    """The {stem}_*.json files extract_all_templates merges"""
+    own = ctx.base + '_all_styles.json'
+    return sorted(path for path in glob.glob(glob.escape(ctx.base) + '_*.json') if path != own)
+
+
+def default_stages():
+    """The template build graph, in a valid topological order"""
+    return [
+        Stage('html_v2', _run_html_v2, outputs=('{base}.html',),
+              module='convert_ppt_to_html_v2.py'),
+        Stage('html_advanced', _run_html_advanced, outputs=('{base}_advanced.html',),
+              module='convert_ppt_to_html_advanced.py'),
+        Stage('original_style', _run_original_style, outputs=('{base}_original_style.json',),
+              module='extract_ppt_style.py'),
+        Stage('fixed', _run_fixed, outputs=('{base}_fixed.json',),
+              module='fix_template_json.py'),
+        # Aggregates every {stem}_*.json variation, so it runs after them
+        Stage('all_styles', _run_all_styles, deps=('original_style', 'fixed'),
+              outputs=('{base}_all_styles.json',), module='extract_all_templates.py',
+              inputs=_variation_files),
+        # The library search index, shared by every deck built into the same index
+        Stage('index', _run_index, deps=('original_style', 'fixed', 'all_styles'),
+              module='template_index.py', inputs=_template_files),
+    ]
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_imports(module, here):
+    """``module`` and every module next to it that it imports, directly or not"""
+    seen = []
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(here, name)
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.append(name)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] + '.py' for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0] + '.py')
+    return sorted(seen)
+
+
+def _check_graph(stages):
+    names = {stage.name for stage in stages}
+    seen = set()
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in names]
+        if missing:
+            raise ValueError(f"stage {stage.name} depends on unknown stage(s): {', '.join(missing)}")
+        if any(dep not in seen for dep in stage.deps):
+            raise ValueError(f"stage {stage.name} is listed before one of its dependencies")
+        seen.add(stage.name)
+
+
+def _load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def build_template(pptx_file, stages=None, only=None, force=False, jobs=None, max_rss_mb=None,
+                   production=False, css_dir=None, css_url=None, backgrounds_dir=None, index_path=None):
+    """
+    Build the template artifacts of ``pptx_file``.
+
+    ``only`` limits the build to the named stages and their dependencies.
+    ``production`` builds minified, precompressed artifacts; ``css_dir`` and
+    ``css_url`` link theme CSS as shared content-hashed files; ``backgrounds_dir``
+    renders layout backgrounds once as shared content-hashed SVG layers.
+    ``index_path`` is the search index the deck is added to (default:
+    ``template_index.sqlite`` next to the deck).
+    Returns a dict ``{stage name: {'status': 'built'|'skipped', 'outputs': [...],
+    'seconds': float}}``; the timings of the whole run are in ``result['_metrics']``.
+    """
+    stages = stages or default_stages()
+    _check_graph(stages)
+    by_name = {stage.name: stage for stage in stages}
+
+    if only:
+        wanted = set()
+        pending = list(only)
+        while pending:
+            name = pending.pop()
+            if name not in by_name:
+                raise ValueError(f"unknown stage: {name}")
+            if name not in wanted:
+                wanted.add(name)
+                pending.extend(by_name[name].deps)
+        stages = [stage for stage in stages if stage.name in wanted]
+
+    ctx = BuildContext(pptx_file, max_rss_mb=max_rss_mb, production=production,
+                       css_dir=os.path.abspath(css_dir) if css_dir else None, css_url=css_url,
+                       backgrounds_dir=os.path.abspath(backgrounds_dir) if backgrounds_dir else None,
+                       index_path=index_path)
+    state_path = ctx.base + BUILD_STATE_SUFFIX
+    # Another process building the same deck would race on the state file and outputs
+    with advisory_lock(state_path + '.lock'):
+        state = _load_state(state_path)
+        here = os.path.dirname(os.path.abspath(__file__))
+
+        with ctx.metrics.stage('fingerprint'):
+            source_digest = _file_digest(ctx.pptx_path)
+        file_digests = {}
+        fingerprints = {}
+
+        def digest(path):
+            if path not in file_digests:
+                file_digests[path] = _file_digest(path)
+            return file_digests[path]
+
+        def fingerprint(stage):
+            # Computed when the stage is scheduled, after its dependencies wrote their outputs
+            with ctx.metrics.stage('fingerprint'):
+                parts = [stage.name, source_digest, 'production' if ctx.production else 'readable',
+                         ctx.css_dir or '', ctx.css_url or '', ctx.backgrounds_dir or '', ctx.index_path]
+                if stage.module:
+                    for name in _local_imports(stage.module, here):
+                        parts.extend((name, digest(os.path.join(here, name))))
+                if stage.inputs:
+                    for path in stage.inputs(ctx):
+                        parts.extend((path, _file_digest(path)))
+                parts.extend(fingerprints[dep] for dep in stage.deps)
+                fingerprints[stage.name] = hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+        results = {}
+
+        def up_to_date(stage):
+            previous = state.get(stage.name)
+            if force or not previous or previous.get('fingerprint') != fingerprints[stage.name]:
+                return False
+            expected = [pattern.format(base=ctx.base) for pattern in stage.outputs]
+            return all(os.path.exists(path) for path in expected + previous.get('outputs', []))
+
+        def execute(stage):
+            start = time.perf_counter()
+            with ctx.metrics.stage(stage.name):
+                outputs = stage.run(ctx)
+            # Relative paths would be resolved against whatever directory the next build runs in
+            return [os.path.abspath(path) for path in outputs], time.perf_counter() - start
+
+        # Stage modules import python-pptx lazily; importing the package from
+        # several stage threads at once can deadlock on its circular imports
+        import pptx  # noqa: F401
+
+        remaining = list(stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while remaining or running:
+                for stage in list(remaining):
+                    if any(dep not in results for dep in stage.deps):
+                        continue
+                    remaining.remove(stage)
+                    fingerprint(stage)
+                    if up_to_date(stage):
+                        results[stage.name] = {'status': 'skipped', 'outputs': state[stage.name]['outputs'],
+                                               'seconds': 0.0}
+                        continue
+                    running[pool.submit(execute, stage)] = stage
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    outputs, seconds = future.result()
+                    results[stage.name] = {'status': 'built', 'outputs': outputs, 'seconds': seconds}
+                    state[stage.name] = {'fingerprint': fingerprints[stage.name], 'outputs': outputs}
+
+        atomic_write(state_path, json.dumps(state, ensure_ascii=False, indent=2))
+
+    ctx.metrics.finish()
+    results['_metrics'] = ctx.metrics
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build all template artifacts of a PPTX file')
+    parser.add_argument('pptx_file', help='e.g. business_blue_01.pptx')
+    parser.add_argument('--stage', action='append', dest='stages',
+                        help='Only build this stage (and its dependencies); may be repeated')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if nothing changed')
+    parser.add_argument('--jobs', type=int, default=None, help='Stages to run concurrently')
+    parser.add_argument('--max-rss-mb', type=float, help='Memory budget for parsing and converting the deck')
+    parser.add_argument('--production', action='store_true',
+                        help='Write minified artifacts plus precompressed .gz/.br files')
+    parser.add_argument('--css-dir', metavar='DIR', help='Link theme CSS as shared content-hashed files in DIR')
+    parser.add_argument('--css-url', metavar='URL', help='URL prefix of --css-dir (default: relative path)')
+    parser.add_argument('--backgrounds', metavar='DIR',
+                        help="Render each layout's background once as a shared content-hashed SVG in DIR")
+    parser.add_argument('--index', metavar='PATH',
+                        help='Search index to add the deck to (default: template_index.sqlite next to it)')
+    parser.add_argument('--metrics-json', metavar='PATH', help='Write stage timings to PATH')
+    args = parser.parse_args()
+
+    pptx_path = args.pptx_file
+    if not os.path.exists(pptx_path):
+        print(f"Error: PPTX file not found: {pptx_path}")
+        sys.exit(1)
+
+    if not pptx_path.lower().endswith('.pptx'):
+        print(f"Error: File is not a PPTX file: {pptx_path}")
+        sys.exit(1)
+
+    print(f"🏗️  Building template artifacts for {pptx_path}...")
+    try:
+        results = build_template(pptx_path, only=args.stages, force=args.force, jobs=args.jobs,
+                                 max_rss_mb=args.max_rss_mb, production=args.production,
+                                 css_dir=args.css_dir, css_url=args.css_url,
+                                 backgrounds_dir=args.backgrounds, index_path=args.index)
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    metrics = results.pop('_metrics')
+    for name, result in results.items():
+        if result['status'] == 'skipped':
+            print(f"⏭️  {name}: up to date")
+        else:
+            print(f"✅ {name}: built in {result['seconds'] * 1000:.1f} ms -> {', '.join(result['outputs'])}")
+    print(f"⏱️  Total: {metrics.total_seconds * 1000:.1f} ms")
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Stage timing and profiling instrumentation for conversion and template build runs
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from atomic_io import atomic_write, atomic_writer
+
+
+class ConversionMetrics:
+    """
+    Collect per-stage and per-slide wall-clock timings for one run.
+
+    Stages are accumulated, so a stage entered once per slide reports the total
+    time spent in it together with the number of times it was entered.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.stage_calls = {}
+        self.slides = []
+        self.counters = {}
+        self.extra = {}
+        self._started = time.perf_counter()
+        self._finished = None
+        # build_template records stages from several worker threads
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    @contextmanager
+    def slide(self, number):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.slides.append({'slide': number, 'seconds': time.perf_counter() - start})
+
+    def __getstate__(self):
+        # Sent back from slide rendering processes; the lock stays behind
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def merge(self, other):
+        """Add the stages, slides and counters recorded by ``other`` (e.g. in a worker process)"""
+        with self._lock:
+            for name, seconds in other.stages.items():
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + other.stage_calls[name]
+            for name, amount in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            self.slides.extend(other.slides)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self._finished = time.perf_counter()
+
+    @property
+    def total_seconds(self):
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def to_dict(self):
+        data = {
+            'name': self.name,
+            'total_seconds': round(self.total_seconds, 6),
+            'stages': {
+                name: {'seconds': round(seconds, 6), 'calls': self.stage_calls[name]}
+                for name, seconds in self.stages.items()
+            },
+            'slides': [
+                {'slide': item['slide'], 'seconds': round(item['seconds'], 6)} for item in self.slides
+            ],
+            'counters': dict(self.counters),
+        }
+        if self.slides:
+            durations = [item['seconds'] for item in self.slides]
+            slowest = max(self.slides, key=lambda item: item['seconds'])
+            data['slide_summary'] = {
+                'count': len(durations),
+                'mean_seconds': round(sum(durations) / len(durations), 6),
+                'max_seconds': round(slowest['seconds'], 6),
+                'slowest_slide': slowest['slide'],
+            }
+        max_rss_kb = peak_rss_kb()
+        if max_rss_kb is not None:
+            data['max_rss_kb'] = max_rss_kb
+        data.update(self.extra)
+        return data
+
+    def write_json(self, path):
+        atomic_write(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+        return path
+
+    def summary_lines(self):
+        lines = [f"⏱️  {self.name}: {self.total_seconds * 1000:.1f} ms total"]
+        for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1]):
+            lines.append(f"   • {name}: {seconds * 1000:.1f} ms ({self.stage_calls[name]} calls)")
+        if self.slides:
+            slowest = max(self.slides, key=lambda item: item['seconds'])
+            lines.append(f"   • slowest slide: {slowest['slide']} ({slowest['seconds'] * 1000:.1f} ms)")
+        return lines
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where unsupported"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB on Linux
+    if os.uname().sysname == 'Darwin':
+        usage //= 1024
+    return usage
+
+
+def profile_call(func, args=(), kwargs=None, profile_prefix=None, metrics=None, top=25):
+    """
+    Run ``func`` under cProfile and tracemalloc.
+
+    Writes ``{profile_prefix}.pstats`` and ``{profile_prefix}.memory.txt`` and,
+    when ``metrics`` is given, records the peak traced memory and top allocation
+    sites in it. Returns whatever ``func`` returns.
+    """
+    import cProfile
+    import marshal
+    import pstats
+    import tracemalloc
+
+    kwargs = kwargs or {}
+    profiler = cProfile.Profile()
+    tracemalloc.start(10)
+    try:
+        result = profiler.runcall(func, *args, **kwargs)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    top_stats = snapshot.statistics('lineno')[:top]
+    if profile_prefix:
+        with atomic_writer(f"{profile_prefix}.pstats", 'wb') as f:
+            # What Profile.dump_stats writes
+            profiler.create_stats()
+            marshal.dump(profiler.stats, f)
+        with atomic_writer(f"{profile_prefix}.memory.txt") as f:
+            f.write(f"peak traced memory: {peak} bytes\ncurrent traced memory: {current} bytes\n\n")
+            for stat in top_stats:
+                f.write(f"{stat}\n")
+        with atomic_writer(f"{profile_prefix}.profile.txt") as f:
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats('cumulative').print_stats(top)
+
+    if metrics is not None:
+        metrics.extra['peak_traced_memory_bytes'] = peak
+        metrics.extra['top_allocations'] = [
+            {'site': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in top_stats[:10]
+        ]
+        if profile_prefix:
+            metrics.extra['profile_files'] = [
+                f"{profile_prefix}.pstats", f"{profile_prefix}.memory.txt", f"{profile_prefix}.profile.txt"
+            ]
+    return result
+
+
+def add_instrumentation_arguments(parser):
+    """Add the shared --profile / --metrics-json options to an argparse parser"""
+    parser.add_argument('--profile', action='store_true',
+                        help='Dump cProfile stats and peak-memory snapshots next to the output')
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help='Write machine-readable stage and slide timings to PATH')
+
+
+def run_instrumented(func, args, kwargs, metrics, options, profile_prefix):
+    """Call ``func`` honouring --profile, then report and optionally save ``metrics``"""
+    if options.profile:
+        result = profile_call(func, args, kwargs, profile_prefix=profile_prefix, metrics=metrics)
+    else:
+        result = func(*args, **kwargs)
+    metrics.finish()
+    for line in metrics.summary_lines():
+        print(line)
+    if options.metrics_json:
+        metrics.write_json(options.metrics_json)
+        print(f"📈 Metrics written to: {options.metrics_json}")
+    if options.profile:
+        print(f"🔬 Profile written to: {profile_prefix}.pstats")
+    return result
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Long-lived conversion daemon and its thin client
+
+Every script invocation pays interpreter startup plus importing python-pptx,
+lxml and BeautifulSoup before any work starts, which is most of the runtime
+for small templates. ``serve`` imports the converters once and then answers
+requests on a local Unix socket, forking a child per request: the child
+starts with every module already loaded, a crash cannot take the daemon
+down, and requests run in parallel.
+
+The client side of this module only uses the standard library, so
+``convert_daemon.py html deck.pptx deck.html`` costs little more than
+interpreter startup:
+
+    python convert_daemon.py serve &
+    python convert_daemon.py html deck.pptx deck.html --production
+    python convert_daemon.py build deck.pptx
+    python convert_daemon.py stop
+
+Requests and responses are single JSON lines.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import signal
+import argparse
+import tempfile
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+
+# Converter keyword arguments a client may set
+CONVERT_OPTIONS = ('positioning', 'embed_fonts', 'font_cache_dir', 'production', 'fragments_dir',
+                   'css_dir', 'css_url', 'backgrounds_dir', 'share_structure', 'max_rss_mb',
+                   'derive_palette', 'palette_cache_dir', 'images_dir', 'image_format', 'image_density',
+                   'image_jobs', 'rich_text', 'isolate_slides', 'slide_timeout', 'slide_jobs')
+BUILD_OPTIONS = ('only', 'force', 'jobs', 'max_rss_mb', 'production', 'css_dir', 'css_url',
+                 'backgrounds_dir')
+
+REQUEST_READ_TIMEOUT = 10
+
+# Options holding paths, made absolute by the client because the daemon has its own cwd
+PATH_OPTIONS = ('font_cache_dir', 'fragments_dir', 'css_dir', 'backgrounds_dir', 'palette_cache_dir', 'images_dir')
+
+
+def default_socket_path():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f'ppt-convert-{os.getuid()}.sock')
+
+
+def _warm_up():
+    """Import everything a request may need, once, in the daemon process"""
+    import pptx  # noqa: F401
+    import bs4  # noqa: F401
+    import convert_ppt_to_html_v2  # noqa: F401
+    import convert_ppt_to_html_advanced  # noqa: F401
+    import build_template  # noqa: F401
+
+
+def handle_request(request):
+    """Run one request in the current process; returns the response dict"""
+    command = request.get('command')
+    options = request.get('options') or {}
+    if command == 'html':
+        from convert_ppt_to_html_v2 import convert_ppt_to_html
+    elif command == 'advanced':
+        from convert_ppt_to_html_advanced import convert_ppt_to_html
+    elif command == 'build':
+        from build_template import build_template
+        results = build_template(request['pptx_path'],
+                                 **{k: v for k, v in options.items() if k in BUILD_OPTIONS})
+        metrics = results.pop('_metrics')
+        return {'ok': True, 'result': results, 'seconds': metrics.total_seconds}
+    else:
+        return {'ok': False, 'error': f'unknown command: {command}'}
+    converted = convert_ppt_to_html(request['pptx_path'], request['output_path'],
+                                    **{k: v for k, v in options.items() if k in CONVERT_OPTIONS})
+    return {'ok': bool(converted), 'result': request['output_path'] if converted else None}
+
+
+def _respond(stream, response):
+    stream.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+    stream.flush()
+
+
+def _run_request(stream, request):
+    """Run ``request`` with its console output captured into the response"""
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            response = handle_request(request)
+    except Exception as e:
+        response = {'ok': False, 'error': f'{type(e).__name__}: {e}', 'traceback': traceback.format_exc()}
+    response['output'] = output.getvalue()
+    _respond(stream, response)
+
+
+def _reap_children(signum, frame):
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def serve(socket_path=None):
+    """Warm up and answer requests on ``socket_path`` until stopped"""
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        if ping(socket_path):
+            print(f"❌ A daemon is already listening on {socket_path}")
+            return False
+        os.remove(socket_path)
+
+    _warm_up()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        # Only this user may submit conversions
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    signal.signal(signal.SIGCHLD, _reap_children)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"🔥 Converters loaded; listening on {socket_path} (pid {os.getpid()})")
+    sys.stdout.flush()
+    try:
+        while True:
+            conn, _ = server.accept()
+            # A client that connects but never sends a request must not stall the daemon
+            conn.settimeout(REQUEST_READ_TIMEOUT)
+            stream = conn.makefile('rwb')
+            try:
+                payload = json.loads(stream.readline() or b'{}')
+                command = payload.get('command')
+                if command in ('ping', 'stop'):
+                    _respond(stream, {'ok': True})
+                    if command == 'stop':
+                        break
+                    continue
+                conn.settimeout(None)
+                if os.fork() == 0:
+                    server.close()
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    try:
+                        _run_request(stream, payload)
+                    finally:
+                        os._exit(0)
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"⚠️  Dropped a malformed request: {e}")
+            finally:
+                stream.close()
+                conn.close()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("👋 Daemon stopped")
+    return True
+
+
+def request(payload, socket_path=None, timeout=None):
+    """Send one request to the daemon and return its response dict"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path or default_socket_path())
+        client.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+        with client.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        return {'ok': False, 'error': 'daemon closed the connection without a response'}
+    return json.loads(line)
+
+
+def ping(socket_path=None):
+    try:
+        return request({'command': 'ping'}, socket_path, timeout=2).get('ok', False)
+    except OSError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep the PPTX converters warm and convert over a Unix socket')
+    parser.add_argument('--socket', help=f'Socket path (default: {default_socket_path()})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('serve', help='Run the daemon in the foreground')
+    commands.add_parser('stop', help='Stop a running daemon')
+    commands.add_parser('ping', help='Check whether a daemon is running')
+
+    for name, about in (('html', 'convert_ppt_to_html_v2'), ('advanced', 'convert_ppt_to_html_advanced')):
+        convert = commands.add_parser(name, help=f'Convert with {about}')
+        convert.add_argument('pptx_path')
+        convert.add_argument('output_path')
+        convert.add_argument('--absolute', action='store_true')
+        convert.add_argument('--share-structure', action='store_true')
+        convert.add_argument('--embed-fonts', action='store_true')
+        convert.add_argument('--font-cache', dest='font_cache_dir')
+        convert.add_argument('--fragments', dest='fragments_dir')
+        convert.add_argument('--backgrounds', dest='backgrounds_dir')
+        convert.add_argument('--rich-text', action='store_true')
+        convert.add_argument('--isolate-slides', action='store_true')
+        convert.add_argument('--slide-timeout', type=float)
+        convert.add_argument('--slide-jobs', type=int)
+        convert.add_argument('--images', dest='images_dir')
+        convert.add_argument('--image-format', choices=('webp', 'avif'))
+        convert.add_argument('--image-density', type=float)
+        convert.add_argument('--image-jobs', type=int)
+        convert.add_argument('--max-rss-mb', type=float)
+        convert.add_argument('--production', action='store_true')
+        convert.add_argument('--css-dir')
+        convert.add_argument('--css-url')
+        if name == 'advanced':
+            convert.add_argument('--palette', dest='derive_palette', action='store_true')
+            convert.add_argument('--palette-cache', dest='palette_cache_dir')
+
+    build = commands.add_parser('build', help='Build all template artifacts (build_template)')
+    build.add_argument('pptx_path')
+    build.add_argument('--stage', action='append', dest='only')
+    build.add_argument('--force', action='store_true')
+    build.add_argument('--jobs', type=int)
+    build.add_argument('--max-rss-mb', type=float)
+    build.add_argument('--production', action='store_true')
+    build.add_argument('--css-dir')
+    build.add_argument('--css-url')
+    build.add_argument('--backgrounds', dest='backgrounds_dir')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        sys.exit(0 if serve(args.socket) else 1)
+    if args.command == 'ping':
+        running = ping(args.socket)
+        print("✅ Daemon is running" if running else "❌ No daemon is running")
+        sys.exit(0 if running else 1)
+    if args.command == 'stop':
+        try:
+            request({'command': 'stop'}, args.socket, timeout=5)
+            print("👋 Daemon stopped")
+        except OSError:
+            print("❌ No daemon is running")
+            sys.exit(1)
+        return
+
+    options = {key: value for key, value in vars(args).items()
+               if key not in ('command', 'socket', 'pptx_path', 'output_path', 'absolute')
+               and value is not None and value is not False}
+    if getattr(args, 'absolute', False):
+        options['positioning'] = 'absolute'
+    for key in PATH_OPTIONS:
+        if key in options:
+            options[key] = os.path.abspath(options[key])
+    payload = {'command': args.command, 'pptx_path': os.path.abspath(args.pptx_path), 'options': options}
+    if args.command != 'build':
+        payload['output_path'] = os.path.abspath(args.output_path)
+
+    if not os.path.exists(args.pptx_path):
+        print(f"Error: PPTX file not found: {args.pptx_path}")
+        sys.exit(1)
+    try:
+        response = request(payload, args.socket)
+    except OSError as e:
+        print(f"❌ Cannot reach the daemon ({e}); start it with: {sys.argv[0]} serve")
+        sys.exit(1)
+
+    sys.stdout.write(response.get('output', ''))
+    if not response.get('ok'):
+        print(f"❌ {response.get('error', 'Conversion failed')}")
+        if response.get('traceback'):
+            print(response['traceback'])
+        sys.exit(1)
+    if args.command == 'build':
+        for name, result in response['result'].items():
+            print(f"{'⏭️ ' if result['status'] == 'skipped' else '✅'} {name}: {result['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,34 @@ Advanced PPT to HTML converter that creates business blue theme with proper styl
 
 import os
 import sys
+import argparse
 from pptx import Presentation
-from bs4 import BeautifulSoup
+from pptx.shapes.picture import Picture
 
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from artifact_output import SizeReport, minify_html, write_artifact
+from conversion_metrics import ConversionMetrics, add_instrumentation_arguments, run_instrumented
+from memory_budget import MemoryBudget, MemoryBudgetExceeded, PackageMedia, open_presentation
+from layout_backgrounds import LAYERED_CSS, deck_background_layers, layer_class, layer_css
+from ppt_fonts import deck_font_css
+from ppt_images import IMAGE_CSS, DeckImages, picture_html, resolve_pictures
+from ppt_rich_text import (RICH_TEXT_CSS, RichText, RunStyles, inline_html, paragraph_lines,
+                           read_shape_text)
+from ppt_palette import deck_palette, styles_css, themed_styles
+from ppt_shape_walker import POSITIONED_CSS, box_style, iter_leaf_shapes, to_canvas
+from ppt_tables_charts import (TABLE_CHART_CSS, extract_chart, extract_table, render_chart_svg,
+                               render_table_html)
+from slide_fragments import write_fragments
+from parallel_slides import render_parallel, render_slides, slide_workers
+from slide_isolation import FAILED_SLIDE_CSS, SlideIsolation
+from slide_structure import SharedStructures, structure_signature
+from theme_stylesheets import stylesheet_markup
+
+# Pixel size of the generated .slide elements
+CANVAS = (1280, 720)
+
 def get_business_blue_styles():
     """
     Get business blue theme styles
@@ -58,15 +80,185 @@ def get_business_blue_styles():
         }
     }
 
-def convert_ppt_to_html(ppt_path, output_html_path):
+def _walk_slide(slide, slide_size, run_styles=None, checkpoint=None):
+    """
+    Collect the text, picture, table and chart shapes of a slide in document order,
+    including shapes nested in groups, each with its box on the canvas.
+    With ``run_styles`` text is read as RichText with interned run formats.
+    ``checkpoint`` is called before each shape (to enforce a time limit).
+    """
+    items = []
+    for shape, box in iter_leaf_shapes(slide.shapes):
+        if checkpoint is not None:
+            checkpoint()
+        box = to_canvas(box, *slide_size, canvas=CANVAS)
+        if shape.has_table:
+            table = extract_table(shape)
+            if table is not None:
+                items.append(('table', table, box))
+            continue
+        if shape.has_chart:
+            chart = extract_chart(shape)
+            if chart is not None:
+                chart['width'] = max(int(box[2]), 1)
+                chart['height'] = max(int(box[3]), 1)
+                items.append(('chart', chart, box))
+            continue
+        if isinstance(shape, Picture):
+            items.append(('picture', shape, box))
+            continue
+        if shape.has_text_frame:
+            text = read_shape_text(shape, run_styles).strip()
+            if text:
+                items.append(('text', text, box))
+    return items
+
+def _classify_item(kind, text):
+    """
+    Decide which themed box a walked shape goes into:
+    'title' | 'subtitle' | 'content' | 'info' | 'picture'
+    """
+    if kind in ('picture', 'table', 'chart'):
+        return kind
+    lines = text.split('\n')
+    
+    # Check if this is a title
+    if any(keyword in text for keyword in ['标题', 'TITLE', 'title']):
+        return 'title'
+    elif any(keyword in text for keyword in ['subtitle', 'SUBTITLE']):
+        return 'subtitle'
+    elif len(lines) == 1 and len(lines[0]) < 30:
+        # Likely a title
+        return 'title'
+    elif len(text) > 100:
+        # Long content
+        return 'content'
+    # Info text
+    return 'info'
+
+def _render_block(block_type, content, html_parts, box=None):
+    """
+    Append the HTML for one classified shape; ``box`` places it absolutely
+    """
+    style = box_style(box) if box is not None else ''
+    rich = isinstance(content, RichText)
+    if rich and block_type in ('title', 'subtitle'):
+        tag = 'h1' if block_type == 'title' else 'h2'
+        html_parts.append(f'            <div class="{block_type}-box"{style}>')
+        html_parts.append(f'                <{tag}>{inline_html(content)}</{tag}>')
+        html_parts.append('            </div>')
+    elif rich and block_type in ('content', 'info'):
+        html_parts.append(f'            <div class="{block_type}-box"{style}>')
+        html_parts.extend(paragraph_lines(content))
+        html_parts.append('            </div>')
+    elif block_type == 'title':
+        html_parts.append(f'            <div class="title-box"{style}>')
+        html_parts.append(f'                <h1>{content}</h1>')
+        html_parts.append('            </div>')
+    elif block_type == 'subtitle':
+        html_parts.append(f'            <div class="subtitle-box"{style}>')
+        html_parts.append(f'                <h2>{content}</h2>')
+        html_parts.append('            </div>')
+    elif block_type == 'content':
+        html_parts.append(f'            <div class="content-box"{style}>')
+        for line in content.split('\n'):
+            line = line.strip()
+            if line:
+                html_parts.append(f'                <p>{line}</p>')
+        html_parts.append('            </div>')
+    elif block_type == 'info':
+        html_parts.append(f'            <div class="info-box"{style}>')
+        html_parts.append(f'                <p>{content}</p>')
+        html_parts.append('            </div>')
+    elif block_type == 'table':
+        html_parts.append(f'            <div class="content-box"{style}>')
+        html_parts.append(render_table_html(content))
+        html_parts.append('            </div>')
+    elif block_type == 'chart':
+        html_parts.append(f'            <div class="content-box"{style}>')
+        html_parts.append('                ' + render_chart_svg(content, content['width'], content['height']))
+        html_parts.append('            </div>')
+    elif block_type == 'picture' and content is not None:
+        html_parts.append(picture_html(content, style))
+    elif block_type == 'picture':
+        # Image shape
+        html_parts.append(f'            <div class="placeholder"{style}>')
+        html_parts.append('                [Image: Please add image here]')
+        html_parts.append('            </div>')
+
+def _render_slide(slide, slide_size, metrics, run_styles=None, images=None, checkpoint=None,
+                  inline_boxes=False):
+    """
+    Walk, classify and render the blocks of one slide: returns the structure
+    signature of its blocks and their markup; ``inline_boxes`` places blocks by inline style
+    """
+    with metrics.stage('shape_walk'):
+        items = _walk_slide(slide, slide_size, run_styles, checkpoint)
+    with metrics.stage('classification'):
+        blocks = resolve_pictures([(_classify_item(kind, content), content, box)
+                                   for kind, content, box in items], images)
+    parts = []
+    with metrics.stage('serialization'):
+        for block_type, content, box in blocks:
+            _render_block(block_type, content, parts, box if inline_boxes else None)
+    metrics.count('shapes', len(items))
+    return structure_signature(blocks), parts
+
+def convert_ppt_to_html(ppt_path, output_html_path, metrics=None, max_rss_mb=None, prs=None,
+                        positioning='flow', embed_fonts=False, font_cache_dir=None, production=False,
+                        fragments_dir=None, css_dir=None, css_url=None, backgrounds_dir=None,
+                        share_structure=False, derive_palette=False, palette_cache_dir=None, images_dir=None,
+                        image_format='webp', image_density=1.0, image_jobs=None, rich_text=False,
+                        isolate_slides=False, slide_timeout=None, slide_jobs=None):
     """
     Convert PPT file to HTML format with business blue theme
+
+    Stage and per-slide timings are recorded in ``metrics`` (a ConversionMetrics).
+    With ``max_rss_mb`` set, media parts are never read and the conversion
+    fails fast once the process would grow past that many megabytes.
+    An already parsed ``prs`` can be passed in to skip loading the file.
+    ``positioning='absolute'`` places every block at its position on the slide
+    (shapes inside groups included) instead of stacking blocks in a column.
+    ``embed_fonts`` replaces the Arial default with the deck's own fonts,
+    subsetted to the characters the deck uses and cached in ``font_cache_dir``
+    (default: ``fonts/`` next to the HTML).
+    ``production`` writes minified HTML with ``.gz``/``.br`` siblings instead
+    of prettified HTML, and prints the size reduction.
+    ``fragments_dir`` additionally splits the deck into a CSS bundle, one
+    fragment per slide and a manifest there, for clients that load slides lazily.
+    ``css_dir`` publishes the theme CSS as a content-hashed file shared by all
+    decks and links it (under ``css_url`` if given); only deck CSS stays inline.
+    ``backgrounds_dir`` renders each layout's inherited background once into a
+    content-hashed SVG there; slides reference it instead of a themed background.
+    ``share_structure`` (with absolute positioning) places the blocks of slides
+    with identical structure through one shared CSS class instead of inline styles.
+    ``images_dir`` exports pictures there, resampled to their displayed size
+    (times ``image_density``) as ``image_format`` with a JPEG/PNG fallback,
+    encoded by up to ``image_jobs`` processes; without it pictures stay placeholders.
+    ``rich_text`` keeps run formatting (bold, italic, size, colour) and bullet
+    levels, with identical run formats sharing one CSS class.
+    ``isolate_slides`` converts every slide it can: a slide that raises, or runs
+    longer than ``slide_timeout`` seconds (which implies isolation), becomes a
+    marked placeholder and its error is written to ``<output>.errors.json``.
+    ``slide_jobs`` renders the slides in that many processes (0: one per CPU),
+    each opening the deck once from shared memory; not combined with ``max_rss_mb``.
+    ``derive_palette`` recolours the theme boxes with the palette of the deck's
+    own images; per-image palettes are cached in ``palette_cache_dir``
+    (default: ``palettes/`` next to the HTML).
     """
+    if metrics is None:
+        metrics = ConversionMetrics(os.path.basename(ppt_path))
+    budget = MemoryBudget(max_rss_mb) if max_rss_mb else None
     try:
         print(f"📁 Converting PPT to HTML with business blue theme: {ppt_path}")
         
         # Load presentation
-        prs = Presentation(ppt_path)
+        if prs is None:
+            with metrics.stage('load'):
+                if budget is not None:
+                    prs = open_presentation(ppt_path, budget)
+                else:
+                    prs = Presentation(ppt_path)
         print(f"📊 Found {len(prs.slides)} slides")
         
         # Get business blue styles
@@ -74,10 +266,13 @@ def convert_ppt_to_html(ppt_path, output_html_path):
         
         # Prepare HTML structure
         html_parts = []
-        html_parts.append('<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n    <meta charset="UTF-8">\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n    <title>Business Blue PPT Template</title>\n    <style>')
+        html_parts.append('<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n    <meta charset="UTF-8">\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n    <title>Business Blue PPT Template</title>')
+        # Theme CSS is the same for every deck; deck CSS depends on this deck
+        theme_css = []
+        deck_css = []
         
         # Add base styles with business blue theme
-        html_parts.append('''
+        theme_css.append('''
         * {
             margin: 0;
             padding: 0;
@@ -211,91 +406,138 @@ def convert_ppt_to_html(ppt_path, output_html_path):
         }
         ''')
         
-        html_parts.append('</style>\n</head>\n<body>')
+        theme_css.append(TABLE_CHART_CSS)
+        theme_css.append(POSITIONED_CSS)
+        layers = None
+        if backgrounds_dir:
+            with metrics.stage('backgrounds'):
+                layers = deck_background_layers(prs, backgrounds_dir, metrics)
+            theme_css.append(LAYERED_CSS)
+            deck_css.append(layer_css(layers, output_html_path))
+        images = None
+        if images_dir:
+            # Under a budget the media was not loaded; exported pictures are read back one at a time
+            media = PackageMedia(ppt_path, budget) if budget is not None else None
+            images = DeckImages(images_dir, output_html_path, image_density, image_format, media)
+            theme_css.append(IMAGE_CSS)
+        isolation = SlideIsolation(isolate_slides or slide_timeout is not None, slide_timeout,
+                                   passthrough=(MemoryBudgetExceeded,))
+        if isolation.enabled:
+            theme_css.append(FAILED_SLIDE_CSS)
+        run_styles = None
+        if rich_text:
+            run_styles = RunStyles(CANVAS[0] * 12700 / prs.slide_width)
+            theme_css.append(RICH_TEXT_CSS)
+        if embed_fonts:
+            with metrics.stage('fonts'):
+                deck_css.append(deck_font_css(prs, output_html_path, font_cache_dir, metrics=metrics))
+        if derive_palette:
+            with metrics.stage('palette'):
+                cache_dir = palette_cache_dir or os.path.join(os.path.dirname(os.path.abspath(output_html_path)),
+                                                              'palettes')
+                palette = deck_palette(prs, cache_dir, metrics=metrics)
+            if palette:
+                styles = themed_styles(palette, styles)
+                deck_css.append(styles_css(styles))
+                print(f"🎨 Theme recoloured from the deck's images: dominant {palette['dominant'] or '-'}, "
+                      f"accent {palette['accent'] or '-'}")
+            else:
+                print("🎨 No usable images to derive a palette from; keeping the business blue theme")
+        
+        # Filled in after the slides, once every shared structure is known
+        stylesheet_index = len(html_parts)
+        html_parts.append('')
+        html_parts.append('\n</head>\n<body>')
         
         # Process each slide
-        for i, slide in enumerate(prs.slides):
-            print(f"📄 Processing slide {i+1}")
-            
+        slide_size = (prs.slide_width, prs.slide_height)
+        absolute = positioning == 'absolute'
+        slide_class = 'slide positioned' if absolute else 'slide'
+        structures = SharedStructures() if absolute and share_structure else None
+        inline_boxes = absolute and structures is None
+        slide_options = {'slide_size': slide_size, 'inline_boxes': inline_boxes}
+        workers = slide_workers(slide_jobs, len(prs.slides)) if slide_jobs is not None else 1
+        if workers > 1 and budget is not None:
+            print("⚠️  Rendering slides in one process to stay within the memory budget")
+            workers = 1
+        if workers > 1:
+            print(f"🧵 Rendering {len(prs.slides)} slides in {workers} processes")
+            rendered = render_parallel(ppt_path, prs.slides, _render_slide, slide_options, slide_class,
+                                       metrics, isolation, workers, run_styles, images)
+        else:
+            rendered = render_slides(prs, _render_slide, slide_options, slide_class, metrics, isolation,
+                                     run_styles, images, budget)
+        for i, (signature, parts) in enumerate(rendered):
+            if signature is None:
+                # The slide failed; its placeholder stands in for it
+                html_parts.extend(parts)
+                continue
             # Start slide
-            html_parts.append(f'\n    <div class="slide" id="slide-{i+1}">\n        <div class="slide-content">')
-            
-            # Process shapes in slide
-            for shape in slide.shapes:
-                if hasattr(shape, 'text_frame') and shape.text_frame.text:
-                    text = shape.text_frame.text.strip()
-                    lines = text.split('\n')
-                    
-                    # Skip empty shapes
-                    if not text:
-                        continue
-                    
-                    # Determine shape type
-                    is_title = False
-                    is_subtitle = False
-                    is_content = False
-                    is_info = False
-                    
-                    # Check if this is a title
-                    if any(keyword in text for keyword in ['标题', 'TITLE', 'title']):
-                        is_title = True
-                    elif any(keyword in text for keyword in ['subtitle', 'SUBTITLE']):
-                        is_subtitle = True
-                    elif len(lines) == 1 and len(lines[0]) < 30:
-                        # Likely a title
-                        is_title = True
-                    elif len(text) > 100:
-                        # Long content
-                        is_content = True
-                    else:
-                        # Info text
-                        is_info = True
-                    
-                    # Add appropriate box
-                    if is_title:
-                        html_parts.append('            <div class="title-box">')
-                        html_parts.append(f'                <h1>{text}</h1>')
-                        html_parts.append('            </div>')
-                    elif is_subtitle:
-                        html_parts.append('            <div class="subtitle-box">')
-                        html_parts.append(f'                <h2>{text}</h2>')
-                        html_parts.append('            </div>')
-                    elif is_content:
-                        html_parts.append('            <div class="content-box">')
-                        for line in lines:
-                            line = line.strip()
-                            if line:
-                                html_parts.append(f'                <p>{line}</p>')
-                        html_parts.append('            </div>')
-                    else:
-                        html_parts.append('            <div class="info-box">')
-                        html_parts.append(f'                <p>{text}</p>')
-                        html_parts.append('            </div>')
-                elif hasattr(shape, 'picture'):
-                    # Image shape
-                    html_parts.append('            <div class="placeholder">')
-                    html_parts.append('                [Image: Please add image here]')
-                    html_parts.append('            </div>')
-            
+            classes = f'{slide_class} layered {layer_class(layers[i])}' if layers else slide_class
+            if structures is not None:
+                classes += ' ' + structures.class_for_signature(signature)
+            html_parts.append(f'\n    <div class="{classes}" id="slide-{i+1}">\n        <div class="slide-content">')
+            html_parts.extend(parts)
             html_parts.append('        </div>\n    </div>')
         
         html_parts.append('\n</body>\n</html>')
+        if images is not None:
+            with metrics.stage('images'):
+                images.run(image_jobs, metrics)
+        if run_styles is not None:
+            deck_css.append(run_styles.css())
+            metrics.count('run_styles', len(run_styles))
+        if structures is not None:
+            deck_css.append(structures.css())
+            metrics.count('structures', len(structures))
+        with metrics.stage('stylesheets'):
+            html_parts[stylesheet_index] = stylesheet_markup(theme_css, deck_css, css_dir, output_html_path,
+                                                             css_url, production)
         
         # Write HTML file
-        html_content = ''.join(html_parts)
+        with metrics.stage('serialization'):
+            html_content = ''.join(html_parts)
         
         # Clean up HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        clean_html = soup.prettify()
+        report = SizeReport() if production else None
+        if production:
+            with metrics.stage('minify'):
+                clean_html = minify_html(html_content)
+        else:
+            if budget is not None:
+                # The parse tree is roughly an order of magnitude larger than the markup
+                budget.reserve(len(html_content) * 10, "before prettify")
+            with metrics.stage('prettify'):
+                # Only prettified output needs BeautifulSoup; production runs never import it
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(html_content, 'html.parser')
+                clean_html = soup.prettify()
         
-        with open(output_html_path, 'w', encoding='utf-8') as f:
-            f.write(clean_html)
+        with metrics.stage('write'):
+            write_artifact(output_html_path, clean_html, production, report,
+                           original_size=len(html_content.encode('utf-8')))
+        if fragments_dir:
+            with metrics.stage('fragments'):
+                manifest = write_fragments(clean_html, fragments_dir, output_html_path, production, report)
+            print(f"🧩 {len(manifest['slides'])} slide fragments written to {fragments_dir}")
+        metrics.count('slides', len(prs.slides))
+        report_path = isolation.write_report(output_html_path, os.path.basename(ppt_path), len(prs.slides))
+        if report_path:
+            metrics.count('failed_slides', len(isolation.errors))
+            print(f"⚠️  {len(isolation.errors)} of {len(prs.slides)} slides failed; errors written to {report_path}")
+        if budget is not None:
+            metrics.extra['budget_peak_rss_mb'] = round(budget.peak_rss_bytes / 1048576, 1)
         
         print(f"✅ Advanced HTML file created: {output_html_path}")
+        if report is not None:
+            report.print()
         print(f"📋 First slide preview available at: {output_html_path}#slide-1")
         
         return True
         
+    except MemoryBudgetExceeded as e:
+        print(f"❌ Conversion aborted: {e}")
+        return False
     except Exception as e:
         print(f"❌ Error converting PPT to HTML: {e}")
         import traceback
@@ -306,15 +548,87 @@ def main():
     """
     Main function
     """
-    ppt_path = "e:\\workandstudy\\LandPPT-master\\src\\ppt\\business_blue_01.pptx"
-    output_html_path = "e:\\workandstudy\\LandPPT-master\\src\\ppt\\business_blue_01_advanced.html"
+    parser = argparse.ArgumentParser(description='Convert a PPTX file to business blue themed HTML')
+    parser.add_argument('ppt_path', nargs='?',
+                        default="e:\\workandstudy\\LandPPT-master\\src\\ppt\\business_blue_01.pptx")
+    parser.add_argument('output_html_path', nargs='?',
+                        default="e:\\workandstudy\\LandPPT-master\\src\\ppt\\business_blue_01_advanced.html")
+    parser.add_argument('--max-rss-mb', type=float,
+                        help='Skip reading media parts and abort if the process RSS would exceed this many MB')
+    parser.add_argument('--absolute', action='store_true',
+                        help='Place blocks at their slide positions instead of stacking them')
+    parser.add_argument('--embed-fonts', action='store_true',
+                        help="Embed the deck's fonts as WOFF2 subsets instead of using Arial")
+    parser.add_argument('--font-cache', metavar='DIR',
+                        help='Directory for cached font subsets (default: fonts/ next to the HTML)')
+    parser.add_argument('--production', action='store_true',
+                        help='Write minified HTML plus precompressed .gz/.br files')
+    parser.add_argument('--fragments', metavar='DIR',
+                        help='Also write per-slide fragments and a manifest to DIR')
+    parser.add_argument('--css-dir', metavar='DIR',
+                        help='Link the theme CSS as a shared content-hashed file in DIR instead of inlining it')
+    parser.add_argument('--css-url', metavar='URL',
+                        help='URL prefix of --css-dir in the served HTML (default: relative path)')
+    parser.add_argument('--share-structure', action='store_true',
+                        help='With --absolute, position identically laid-out slides through shared CSS classes')
+    parser.add_argument('--backgrounds', metavar='DIR',
+                        help="Render each layout's background once as a shared content-hashed SVG in DIR")
+    parser.add_argument('--images', metavar='DIR',
+                        help='Export pictures to DIR, resampled to their displayed size')
+    parser.add_argument('--image-format', choices=('webp', 'avif'), default='webp',
+                        help='Format of exported pictures; a JPEG/PNG fallback is always written (default: webp)')
+    parser.add_argument('--image-density', type=float, default=1.0,
+                        help='Exported pixels per displayed CSS pixel, e.g. 2 for high-DPI screens (default: 1)')
+    parser.add_argument('--image-jobs', type=int,
+                        help='Processes encoding pictures (default: one per CPU)')
+    parser.add_argument('--rich-text', action='store_true',
+                        help='Keep run formatting and bullet levels instead of plain paragraphs')
+    parser.add_argument('--isolate-slides', action='store_true',
+                        help='Replace slides that fail to convert by placeholders instead of failing the deck')
+    parser.add_argument('--slide-timeout', type=float, metavar='SECONDS',
+                        help='Give up on a slide after this long (implies --isolate-slides)')
+    parser.add_argument('--slide-jobs', type=int, metavar='N',
+                        help='Render slides in N processes (0: one per CPU) instead of one after another')
+    parser.add_argument('--palette', action='store_true',
+                        help="Recolour the theme with the dominant and accent colours of the deck's images")
+    parser.add_argument('--palette-cache', metavar='DIR',
+                        help='Directory for cached per-image palettes (default: palettes/ next to the HTML)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    ppt_path = args.ppt_path
+    output_html_path = args.output_html_path
     
     print("🚀 Starting Advanced PPT to HTML conversion...")
     print(f"📁 Input PPT: {ppt_path}")
     print(f"📄 Output HTML: {output_html_path}")
     print("=" * 60)
     
-    success = convert_ppt_to_html(ppt_path, output_html_path)
+    metrics = ConversionMetrics(os.path.basename(ppt_path))
+    options = {
+        'metrics': metrics,
+        'max_rss_mb': args.max_rss_mb,
+        'positioning': 'absolute' if args.absolute else 'flow',
+        'embed_fonts': args.embed_fonts,
+        'font_cache_dir': args.font_cache,
+        'production': args.production,
+        'fragments_dir': args.fragments,
+        'css_dir': args.css_dir,
+        'css_url': args.css_url,
+        'backgrounds_dir': args.backgrounds,
+        'share_structure': args.share_structure,
+        'images_dir': args.images,
+        'image_format': args.image_format,
+        'image_density': args.image_density,
+        'image_jobs': args.image_jobs,
+        'rich_text': args.rich_text,
+        'isolate_slides': args.isolate_slides,
+        'slide_timeout': args.slide_timeout,
+        'slide_jobs': args.slide_jobs,
+        'derive_palette': args.palette,
+        'palette_cache_dir': args.palette_cache,
+    }
+    success = run_instrumented(convert_ppt_to_html, (ppt_path, output_html_path), options,
+                               metrics, args, os.path.splitext(output_html_path)[0])
     
     if success:
         print("\n🎉 Conversion completed successfully!")
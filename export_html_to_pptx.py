@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Stream converted HTML slides back out as a PPTX package.
+
+The OOXML parts are written straight into a zip file instead of going through
+python-pptx ``Presentation`` objects: the theme, slide master and slide layout
+are written once, every ``div.slide`` is turned into slide XML as soon as the
+HTML parser has seen its closing tag, and media files are copied into the
+archive in chunks. Memory use therefore stays bounded by one slide no matter
+how long the deck is.
+"""
+
+import os
+import sys
+import base64
+import shutil
+import zipfile
+import argparse
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from xml.sax.saxutils import escape, quoteattr
+
+# 1 CSS pixel at 96 DPI in English Metric Units; 1280x720 px is the 13.333in x 7.5in slide
+EMU_PER_PX = 9525
+
+NS_A = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_P = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+NS_RELS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+NS_CT = 'http://schemas.openxmlformats.org/package/2006/content-types'
+
+RT_OFFICE_DOC = NS_R + '/officeDocument'
+RT_SLIDE = NS_R + '/slide'
+RT_SLIDE_LAYOUT = NS_R + '/slideLayout'
+RT_SLIDE_MASTER = NS_R + '/slideMaster'
+RT_THEME = NS_R + '/theme'
+RT_IMAGE = NS_R + '/image'
+RT_PRES_PROPS = NS_R + '/presProps'
+RT_VIEW_PROPS = NS_R + '/viewProps'
+RT_TABLE_STYLES = NS_R + '/tableStyles'
+RT_EXTENDED_PROPS = NS_R + '/extended-properties'
+RT_CORE_PROPS = 'http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties'
+
+CT_PRESENTATION = 'application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml'
+CT_SLIDE = 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'
+CT_SLIDE_LAYOUT = 'application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml'
+CT_SLIDE_MASTER = 'application/vnd.openxmlformats-officedocument.presentationml.slideMaster+xml'
+CT_THEME = 'application/vnd.openxmlformats-officedocument.theme+xml'
+CT_PRES_PROPS = 'application/vnd.openxmlformats-officedocument.presentationml.presProps+xml'
+CT_VIEW_PROPS = 'application/vnd.openxmlformats-officedocument.presentationml.viewProps+xml'
+CT_TABLE_STYLES = 'application/vnd.openxmlformats-officedocument.presentationml.tableStyles+xml'
+CT_CORE_PROPS = 'application/vnd.openxmlformats-package.core-properties+xml'
+CT_EXTENDED_PROPS = 'application/vnd.openxmlformats-officedocument.extended-properties+xml'
+
+IMAGE_CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'jpg': 'image/jpeg',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+}
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Font size (pt), bold, alignment and bullet per HTML text element
+TEXT_ELEMENT_STYLES = {
+    'h1': (40, True, 'ctr', False),
+    'h2': (28, True, 'ctr', False),
+    'h3': (24, True, 'l', False),
+    'h4': (20, True, 'l', False),
+    'p': (20, False, 'l', False),
+    'li': (20, False, 'l', True),
+    'span': (16, False, 'l', False),
+}
+
+# Containers emitted by the converters and template builders that map to one shape
+BLOCK_CLASSES = {
+    'text-box', 'title-box', 'subtitle-box', 'content-box', 'info-box',
+    'placeholder', 'text-content', 'chart-container', 'image-container',
+    'image', 'column', 'slide-footer', 'presenter-info', 'logo',
+}
+
+SLIDE_MARGIN_PX = 60
+BLOCK_GAP_PX = 20
+TABLE_ROW_PX = 37
+TABLE_FONT_PT = 14
+
+
+def _xml_text(value):
+    return escape(value or '')
+
+
+def _parse_px(value):
+    value = (value or '').strip()
+    if not value.endswith('px'):
+        return None
+    try:
+        return float(value[:-2])
+    except ValueError:
+        return None
+
+
+def _parse_inline_box(style):
+    """Return (left, top, width, height) in px from an inline style, if fully specified"""
+    if not style:
+        return None
+    props = {}
+    for declaration in style.split(';'):
+        if ':' in declaration:
+            name, value = declaration.split(':', 1)
+            props[name.strip().lower()] = value
+    box = tuple(_parse_px(props.get(key)) for key in ('left', 'top', 'width', 'height'))
+    if any(v is None for v in box):
+        return None
+    return box
+
+
+class _SlideStreamParser(HTMLParser):
+    """
+    Incremental HTML parser that hands each finished ``div.slide`` to a callback.
+
+    A slide is reported as a list of shape dicts:
+        {'kind': 'text', 'paragraphs': [(tag, text)], 'box': (l, t, w, h) | None}
+        {'kind': 'picture', 'src': str, 'alt': str, 'box': (l, t, w, h) | None}
+        {'kind': 'table', 'rows': [[str]], 'header': bool, 'box': (l, t, w, h) | None}
+
+    Inline ``<svg>`` charts are not drawn shapes in PPTX; their markup is skipped
+    and their ``aria-label`` is kept as a text placeholder.
+    """
+
+    def __init__(self, on_slide):
+        super().__init__(convert_charrefs=True)
+        self.on_slide = on_slide
+        self._stack = []
+        self._slide_depth = None
+        self._shapes = []
+        self._block = None
+        self._block_depth = None
+        self._text_tag = None
+        self._text_parts = []
+        self._table = None
+        self._cell = None
+        self._svg_depth = None
+
+    def _start_block(self, box=None):
+        self._block = {'kind': 'text', 'paragraphs': [], 'box': box}
+        self._block_depth = len(self._stack)
+
+    def _end_block(self):
+        if self._block is not None and self._block['paragraphs']:
+            self._shapes.append(self._block)
+        self._block = None
+        self._block_depth = None
+
+    def _flush_text(self):
+        text = ' '.join(''.join(self._text_parts).split())
+        if text:
+            if self._block is None:
+                self._shapes.append({'kind': 'text', 'paragraphs': [(self._text_tag, text)], 'box': None})
+            else:
+                self._block['paragraphs'].append((self._text_tag, text))
+        self._text_tag = None
+        self._text_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('img', 'br', 'meta', 'link', 'hr', 'input'):
+            self.handle_startendtag(tag, attrs)
+            return
+        attrs = dict(attrs)
+        self._stack.append(tag)
+        classes = set((attrs.get('class') or '').split())
+        if self._slide_depth is None:
+            if tag == 'div' and 'slide' in classes:
+                self._slide_depth = len(self._stack)
+                self._shapes = []
+            return
+        if self._svg_depth is not None:
+            return
+        box = _parse_inline_box(attrs.get('style'))
+        if tag == 'svg':
+            self._svg_depth = len(self._stack)
+            label = attrs.get('aria-label')
+            if label:
+                if self._block is not None:
+                    self._block['paragraphs'].append(('p', label))
+                else:
+                    self._shapes.append({'kind': 'text', 'paragraphs': [('p', label)], 'box': box})
+            return
+        if tag == 'table' and self._table is None:
+            if box is None and self._block is not None:
+                box = self._block['box']
+            self._table = {'kind': 'table', 'rows': [], 'header': False, 'box': box}
+            return
+        if self._table is not None:
+            if tag == 'tr':
+                self._table['rows'].append([])
+            elif tag in ('td', 'th') and self._table['rows']:
+                self._cell = []
+                if tag == 'th' and len(self._table['rows']) == 1:
+                    self._table['header'] = True
+            return
+        if self._block is None and tag == 'div' and (classes & BLOCK_CLASSES or box):
+            self._start_block(box)
+        if tag in TEXT_ELEMENT_STYLES and self._text_tag is None:
+            self._text_tag = tag
+            self._text_parts = []
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'br' and self._cell is not None:
+            self._cell.append('\n')
+            return
+        if self._slide_depth is None or self._svg_depth is not None or tag != 'img':
+            return
+        attrs = dict(attrs)
+        box = _parse_inline_box(attrs.get('style'))
+        if box is None and self._block is not None:
+            box = self._block['box']
+        self._shapes.append({'kind': 'picture', 'src': attrs.get('src') or '',
+                             'alt': attrs.get('alt') or '', 'box': box})
+
+    def handle_endtag(self, tag):
+        if not self._stack:
+            return
+        # Tolerate unclosed inline tags by unwinding to the matching element
+        while self._stack and self._stack[-1] != tag and tag in self._stack:
+            self.handle_endtag(self._stack[-1])
+        if not self._stack or self._stack[-1] != tag:
+            return
+        if self._svg_depth is not None:
+            if self._svg_depth == len(self._stack):
+                self._svg_depth = None
+            self._stack.pop()
+            return
+        if self._table is not None:
+            if tag in ('td', 'th') and self._cell is not None:
+                text = '\n'.join(' '.join(line.split()) for line in ''.join(self._cell).split('\n'))
+                self._table['rows'][-1].append(text.strip('\n'))
+                self._cell = None
+            elif tag == 'table':
+                if self._table['rows']:
+                    self._shapes.append(self._table)
+                self._table = None
+            self._stack.pop()
+            return
+        if self._slide_depth is not None:
+            if tag == self._text_tag:
+                self._flush_text()
+            if self._block_depth == len(self._stack):
+                if self._text_tag is not None:
+                    self._flush_text()
+                self._end_block()
+            if self._slide_depth == len(self._stack):
+                self._end_block()
+                self.on_slide(self._shapes)
+                self._shapes = []
+                self._slide_depth = None
+        self._stack.pop()
+
+    def handle_data(self, data):
+        if self._slide_depth is None or self._svg_depth is not None:
+            return
+        if self._table is not None:
+            if self._cell is not None:
+                # Source newlines are insignificant; only <br> breaks a cell line
+                self._cell.append(data.replace('\n', ' '))
+            return
+        if self._text_tag is not None:
+            self._text_parts.append(data)
+        elif self._block is not None and data.strip():
+            # Bare text inside a block container, e.g. image placeholders
+            self._block['paragraphs'].append(('p', ' '.join(data.split())))
+
+
+class StreamingPptxWriter:
+    """
+    Write a PPTX package part by part.
+
+    Shared parts are emitted when the writer is opened, slides are appended
+    with ``add_slide`` and the parts that enumerate slides (presentation.xml,
+    its relationships, [Content_Types].xml and docProps/app.xml) are written
+    by ``close``. Leaving the ``with`` block on an exception calls ``abort``,
+    so a failed export never leaves a valid-looking but truncated file behind.
+    """
+
+    def __init__(self, output_path, canvas=(1280, 720), base_dir=None, title='LandPPT Export'):
+        self.output_path = output_path
+        self.canvas = canvas
+        self.base_dir = base_dir or os.getcwd()
+        self.title = title
+        self.slide_count = 0
+        self._media = {}
+        self._media_types = set()
+        self._zip = zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._write_shared_parts()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write(self, name, xml):
+        self._zip.writestr(name, XML_DECLARATION + xml)
+
+    def _write_shared_parts(self):
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self._write('ppt/theme/theme1.xml', THEME_XML)
+        self._write('ppt/slideMasters/slideMaster1.xml', SLIDE_MASTER_XML)
+        self._write('ppt/slideMasters/_rels/slideMaster1.xml.rels', _rels_xml([
+            ('rId1', RT_SLIDE_LAYOUT, '../slideLayouts/slideLayout1.xml'),
+            ('rId2', RT_THEME, '../theme/theme1.xml'),
+        ]))
+        self._write('ppt/slideLayouts/slideLayout1.xml', SLIDE_LAYOUT_XML)
+        self._write('ppt/slideLayouts/_rels/slideLayout1.xml.rels', _rels_xml([
+            ('rId1', RT_SLIDE_MASTER, '../slideMasters/slideMaster1.xml'),
+        ]))
+        self._write('ppt/presProps.xml', PRES_PROPS_XML)
+        self._write('ppt/viewProps.xml', VIEW_PROPS_XML)
+        self._write('ppt/tableStyles.xml', TABLE_STYLES_XML)
+        self._write('docProps/core.xml', CORE_PROPS_XML.format(
+            title=_xml_text(self.title), created=now))
+
+    @staticmethod
+    def _emu(px):
+        return int(round(px * EMU_PER_PX))
+
+    def _xfrm(self, box):
+        left, top, width, height = box
+        return ('<a:xfrm><a:off x="%d" y="%d"/><a:ext cx="%d" cy="%d"/></a:xfrm>'
+                % (self._emu(left), self._emu(top), max(self._emu(width), 1), max(self._emu(height), 1)))
+
+    def _embed_media(self, src):
+        """Copy an image into ppt/media once and return its part name, or None"""
+        if not src or src.startswith(('http://', 'https://', '//')):
+            return None
+        if src in self._media:
+            return self._media[src]
+        if src.startswith('data:'):
+            header, _, payload = src.partition(',')
+            ext = header[5:].split(';')[0].split('/')[-1].replace('svg+xml', 'svg')
+            if ext not in IMAGE_CONTENT_TYPES or ';base64' not in header:
+                return None
+            name = 'ppt/media/image%d.%s' % (len(self._media) + 1, ext)
+            self._zip.writestr(name, base64.b64decode(payload))
+        else:
+            path = src if os.path.isabs(src) else os.path.join(self.base_dir, src)
+            ext = os.path.splitext(path)[1].lstrip('.').lower()
+            if ext not in IMAGE_CONTENT_TYPES or not os.path.isfile(path):
+                return None
+            name = 'ppt/media/image%d.%s' % (len(self._media) + 1, ext)
+            with open(path, 'rb') as src_file, self._zip.open(name, 'w', force_zip64=True) as dst:
+                shutil.copyfileobj(src_file, dst, 1024 * 1024)
+        self._media[src] = name
+        self._media_types.add(ext)
+        return name
+
+    def _layout_boxes(self, shapes):
+        """Stack shapes without an explicit box top to bottom inside the slide margins"""
+        canvas_w, canvas_h = self.canvas
+        width = canvas_w - 2 * SLIDE_MARGIN_PX
+        y = SLIDE_MARGIN_PX
+        for shape in shapes:
+            if shape['box'] is not None:
+                continue
+            if shape['kind'] == 'picture':
+                height = 300
+            elif shape['kind'] == 'table':
+                height = len(shape['rows']) * TABLE_ROW_PX + 10
+            else:
+                height = 0
+                for tag, text in shape['paragraphs']:
+                    size_px = TEXT_ELEMENT_STYLES.get(tag, TEXT_ELEMENT_STYLES['p'])[0] * 96 / 72
+                    chars_per_line = max(int(width / (size_px * 0.6)), 1)
+                    lines = max(-(-len(text) // chars_per_line), 1)
+                    height += lines * size_px * 1.3
+                height += 10
+            height = min(height, max(canvas_h - SLIDE_MARGIN_PX - y, 40))
+            shape['box'] = (SLIDE_MARGIN_PX, y, width, height)
+            y += height + BLOCK_GAP_PX
+
+    def _text_shape_xml(self, shape_id, shape):
+        paragraphs = []
+        for tag, text in shape['paragraphs']:
+            size, bold, align, bullet = TEXT_ELEMENT_STYLES.get(tag, TEXT_ELEMENT_STYLES['p'])
+            if bullet:
+                ppr = ('<a:pPr marL="342900" indent="-342900" algn="%s"><a:buFont typeface="Arial"/>'
+                       '<a:buChar char="&#8226;"/></a:pPr>' % align)
+            else:
+                ppr = '<a:pPr algn="%s"><a:buNone/></a:pPr>' % align
+            paragraphs.append(
+                '<a:p>%s<a:r><a:rPr lang="zh-CN" altLang="en-US" sz="%d"%s dirty="0"/>'
+                '<a:t>%s</a:t></a:r></a:p>'
+                % (ppr, size * 100, ' b="1"' if bold else '', _xml_text(text)))
+        return ('<p:sp><p:nvSpPr><p:cNvPr id="%d" name="TextBox %d"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+                '<p:spPr>%s<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+                '<p:txBody><a:bodyPr wrap="square" rtlCol="0"><a:normAutofit/></a:bodyPr><a:lstStyle/>%s</p:txBody></p:sp>'
+                % (shape_id, shape_id - 1, self._xfrm(shape['box']), ''.join(paragraphs)))
+
+    def _table_xml(self, shape_id, shape):
+        left, top, width, height = shape['box']
+        rows = shape['rows']
+        n_cols = max(len(row) for row in rows) or 1
+        col_w = max(self._emu(width) // n_cols, 1)
+        row_h = max(self._emu(height) // len(rows), 1)
+        xml_rows = []
+        for row_index, row in enumerate(rows):
+            bold = ' b="1"' if shape['header'] and row_index == 0 else ''
+            cells = []
+            for text in row + [''] * (n_cols - len(row)):
+                paragraphs = ''.join(
+                    '<a:p><a:r><a:rPr lang="zh-CN" altLang="en-US" sz="%d"%s dirty="0"/><a:t>%s</a:t></a:r></a:p>'
+                    % (TABLE_FONT_PT * 100, bold, _xml_text(line)) if line else '<a:p><a:endParaRPr lang="zh-CN"/></a:p>'
+                    for line in text.split('\n'))
+                cells.append('<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>%s</a:txBody><a:tcPr/></a:tc>' % paragraphs)
+            xml_rows.append('<a:tr h="%d">%s</a:tr>' % (row_h, ''.join(cells)))
+        return ('<p:graphicFrame><p:nvGraphicFramePr><p:cNvPr id="%d" name="Table %d"/><p:cNvGraphicFramePr>'
+                '<a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/></p:nvGraphicFramePr>'
+                '<p:xfrm><a:off x="%d" y="%d"/><a:ext cx="%d" cy="%d"/></p:xfrm>'
+                '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table">'
+                '<a:tbl><a:tblPr firstRow="%d" bandRow="1"/><a:tblGrid>%s</a:tblGrid>%s</a:tbl>'
+                '</a:graphicData></a:graphic></p:graphicFrame>'
+                % (shape_id, shape_id - 1, self._emu(left), self._emu(top), col_w * n_cols, row_h * len(rows),
+                   1 if shape['header'] else 0, '<a:gridCol w="%d"/>' % col_w * n_cols, ''.join(xml_rows)))
+
+    def _picture_xml(self, shape_id, shape, rel_id):
+        return ('<p:pic><p:nvPicPr><p:cNvPr id="%d" name="Picture %d" descr=%s/><p:cNvPicPr>'
+                '<a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+                '<p:blipFill><a:blip r:embed="%s"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+                '<p:spPr>%s<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>'
+                % (shape_id, shape_id - 1, quoteattr(shape.get('alt', '')), rel_id, self._xfrm(shape['box'])))
+
+    def add_slide(self, shapes):
+        """Write one slide part and its relationships from parsed shape dicts"""
+        self.slide_count += 1
+        number = self.slide_count
+        self._layout_boxes(shapes)
+        rels = [('rId1', RT_SLIDE_LAYOUT, '../slideLayouts/slideLayout1.xml')]
+        body = []
+        for shape_id, shape in enumerate(shapes, start=2):
+            if shape['kind'] == 'picture':
+                media = self._embed_media(shape['src'])
+                if media is None:
+                    # Unresolvable image: keep its position with a text placeholder
+                    label = shape.get('alt') or '[Image]'
+                    body.append(self._text_shape_xml(shape_id, dict(shape, paragraphs=[('p', label)])))
+                    continue
+                rel_id = 'rId%d' % (len(rels) + 1)
+                rels.append((rel_id, RT_IMAGE, '../media/' + os.path.basename(media)))
+                body.append(self._picture_xml(shape_id, shape, rel_id))
+            elif shape['kind'] == 'table':
+                body.append(self._table_xml(shape_id, shape))
+            else:
+                body.append(self._text_shape_xml(shape_id, shape))
+        self._write('ppt/slides/slide%d.xml' % number, SLIDE_XML.format(shapes=''.join(body)))
+        self._write('ppt/slides/_rels/slide%d.xml.rels' % number, _rels_xml(rels))
+
+    def close(self):
+        if self._zip is None:
+            return
+        count = self.slide_count
+        slide_ids = ''.join('<p:sldId id="%d" r:id="rId%d"/>' % (256 + i, 6 + i) for i in range(count))
+        self._write('ppt/presentation.xml', PRESENTATION_XML.format(
+            slide_ids=slide_ids, cx=self.canvas[0] * EMU_PER_PX, cy=self.canvas[1] * EMU_PER_PX))
+        rels = [
+            ('rId1', RT_SLIDE_MASTER, 'slideMasters/slideMaster1.xml'),
+            ('rId2', RT_PRES_PROPS, 'presProps.xml'),
+            ('rId3', RT_VIEW_PROPS, 'viewProps.xml'),
+            ('rId4', RT_THEME, 'theme/theme1.xml'),
+            ('rId5', RT_TABLE_STYLES, 'tableStyles.xml'),
+        ]
+        rels.extend(('rId%d' % (6 + i), RT_SLIDE, 'slides/slide%d.xml' % (i + 1)) for i in range(count))
+        self._write('ppt/_rels/presentation.xml.rels', _rels_xml(rels))
+        self._write('docProps/app.xml', APP_PROPS_XML.format(slides=count))
+        self._write('_rels/.rels', _rels_xml([
+            ('rId1', RT_OFFICE_DOC, 'ppt/presentation.xml'),
+            ('rId2', RT_CORE_PROPS, 'docProps/core.xml'),
+            ('rId3', RT_EXTENDED_PROPS, 'docProps/app.xml'),
+        ]))
+        self._write('[Content_Types].xml', self._content_types_xml())
+        self._zip.close()
+        self._zip = None
+
+    def abort(self):
+        """Discard a partly written package instead of finalising it"""
+        if self._zip is None:
+            return
+        self._zip.close()
+        self._zip = None
+        try:
+            os.remove(self.output_path)
+        except FileNotFoundError:
+            pass
+
+    def _content_types_xml(self):
+        defaults = [('rels', 'application/vnd.openxmlformats-package.relationships+xml'),
+                    ('xml', 'application/xml')]
+        defaults.extend((ext, IMAGE_CONTENT_TYPES[ext]) for ext in sorted(self._media_types))
+        overrides = [
+            ('/ppt/presentation.xml', CT_PRESENTATION),
+            ('/ppt/slideMasters/slideMaster1.xml', CT_SLIDE_MASTER),
+            ('/ppt/slideLayouts/slideLayout1.xml', CT_SLIDE_LAYOUT),
+            ('/ppt/theme/theme1.xml', CT_THEME),
+            ('/ppt/presProps.xml', CT_PRES_PROPS),
+            ('/ppt/viewProps.xml', CT_VIEW_PROPS),
+            ('/ppt/tableStyles.xml', CT_TABLE_STYLES),
+            ('/docProps/core.xml', CT_CORE_PROPS),
+            ('/docProps/app.xml', CT_EXTENDED_PROPS),
+        ]
+        overrides.extend(('/ppt/slides/slide%d.xml' % (i + 1), CT_SLIDE) for i in range(self.slide_count))
+        return ('<Types xmlns="%s">%s%s</Types>' % (
+            NS_CT,
+            ''.join('<Default Extension="%s" ContentType="%s"/>' % item for item in defaults),
+            ''.join('<Override PartName="%s" ContentType="%s"/>' % item for item in overrides)))
+
+
+def _rels_xml(rels):
+    return '<Relationships xmlns="%s">%s</Relationships>' % (NS_RELS, ''.join(
+        '<Relationship Id="%s" Type="%s" Target="%s"/>' % rel for rel in rels))
+
+
+def export_html_to_pptx(html_path, output_pptx_path, canvas=(1280, 720), chunk_size=64 * 1024):
+    """
+    Export a converted HTML deck to PPTX, streaming slides into the package.
+
+    Returns the number of slides written.
+    """
+    base_dir = os.path.dirname(os.path.abspath(html_path))
+    title = os.path.splitext(os.path.basename(html_path))[0]
+    with StreamingPptxWriter(output_pptx_path, canvas=canvas, base_dir=base_dir, title=title) as writer:
+        parser = _SlideStreamParser(writer.add_slide)
+        with open(html_path, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+        parser.close()
+        return writer.slide_count
+
+
+SLIDE_XML = (
+    '<p:sld xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '">'
+    '<p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+    '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/>'
+    '<a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>{shapes}</p:spTree></p:cSld>'
+    '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+)
+
+PRESENTATION_XML = (
+    '<p:presentation xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '" saveSubsetFonts="1">'
+    '<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+    '<p:sldIdLst>{slide_ids}</p:sldIdLst>'
+    '<p:sldSz cx="{cx}" cy="{cy}"/><p:notesSz cx="6858000" cy="9144000"/>'
+    '<p:defaultTextStyle><a:lvl1pPr marL="0" algn="l" defTabSz="914400"><a:defRPr sz="1800" kern="1200">'
+    '<a:solidFill><a:schemeClr val="tx1"/></a:solidFill><a:latin typeface="+mn-lt"/><a:ea typeface="+mn-ea"/>'
+    '<a:cs typeface="+mn-cs"/></a:defRPr></a:lvl1pPr></p:defaultTextStyle></p:presentation>'
+)
+
+_EMPTY_SP_TREE = (
+    '<p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+    '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/>'
+    '<a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr></p:spTree>'
+)
+
+_LEVEL1_STYLE = ('<a:lvl1pPr marL="0" algn="l" defTabSz="914400"><a:defRPr sz="{sz}" kern="1200">'
+                 '<a:solidFill><a:schemeClr val="tx1"/></a:solidFill><a:latin typeface="{font}"/>'
+                 '<a:ea typeface="{ea}"/><a:cs typeface="{cs}"/></a:defRPr></a:lvl1pPr>')
+
+SLIDE_MASTER_XML = (
+    '<p:sldMaster xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '">'
+    '<p:cSld><p:bg><p:bgRef idx="1001"><a:schemeClr val="bg1"/></p:bgRef></p:bg>' + _EMPTY_SP_TREE + '</p:cSld>'
+    '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" accent3="accent3" '
+    'accent4="accent4" accent5="accent5" accent6="accent6" hlink="hlink" folHlink="folHlink"/>'
+    '<p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/></p:sldLayoutIdLst>'
+    '<p:txStyles>'
+    '<p:titleStyle>' + _LEVEL1_STYLE.format(sz=4400, font='+mj-lt', ea='+mj-ea', cs='+mj-cs') + '</p:titleStyle>'
+    '<p:bodyStyle>' + _LEVEL1_STYLE.format(sz=2000, font='+mn-lt', ea='+mn-ea', cs='+mn-cs') + '</p:bodyStyle>'
+    '<p:otherStyle>' + _LEVEL1_STYLE.format(sz=1800, font='+mn-lt', ea='+mn-ea', cs='+mn-cs') + '</p:otherStyle>'
+    '</p:txStyles></p:sldMaster>'
+)
+
+SLIDE_LAYOUT_XML = (
+    '<p:sldLayout xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '" type="blank" preserve="1">'
+    '<p:cSld name="Blank">' + _EMPTY_SP_TREE + '</p:cSld>'
+    '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'
+)
+
+_SOLID_PH = '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>'
+_LINE_STYLE = '<a:ln w="%d" cap="flat" cmpd="sng" algn="ctr">' + _SOLID_PH + '<a:prstDash val="solid"/></a:ln>'
+
+THEME_XML = (
+    '<a:theme xmlns:a="' + NS_A + '" name="LandPPT">'
+    '<a:themeElements>'
+    '<a:clrScheme name="Business Blue">'
+    '<a:dk1><a:sysClr val="windowText" lastClr="000000"/></a:dk1>'
+    '<a:lt1><a:sysClr val="window" lastClr="FFFFFF"/></a:lt1>'
+    '<a:dk2><a:srgbClr val="1A365D"/></a:dk2>'
+    '<a:lt2><a:srgbClr val="F8FAFC"/></a:lt2>'
+    '<a:accent1><a:srgbClr val="0066CC"/></a:accent1>'
+    '<a:accent2><a:srgbClr val="4DA6FF"/></a:accent2>'
+    '<a:accent3><a:srgbClr val="003366"/></a:accent3>'
+    '<a:accent4><a:srgbClr val="4A5568"/></a:accent4>'
+    '<a:accent5><a:srgbClr val="E2E8F0"/></a:accent5>'
+    '<a:accent6><a:srgbClr val="F0F8FF"/></a:accent6>'
+    '<a:hlink><a:srgbClr val="0066CC"/></a:hlink>'
+    '<a:folHlink><a:srgbClr val="954F72"/></a:folHlink>'
+    '</a:clrScheme>'
+    '<a:fontScheme name="LandPPT">'
+    '<a:majorFont><a:latin typeface="Arial"/><a:ea typeface="Microsoft YaHei"/><a:cs typeface=""/></a:majorFont>'
+    '<a:minorFont><a:latin typeface="Arial"/><a:ea typeface="Microsoft YaHei"/><a:cs typeface=""/></a:minorFont>'
+    '</a:fontScheme>'
+    '<a:fmtScheme name="LandPPT">'
+    '<a:fillStyleLst>' + _SOLID_PH * 3 + '</a:fillStyleLst>'
+    '<a:lnStyleLst>' + _LINE_STYLE % 6350 + _LINE_STYLE % 12700 + _LINE_STYLE % 19050 + '</a:lnStyleLst>'
+    '<a:effectStyleLst>' + '<a:effectStyle><a:effectLst/></a:effectStyle>' * 3 + '</a:effectStyleLst>'
+    '<a:bgFillStyleLst>' + _SOLID_PH * 3 + '</a:bgFillStyleLst>'
+    '</a:fmtScheme>'
+    '</a:themeElements><a:objectDefaults/><a:extraClrSchemeLst/></a:theme>'
+)
+
+PRES_PROPS_XML = '<p:presentationPr xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '"/>'
+
+VIEW_PROPS_XML = (
+    '<p:viewPr xmlns:a="' + NS_A + '" xmlns:r="' + NS_R + '" xmlns:p="' + NS_P + '">'
+    '<p:normalViewPr><p:restoredLeft sz="15620"/><p:restoredTop sz="94660"/></p:normalViewPr>'
+    '<p:gridSpacing cx="76200" cy="76200"/></p:viewPr>'
+)
+
+TABLE_STYLES_XML = '<a:tblStyleLst xmlns:a="' + NS_A + '" def="{5C22544A-7EE6-4342-B048-85BDC9FD1C3A}"/>'
+
+CORE_PROPS_XML = (
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>{title}</dc:title><dc:creator>LandPPT</dc:creator>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{created}</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+APP_PROPS_XML = (
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+    '<Application>LandPPT</Application><Slides>{slides}</Slides></Properties>'
+)
+
+
+def _parse_canvas(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description='Export converted HTML slides to a PPTX file')
+    parser.add_argument('html_path', help='HTML file produced by convert_ppt_to_html_*')
+    parser.add_argument('output_pptx_path', nargs='?', help='Output PPTX path (default: next to the HTML)')
+    parser.add_argument('--canvas', default='1280x720', type=_parse_canvas,
+                        help='Pixel size of the HTML slides, e.g. 960x720 for the v2 converter')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.html_path):
+        print(f"Error: HTML file not found: {args.html_path}")
+        sys.exit(1)
+
+    output_path = args.output_pptx_path or os.path.splitext(args.html_path)[0] + '.pptx'
+
+    print(f"📁 Input HTML: {args.html_path}")
+    print(f"📄 Output PPTX: {output_path}")
+
+    try:
+        count = export_html_to_pptx(args.html_path, output_path, canvas=args.canvas)
+    except Exception as e:
+        print(f"❌ Error exporting HTML to PPTX: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print(f"✅ Exported {count} slides to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
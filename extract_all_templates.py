@@ -8,25 +8,38 @@ Date: 2026-01-27
 import os
 import sys
 import json
+import argparse
 from pathlib import Path
 from datetime import datetime
 
-def create_comprehensive_template(pptx_file):
+from artifact_output import SizeReport, dumps_json, write_artifact
+from atomic_io import template_lock
+from theme_stylesheets import externalize_styles
+from conversion_metrics import ConversionMetrics, add_instrumentation_arguments, run_instrumented
+
+def create_comprehensive_template(pptx_file, metrics=None, production=False, css_dir=None, css_url=None):
     """Create comprehensive JSON template with all styles from PPTX file"""
+    if metrics is None:
+        metrics = ConversionMetrics(Path(pptx_file).name)
     ppt_path = Path(pptx_file)
     output_dir = ppt_path.parent
     template_name = ppt_path.stem
     
-    # Get all existing template styles from the directory
+    # Get all existing template styles from the directory; the exclusive lock
+    # waits for variations being written by other builders
     existing_templates = []
-    for json_file in output_dir.glob(f"{template_name}_*.json"):
-        if json_file.stem != f"{template_name}_all_styles":
-            with open(json_file, 'r', encoding='utf-8') as f:
-                try:
-                    template_data = json.load(f)
-                    existing_templates.append(template_data)
-                except json.JSONDecodeError:
-                    pass
+    with metrics.stage('load'), template_lock(pptx_file):
+        for json_file in sorted(output_dir.glob(f"{template_name}_*.json")):
+            if json_file.stem != f"{template_name}_all_styles":
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    try:
+                        template_data = json.load(f)
+                        existing_templates.append(template_data)
+                    except json.JSONDecodeError as e:
+                        # Variations are written atomically, so this file is corrupt, not half written
+                        print(f"⚠️  Skipping invalid template JSON {json_file.name}: {e}")
+                        metrics.count('invalid_variations')
+    metrics.count('variations', len(existing_templates))
     
     # Create comprehensive HTML content that includes all styles
     html_content = '''<!DOCTYPE html>
@@ -326,31 +339,52 @@ def create_comprehensive_template(pptx_file):
 </html>'''
     
     # Create comprehensive JSON data
-    json_data = {
-        "template_name": f"{template_name}_all_styles",
-        "description": "商务通用模板（包含所有样式变体）",
-        "html_template": html_content,
-        "tags": ["business", "blue", "professional", "comprehensive", "all-styles"],
-        "is_default": False,
-        "variations": existing_templates,
-        "created_at": datetime.now().isoformat(),
-        "original_file": str(ppt_path)
-    }
+    if css_dir:
+        # Link the template CSS as a shared content-hashed stylesheet
+        with metrics.stage('stylesheets'):
+            target = output_dir / f"{template_name}_all_styles.json"
+            html_content = externalize_styles(html_content, css_dir, target, css_url, production)
+    with metrics.stage('serialization'):
+        json_data = {
+            "template_name": f"{template_name}_all_styles",
+            "description": "商务通用模板（包含所有样式变体）",
+            "html_template": html_content,
+            "tags": ["business", "blue", "professional", "comprehensive", "all-styles"],
+            "is_default": False,
+            "variations": existing_templates,
+            "created_at": datetime.now().isoformat(),
+            "original_file": str(ppt_path)
+        }
+        json_text = dumps_json(json_data, production)
     
     # Save comprehensive JSON file
     json_path = output_dir / f"{template_name}_all_styles.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
+    with metrics.stage('write'):
+        report = SizeReport() if production else None
+        original_size = len(dumps_json(json_data).encode('utf-8')) if production else None
+        write_artifact(json_path, json_text, production, report, original_size)
+    if report is not None:
+        report.print()
     
     return str(json_path)
 
 def main():
-    if len(sys.argv) != 2:
+    parser = argparse.ArgumentParser(description='Create a comprehensive JSON template with all style variations of a PPTX file')
+    parser.add_argument('pptx_file', nargs='?', help='e.g. business_blue_01.pptx')
+    parser.add_argument('--production', action='store_true',
+                        help='Write minified JSON plus precompressed .gz/.br files')
+    parser.add_argument('--css-dir', metavar='DIR',
+                        help='Link the template CSS as a shared content-hashed file in DIR instead of inlining it')
+    parser.add_argument('--css-url', metavar='URL',
+                        help='URL prefix of --css-dir as served to the frontend (default: relative path)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    if args.pptx_file is None:
         print(f"Usage: {sys.argv[0]} <pptx_file>")
         print(f"Example: {sys.argv[0]} business_blue_01.pptx")
         sys.exit(1)
     
-    pptx_path = sys.argv[1]
+    pptx_path = args.pptx_file
     
     if not os.path.exists(pptx_path):
         print(f"Error: PPTX file not found: {pptx_path}")
@@ -363,7 +397,11 @@ def main():
     print(f"Creating comprehensive JSON template for {pptx_path}...")
     
     try:
-        json_path = create_comprehensive_template(pptx_path)
+        metrics = ConversionMetrics(Path(pptx_path).name)
+        options = {'metrics': metrics, 'production': args.production,
+                   'css_dir': args.css_dir, 'css_url': args.css_url}
+        json_path = run_instrumented(create_comprehensive_template, (pptx_path,), options,
+                                     metrics, args, str(Path(pptx_path).with_suffix('')) + '_all_styles')
         print(f"Comprehensive JSON template created successfully!")
         print(f"JSON file saved to: {json_path}")
     except Exception as e:
@@ -7,12 +7,21 @@ Date: 2026-01-23
 
 import os
 import sys
-import json
+import argparse
 from pathlib import Path
 from datetime import datetime
 
-def fix_json_template(ppt_file):
+from artifact_output import SizeReport, dumps_json, write_artifact
+from atomic_io import template_lock
+from theme_stylesheets import externalize_styles
+from ppt_slot_config import deck_slot_config
+from conversion_metrics import ConversionMetrics, add_instrumentation_arguments, run_instrumented
+
+def fix_json_template(ppt_file, metrics=None, production=False, css_dir=None, css_url=None,
+                      slot_config=None):
     """Create a clean JSON template file from PPT"""
+    if metrics is None:
+        metrics = ConversionMetrics(Path(ppt_file).name)
     ppt_path = Path(ppt_file)
     output_dir = ppt_path.parent
     
@@ -135,28 +144,53 @@ def fix_json_template(ppt_file):
     
     # Create clean JSON data
     template_name = ppt_path.stem
-    json_data = {
-        "template_name": template_name,
-        "description": "Business blue presentation template",
-        "html_template": html_content,
-        "tags": ["business", "blue", "professional"],
-        "is_default": False
-    }
+    if css_dir:
+        # Link the template CSS as a shared content-hashed stylesheet
+        with metrics.stage('stylesheets'):
+            target = output_dir / f"{template_name}_fixed.json"
+            html_content = externalize_styles(html_content, css_dir, target, css_url, production)
+    if slot_config is None:
+        slot_config = deck_slot_config(ppt_file, metrics=metrics)
+    with metrics.stage('serialization'):
+        json_data = {
+            "template_name": template_name,
+            "description": "Business blue presentation template",
+            "html_template": html_content,
+            "slot_config": slot_config,
+            "tags": ["business", "blue", "professional"],
+            "is_default": False
+        }
+        json_text = dumps_json(json_data, production)
     
     # Save fixed JSON file
     json_path = output_dir / f"{template_name}_fixed.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
+    with metrics.stage('write'):
+        report = SizeReport() if production else None
+        original_size = len(dumps_json(json_data).encode('utf-8')) if production else None
+        with template_lock(ppt_file, shared=True):
+            write_artifact(json_path, json_text, production, report, original_size)
+    if report is not None:
+        report.print()
     
     return str(json_path)
 
 def main():
-    if len(sys.argv) != 2:
+    parser = argparse.ArgumentParser(description='Create a clean, importable JSON template for a PPTX file')
+    parser.add_argument('pptx_file', nargs='?', help='e.g. business_blue_01.pptx')
+    parser.add_argument('--production', action='store_true',
+                        help='Write minified JSON plus precompressed .gz/.br files')
+    parser.add_argument('--css-dir', metavar='DIR',
+                        help='Link the template CSS as a shared content-hashed file in DIR instead of inlining it')
+    parser.add_argument('--css-url', metavar='URL',
+                        help='URL prefix of --css-dir as served to the frontend (default: relative path)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    if args.pptx_file is None:
         print(f"Usage: {sys.argv[0]} <pptx_file>")
         print(f"Example: {sys.argv[0]} business_blue_01.pptx")
         sys.exit(1)
     
-    pptx_path = sys.argv[1]
+    pptx_path = args.pptx_file
     
     if not os.path.exists(pptx_path):
         print(f"Error: PPTX file not found: {pptx_path}")
@@ -169,7 +203,11 @@ def main():
     print(f"Creating fixed JSON template for {pptx_path}...")
     
     try:
-        json_path = fix_json_template(pptx_path)
+        metrics = ConversionMetrics(Path(pptx_path).name)
+        options = {'metrics': metrics, 'production': args.production,
+                   'css_dir': args.css_dir, 'css_url': args.css_url}
+        json_path = run_instrumented(fix_json_template, (pptx_path,), options,
+                                     metrics, args, str(Path(pptx_path).with_suffix('')) + '_fixed')
         print(f"Fixed JSON template created successfully!")
         print(f"JSON file saved to: {json_path}")
     except Exception as e:
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered background layers per slide layout
+
+Everything a slide inherits from its layout and master that is not a
+placeholder (background fill, gradients, decorative polygons, lines, logos)
+is identical on every slide using that layout. ``background_layer`` renders
+it once into an SVG named after the content hash of the layout, master, theme
+and any background override of the slide, so generated slides only reference the
+layer and overlay their own text. Layers are shared across decks: a second
+deck built from the same template reuses the files already written.
+"""
+
+import os
+import base64
+import hashlib
+from html import escape
+
+from lxml import etree
+
+from atomic_io import atomic_write
+from ppt_shape_walker import iter_leaf_shapes
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+
+RT_THEME = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme'
+
+# EMU per CSS pixel at 96 dpi
+EMU_PER_PX = 9525
+
+HASH_LENGTH = 16
+
+DEFAULT_CLR_MAP = {'bg1': 'lt1', 'tx1': 'dk1', 'bg2': 'lt2', 'tx2': 'dk2'}
+
+# Preset geometries drawn as polygons, as (x, y) fractions of the shape box
+PRESET_POLYGONS = {
+    'triangle': ((0.5, 0), (1, 1), (0, 1)),
+    'rtTriangle': ((0, 0), (1, 1), (0, 1)),
+    'diamond': ((0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5)),
+    'parallelogram': ((0.25, 0), (1, 0), (0.75, 1), (0, 1)),
+    'trapezoid': ((0.25, 0), (0.75, 0), (1, 1), (0, 1)),
+    'pentagon': ((0, 0), (0.8, 0), (1, 0.5), (0.8, 1), (0, 1)),
+    'homePlate': ((0, 0), (0.8, 0), (1, 0.5), (0.8, 1), (0, 1)),
+    'chevron': ((0, 0), (0.8, 0), (1, 0.5), (0.8, 1), (0, 1), (0.2, 0.5)),
+    'hexagon': ((0.25, 0), (0.75, 0), (1, 0.5), (0.75, 1), (0.25, 1), (0, 0.5)),
+}
+
+
+def _px(emu):
+    return round(emu / EMU_PER_PX, 2)
+
+
+class _Palette:
+    """Resolves DrawingML colour elements to (#rrggbb, opacity) with the master's theme"""
+
+    def __init__(self, master):
+        self.scheme = {}
+        try:
+            theme = etree.fromstring(master.part.part_related_by(RT_THEME).blob)
+        except KeyError:
+            theme = None
+        if theme is not None:
+            scheme = theme.find('.//' + _A + 'clrScheme')
+            for slot in (scheme if scheme is not None else ()):
+                color = slot.find(_A + 'srgbClr')
+                system = slot.find(_A + 'sysClr')
+                if color is not None:
+                    self.scheme[etree.QName(slot).localname] = color.get('val')
+                elif system is not None:
+                    self.scheme[etree.QName(slot).localname] = system.get('lastClr', '000000')
+        clr_map = master._element.find(_P + 'clrMap')
+        self.clr_map = dict(clr_map.attrib) if clr_map is not None else dict(DEFAULT_CLR_MAP)
+
+    def color(self, parent):
+        """Colour of the first colour child of ``parent``, or None"""
+        for el in parent:
+            name = etree.QName(el).localname
+            if name == 'srgbClr':
+                rgb = el.get('val', '000000')
+            elif name == 'schemeClr':
+                val = el.get('val')
+                rgb = self.scheme.get(self.clr_map.get(val, val), '000000')
+            elif name == 'sysClr':
+                rgb = el.get('lastClr', '000000')
+            elif name == 'prstClr':
+                rgb = {'black': '000000', 'white': 'FFFFFF'}.get(el.get('val'), '808080')
+            else:
+                continue
+            return self._modify(rgb, el)
+        return None
+
+    @staticmethod
+    def _modify(rgb, el):
+        channels = [int(rgb[i:i + 2], 16) for i in (0, 2, 4)]
+        opacity = 1.0
+        for mod in el:
+            name = etree.QName(mod).localname
+            value = int(mod.get('val', 100000)) / 100000
+            if name == 'lumMod':
+                channels = [c * value for c in channels]
+            elif name == 'lumOff':
+                channels = [c + 255 * value for c in channels]
+            elif name == 'tint':
+                channels = [255 - (255 - c) * value for c in channels]
+            elif name == 'shade':
+                channels = [c * value for c in channels]
+            elif name == 'alpha':
+                opacity = value
+        channels = [min(max(int(round(c)), 0), 255) for c in channels]
+        return '#{:02x}{:02x}{:02x}'.format(*channels), opacity
+
+
+class _Renderer:
+    def __init__(self, palette):
+        self.palette = palette
+        self.defs = []
+        self.body = []
+
+    def paint(self, sp_pr, attr='fill'):
+        """SVG attributes for the fill (or line fill) inside ``sp_pr``; None if nothing is painted"""
+        for el in sp_pr:
+            name = etree.QName(el).localname
+            if name == 'noFill':
+                return None
+            if name == 'solidFill':
+                color = self.palette.color(el)
+                if color is None:
+                    return None
+                rgb, opacity = color
+                return f' {attr}="{rgb}"' + (f' {attr}-opacity="{opacity:g}"' if opacity < 1 else '')
+            if name == 'gradFill':
+                return f' {attr}="url(#{self._gradient(el)})"'
+        return None
+
+    def _gradient(self, grad):
+        gid = f'g{len(self.defs) + 1}'
+        stops = []
+        for gs in grad.iter(_A + 'gs'):
+            color = self.palette.color(gs)
+            if color is None:
+                continue
+            rgb, opacity = color
+            stops.append(f'<stop offset="{int(gs.get("pos", 0)) / 1000:g}%" stop-color="{rgb}"'
+                         + (f' stop-opacity="{opacity:g}"' if opacity < 1 else '') + '/>')
+        lin = grad.find(_A + 'lin')
+        angle = int(lin.get('ang', 0)) / 60000 if lin is not None else 90.0
+        self.defs.append(f'<linearGradient id="{gid}" gradientTransform="rotate({angle:g} 0.5 0.5)">'
+                         f'{"".join(stops)}</linearGradient>')
+        return gid
+
+    def background(self, bg, width, height):
+        bg_pr = bg.find(_P + 'bgPr')
+        paint = None
+        if bg_pr is not None:
+            paint = self.paint(bg_pr)
+        else:
+            ref = bg.find(_P + 'bgRef')
+            if ref is not None:
+                color = self.palette.color(ref)
+                if color is not None:
+                    paint = f' fill="{color[0]}"'
+        if paint:
+            self.body.append(f'<rect x="0" y="0" width="{width:g}" height="{height:g}"{paint}/>')
+
+    def shape(self, shape, box):
+        element = shape._element
+        x, y, w, h = _px(box.left), _px(box.top), _px(box.width), _px(box.height)
+        xfrm = element.find('.//' + _A + 'xfrm')
+        rotate = int(xfrm.get('rot', 0)) / 60000 if xfrm is not None else 0
+        transform = f' transform="rotate({rotate:g} {x + w / 2:g} {y + h / 2:g})"' if rotate else ''
+
+        if etree.QName(element).localname == 'pic':
+            self._picture(shape, x, y, w, h, transform)
+            return
+        sp_pr = element.find(_P + 'spPr')
+        if sp_pr is None:
+            return
+        fill = self.paint(sp_pr) or ' fill="none"'
+        ln = sp_pr.find(_A + 'ln')
+        stroke = ''
+        if ln is not None:
+            stroke = self.paint(ln, 'stroke') or ''
+            if stroke:
+                stroke += f' stroke-width="{_px(int(ln.get("w", 12700))):g}"'
+        if fill == ' fill="none"' and not stroke:
+            self._text(element, x, y, h)
+            return
+        self.body.append(self._geometry(sp_pr, x, y, w, h, fill + stroke + transform))
+        self._text(element, x, y, h)
+
+    def _geometry(self, sp_pr, x, y, w, h, attrs):
+        cust = sp_pr.find(_A + 'custGeom')
+        if cust is not None:
+            return f'<path d="{self._custom_path(cust, x, y, w, h)}"{attrs}/>'
+        prst = sp_pr.find(_A + 'prstGeom')
+        name = prst.get('prst', 'rect') if prst is not None else 'rect'
+        if name in ('ellipse', 'flowChartConnector'):
+            return f'<ellipse cx="{x + w / 2:g}" cy="{y + h / 2:g}" rx="{w / 2:g}" ry="{h / 2:g}"{attrs}/>'
+        if name in ('line', 'straightConnector1'):
+            return f'<line x1="{x:g}" y1="{y:g}" x2="{x + w:g}" y2="{y + h:g}"{attrs}/>'
+        if name in PRESET_POLYGONS:
+            points = ' '.join(f'{x + px * w:g},{y + py * h:g}' for px, py in PRESET_POLYGONS[name])
+            return f'<polygon points="{points}"{attrs}/>'
+        radius = f' rx="{min(w, h) * 0.1667:g}"' if name == 'roundRect' else ''
+        return f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}"{radius}{attrs}/>'
+
+    @staticmethod
+    def _custom_path(cust, x, y, w, h):
+        commands = []
+        for path in cust.iter(_A + 'path'):
+            pw = int(path.get('w', 0)) or 1
+            ph = int(path.get('h', 0)) or 1
+
+            def point(pt):
+                return f'{x + int(pt.get("x", 0)) / pw * w:g},{y + int(pt.get("y", 0)) / ph * h:g}'
+
+            for segment in path:
+                name = etree.QName(segment).localname
+                pts = segment.findall(_A + 'pt')
+                if name == 'moveTo' and pts:
+                    commands.append('M' + point(pts[0]))
+                elif name == 'lnTo' and pts:
+                    commands.append('L' + point(pts[0]))
+                elif name == 'cubicBezTo' and len(pts) == 3:
+                    commands.append('C' + ' '.join(point(pt) for pt in pts))
+                elif name == 'quadBezTo' and len(pts) == 2:
+                    commands.append('Q' + ' '.join(point(pt) for pt in pts))
+                elif name == 'close':
+                    commands.append('Z')
+        return ' '.join(commands)
+
+    def _picture(self, shape, x, y, w, h, transform):
+        try:
+            image = shape.image
+            data = image.blob
+        except Exception:
+            return
+        if not data:
+            # Media stripped by a memory-budgeted load
+            return
+        uri = f'data:{image.content_type};base64,{base64.b64encode(data).decode("ascii")}'
+        self.body.append(f'<image x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" '
+                         f'preserveAspectRatio="none" href="{uri}"{transform}/>')
+
+    def _text(self, element, x, y, h):
+        """Static text of decorative shapes (e.g. a LOGO wordmark), one line per paragraph"""
+        line_y = y
+        for p in element.iter(_A + 'p'):
+            text = ''.join(t.text or '' for t in p.iter(_A + 't'))
+            rpr = p.find('.//' + _A + 'rPr')
+            size = int(rpr.get('sz', 1800)) / 100 * 96 / 72 if rpr is not None else 24.0
+            line_y += size * 1.2
+            if not text.strip():
+                continue
+            fill = ''
+            if rpr is not None and rpr.find(_A + 'solidFill') is not None:
+                fill = self.paint(rpr) or ''
+            self.body.append(f'<text x="{x:g}" y="{min(line_y, y + h):g}" font-size="{size:g}"{fill}>'
+                             f'{escape(text)}</text>')
+
+
+def _is_placeholder(shape):
+    return shape._element.find('./*/' + _P + 'nvPr/' + _P + 'ph') is not None
+
+
+def _background_element(*elements):
+    """The first p:bg among ``elements`` (slide, layout, master), i.e. the effective background"""
+    for element in elements:
+        bg = element.find(_P + 'cSld/' + _P + 'bg')
+        if bg is not None:
+            return bg
+    return None
+
+
+def _shows_master_shapes(layout):
+    return layout._element.get('showMasterSp', '1') not in ('0', 'false')
+
+
+def _layout_digest(layout):
+    master = layout.slide_master
+    digest = hashlib.sha256()
+    for element in (master._element, layout._element):
+        digest.update(etree.tostring(element, method='c14n'))
+    # Scheme colours resolve through the master's colour map and its theme
+    clr_map = master._element.find(_P + 'clrMap')
+    if clr_map is not None:
+        digest.update(etree.tostring(clr_map, method='c14n'))
+    try:
+        digest.update(master.part.part_related_by(RT_THEME).blob)
+    except KeyError:
+        pass
+    for part in (master.part, layout.part):
+        for rel in sorted(part.rels.values(), key=lambda rel: rel.rId):
+            if not rel.is_external and rel.reltype.endswith('/image'):
+                digest.update(rel.target_part.blob)
+    return digest.hexdigest()
+
+
+def layer_digest(slide, layout_digests=None):
+    """
+    Content hash of everything the background layer of ``slide`` is drawn
+    from: its layout, master and images, plus the slide's own background
+    override if it has one. ``layout_digests`` caches the per-layout part.
+    """
+    layout = slide.slide_layout
+    if layout_digests is None:
+        layout_digests = {}
+    key = layout.part.partname
+    if key not in layout_digests:
+        layout_digests[key] = _layout_digest(layout)
+    bg = slide._element.find(_P + 'cSld/' + _P + 'bg')
+    if bg is None:
+        return layout_digests[key][:HASH_LENGTH]
+    digest = hashlib.sha256(layout_digests[key].encode('ascii'))
+    digest.update(etree.tostring(bg, method='c14n'))
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def render_layer_svg(slide, slide_width, slide_height):
+    """SVG of the inherited, non-placeholder background of ``slide``"""
+    layout = slide.slide_layout
+    master = layout.slide_master
+    width, height = _px(slide_width), _px(slide_height)
+    renderer = _Renderer(_Palette(master))
+    bg = _background_element(slide._element, layout._element, master._element)
+    if bg is not None:
+        renderer.background(bg, width, height)
+    sources = [master.shapes] if _shows_master_shapes(layout) else []
+    sources.append(layout.shapes)
+    for shapes in sources:
+        for shape, box in iter_leaf_shapes(shapes):
+            if not _is_placeholder(shape):
+                renderer.shape(shape, box)
+    defs = f'<defs>{"".join(renderer.defs)}</defs>' if renderer.defs else ''
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width:g} {height:g}" '
+            f'preserveAspectRatio="none" font-family="sans-serif">{defs}{"".join(renderer.body)}</svg>\n')
+
+
+def background_layer(slide, slide_width, slide_height, layer_dir, metrics=None, digest=None):
+    """
+    Path of the background layer SVG of ``slide`` in ``layer_dir``, rendering
+    it only if no layer with the same content hash exists yet.
+    """
+    name = f'layout-{digest or layer_digest(slide)}.svg'
+    path = os.path.join(layer_dir, name)
+    if os.path.exists(path):
+        return path
+    svg = render_layer_svg(slide, slide_width, slide_height)
+    os.makedirs(layer_dir, exist_ok=True)
+    atomic_write(path, svg)
+    if metrics is not None:
+        metrics.count('background_layers_rendered')
+    return path
+
+
+def deck_background_layers(prs, layer_dir, metrics=None):
+    """Background layer path of every slide of ``prs``, each distinct layer rendered once"""
+    layout_digests = {}
+    by_digest = {}
+    layers = []
+    for slide in prs.slides:
+        digest = layer_digest(slide, layout_digests)
+        if digest not in by_digest:
+            by_digest[digest] = background_layer(slide, prs.slide_width, prs.slide_height, layer_dir,
+                                                 metrics, digest)
+        layers.append(by_digest[digest])
+    return layers
+
+
+def layer_class(path):
+    """CSS class of a layer file: ``layer-<hash>``"""
+    return os.path.splitext(os.path.basename(path))[0].replace('layout-', 'layer-', 1)
+
+
+def layer_css(layers, document_path):
+    """One rule per distinct layer, with URLs relative to the document at ``document_path``"""
+    base = os.path.dirname(os.path.abspath(document_path))
+    rules = []
+    for path in dict.fromkeys(layers):
+        url = os.path.relpath(os.path.abspath(path), base).replace(os.sep, '/')
+        rules.append(f'''
+        .slide.{layer_class(path)} {{
+            background-image: url("{url}");
+        }}''')
+    return ''.join(rules) + '\n        '
+
+
+# Added to the converters' CSS; the layer replaces the themed slide background
+LAYERED_CSS = '''
+        .slide.layered {
+            background-size: 100% 100%;
+            background-repeat: no-repeat;
+        }
+        '''
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Memory-budgeted loading of PPTX packages for the converters
+
+python-pptx reads every part of a package into memory when a ``Presentation``
+is opened, including videos, audio, embedded workbooks and full resolution
+images that text conversion never looks at. ``open_presentation`` hands
+python-pptx a copy of the package in which those media parts are empty, so
+they are never decompressed, and ``MemoryBudget`` enforces an RSS ceiling so a
+pathological upload fails fast instead of taking down a shared worker. Media
+that is explicitly exported is read back from the original package one part
+at a time through ``PackageMedia``, each read reserved against the budget.
+"""
+
+import io
+import os
+import zipfile
+
+# Parts that text conversion never reads
+MEDIA_PREFIXES = ('ppt/media/', 'ppt/embeddings/', 'docProps/thumbnail')
+
+# Rough ratio between the uncompressed XML of a package and the memory its
+# parsed lxml tree occupies, used to refuse loads that cannot fit the budget
+XML_INFLATION_FACTOR = 8
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised when a conversion would exceed its configured RSS ceiling"""
+
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes, or None where unsupported"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class MemoryBudget:
+    """
+    RSS ceiling for one conversion.
+
+    ``check`` raises MemoryBudgetExceeded once the process grows past
+    ``max_rss_mb``; ``reserve`` does the same for memory that is about to be
+    allocated so the error is raised before the allocation happens.
+    """
+
+    def __init__(self, max_rss_mb):
+        self.max_rss_mb = max_rss_mb
+        self.limit_bytes = int(max_rss_mb * 1024 * 1024)
+        self.peak_rss_bytes = 0
+
+    def _rss(self):
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+        return rss
+
+    def check(self, context):
+        rss = self._rss()
+        if rss is not None and rss > self.limit_bytes:
+            raise MemoryBudgetExceeded(
+                f"memory budget exceeded {context}: RSS {rss / 1048576:.1f} MB > limit {self.max_rss_mb} MB"
+            )
+
+    def reserve(self, nbytes, context):
+        rss = self._rss()
+        if rss is not None and rss + nbytes > self.limit_bytes:
+            raise MemoryBudgetExceeded(
+                f"memory budget would be exceeded {context}: RSS {rss / 1048576:.1f} MB + "
+                f"~{nbytes / 1048576:.1f} MB needed > limit {self.max_rss_mb} MB"
+            )
+
+
+def is_media_part(name):
+    return name.startswith(MEDIA_PREFIXES)
+
+
+def open_presentation(ppt_path, budget=None):
+    """
+    Open a PPTX for conversion without inflating unused media parts.
+
+    Media parts keep their names, so relationships still resolve and picture
+    shapes keep their geometry, but their content is empty. Only the XML parts
+    count against the budget: they are what python-pptx parses into trees.
+    """
+    from pptx import Presentation
+
+    with zipfile.ZipFile(ppt_path) as source:
+        infos = source.infolist()
+        xml_bytes = sum(info.file_size for info in infos if not is_media_part(info.filename))
+        if budget is not None:
+            budget.reserve(xml_bytes * XML_INFLATION_FACTOR, f"loading {os.path.basename(ppt_path)}")
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as stripped:
+            for info in infos:
+                if info.is_dir():
+                    continue
+                if is_media_part(info.filename):
+                    stripped.writestr(info.filename, b'')
+                else:
+                    stripped.writestr(info.filename, source.read(info))
+    buffer.seek(0)
+
+    prs = Presentation(buffer)
+    del buffer
+    if budget is not None:
+        budget.check(f"after loading {os.path.basename(ppt_path)}")
+    return prs
+
+
+class PackageMedia:
+    """
+    Media parts of the package at ``ppt_path``, read on demand, one at a time,
+    for presentations opened with the media stripped by ``open_presentation``.
+    """
+
+    def __init__(self, ppt_path, budget=None):
+        self.ppt_path = ppt_path
+        self.budget = budget
+
+    def read(self, partname, decoded_bytes=0):
+        """
+        Content of the part ``partname`` (e.g. ``/ppt/media/image1.png``),
+        after reserving its size plus ``decoded_bytes`` (what decoding it takes).
+        """
+        with zipfile.ZipFile(self.ppt_path) as source:
+            info = source.getinfo(partname.lstrip('/'))
+            if self.budget is not None:
+                self.budget.reserve(info.file_size + decoded_bytes, f"reading {partname}")
+            return source.read(info)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Render the slides of one deck serially or across a process pool
+
+The converters rendered slides one after another, so a long deck converted on
+one core however many the machine had. ``render_parallel`` fans the slides out
+to worker processes instead. python-pptx objects can neither be pickled nor
+shared, so the deck is shared as its parts: the XML, media and relationships of
+every part are copied once into a shared memory segment, and a worker loads a
+slide from there together with the parts it refers to (layout, master, theme,
+charts) and no other slide. Pictures are read from the segment when planned,
+so tasks carry slide numbers only, and results carry markup strings, structure
+signatures, run style rules and planned images only.
+
+Workers render contiguous runs of slides, and the parent consumes them in
+slide order, so the stitched document is the one ``render_slides`` produces:
+run style classes are content hashes merged in order of first use, shared
+structure classes are assigned by the parent, pictures planned by several
+workers are encoded once by the parent, and failed slides, metrics and
+console output come back with their run of slides.
+"""
+
+import io
+import os
+import sys
+import zipfile
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TARGET_MODE as RTM
+from pptx.opc.oxml import CT_Relationships
+from pptx.opc.package import PartFactory
+from pptx.opc.packuri import PackURI
+from pptx.oxml import parse_xml
+from pptx.package import Package
+
+from conversion_metrics import ConversionMetrics
+from memory_budget import is_media_part
+from slide_isolation import SlideIsolation, failed_slide_html
+
+# Runs of slides per worker: more balance uneven slides, fewer cost less overhead
+CHUNKS_PER_WORKER = 4
+
+# State of a worker process, set up once by _init_worker
+_worker = {}
+
+
+def slide_workers(jobs, slide_count):
+    """Worker processes for ``jobs`` (0: one per CPU) and a deck of ``slide_count`` slides"""
+    return max(1, min(jobs or os.cpu_count() or 1, slide_count))
+
+
+def render_slides(prs, render, slide_options, slide_class, metrics, isolation, run_styles=None, images=None,
+                  budget=None):
+    """
+    Render every slide of ``prs`` in this process with ``render`` (a converter's
+    ``_render_slide``). Yields (structure signature, markup parts) per slide;
+    a slide that failed under ``isolation`` yields (None, [placeholder]).
+    """
+    for i, slide in enumerate(prs.slides):
+        if budget is not None:
+            budget.check(f"on slide {i+1}")
+        with metrics.slide(i + 1), isolation.slide(i + 1) as attempt:
+            signature, parts = render(slide, metrics=metrics, run_styles=run_styles, images=images,
+                                      checkpoint=attempt.checkpoint, **slide_options)
+        if attempt.failed:
+            signature, parts = None, [failed_slide_html(i + 1, attempt.error, slide_class)]
+        yield signature, parts
+
+
+class SharedPackage:
+    """
+    The parts of a package in a shared memory segment: ``index`` maps each
+    partname to its content type and the (offset, size) of its content and of
+    its relationships XML. ``share`` creates the segment, workers attach to it.
+    """
+
+    def __init__(self, segment, index):
+        self.segment = segment
+        self.index = index
+        self._package = Package(None)
+        self._parts = {}
+
+    @classmethod
+    def share(cls, ppt_path, package):
+        """Copy the parts python-pptx loaded in ``package`` from the file at ``ppt_path``"""
+        with zipfile.ZipFile(ppt_path) as source:
+            sizes = {info.filename: info.file_size for info in source.infolist()}
+            members = {part.partname: (part.content_type, part.partname.membername, part.partname.rels_uri.membername)
+                       for part in package.iter_parts()}
+            total = sum(sizes.get(name, 0) for _, member, rels_member in members.values()
+                        for name in (member, rels_member))
+            segment = shared_memory.SharedMemory(create=True, size=max(total, 1))
+            index, offset = {}, 0
+            try:
+                for partname, (content_type, member, rels_member) in members.items():
+                    spans = []
+                    for name in (member, rels_member):
+                        if name not in sizes:
+                            spans.append(None)
+                            continue
+                        data = source.read(name)
+                        segment.buf[offset:offset + len(data)] = data
+                        spans.append((offset, len(data)))
+                        offset += len(data)
+                    index[partname] = (content_type, *spans)
+            except BaseException:
+                segment.close()
+                segment.unlink()
+                raise
+        return cls(segment, index)
+
+    @classmethod
+    def attach(cls, segment_name, index):
+        return cls(shared_memory.SharedMemory(name=segment_name), index)
+
+    def _bytes(self, span):
+        offset, size = span
+        return bytes(self.segment.buf[offset:offset + size])
+
+    def read(self, partname, decoded_bytes=0):
+        """Content of the part ``partname``, as ``PackageMedia.read`` gives it"""
+        return self._bytes(self.index[partname][1])
+
+    def slide(self, partname):
+        """
+        The Slide ``partname``, loaded with every part it refers to directly or
+        indirectly except other slides. Media parts are loaded empty, pictures
+        are read through ``read``.
+        """
+        if partname not in self._parts:
+            loaded = {}
+            pending = [PackURI(partname)]
+            while pending:
+                name = pending.pop()
+                if name in self._parts or name in loaded:
+                    continue
+                content_type, span, rels_span = self.index[name]
+                blob = b'' if is_media_part(name.membername) else self._bytes(span)
+                rels = parse_xml(self._bytes(rels_span)) if rels_span else CT_Relationships.new()
+                loaded[name] = (PartFactory(name, content_type, self._package, blob), rels)
+                for rel in rels.relationship_lst:
+                    if rel.targetMode == RTM.EXTERNAL:
+                        continue
+                    target = PackURI.from_rel_ref(name.baseURI, rel.target_ref)
+                    if target in self.index and self.index[target][0] != CT.PML_SLIDE:
+                        pending.append(target)
+            self._parts.update((name, part) for name, (part, _) in loaded.items())
+            for part, rels in loaded.values():
+                part.load_rels_from_xml(rels, self._parts)
+        return self._parts[partname].slide
+
+    def close(self):
+        self.segment.close()
+
+
+def _init_worker(segment_name, index, slides, render, settings):
+    _worker['package'] = SharedPackage.attach(segment_name, index)
+    _worker['slides'] = slides
+    _worker['render'] = render
+    _worker.update(settings)
+    if _worker['images'] is not None:
+        # Pictures come from the segment, the slide parts are loaded without them
+        _worker['images'].media = _worker['package']
+
+
+def _render_chunk(numbers):
+    """Worker: render the slides ``numbers`` (0-based) as ``render_slides`` would"""
+    package = _worker['package']
+    run_styles = _worker['run_styles']
+    images = _worker['images']
+    metrics = ConversionMetrics(_worker['name'])
+    isolation = SlideIsolation(_worker['isolate'], _worker['timeout'])
+    results = []
+    output = io.StringIO()
+    with redirect_stdout(output):
+        for number in numbers:
+            start = len(run_styles) if run_styles is not None else 0
+            with metrics.slide(number + 1), isolation.slide(number + 1) as attempt:
+                slide = package.slide(_worker['slides'][number])
+                signature, parts = _worker['render'](slide, metrics=metrics, run_styles=run_styles,
+                                                     images=images, checkpoint=attempt.checkpoint,
+                                                     **_worker['slide_options'])
+            if attempt.failed:
+                signature, parts = None, [failed_slide_html(number + 1, attempt.error, _worker['slide_class'])]
+            # Rules this worker registered first on this slide; the parent dedupes across workers
+            results.append((signature, parts, run_styles.rules(start) if run_styles is not None else ()))
+    # Encoded by the parent, once per image whichever workers planned it
+    planned = images.planned() if images is not None else None
+    return results, isolation.errors, metrics, planned, output.getvalue()
+
+
+def render_parallel(ppt_path, slides, render, slide_options, slide_class, metrics, isolation, workers,
+                    run_styles=None, images=None):
+    """
+    ``render_slides`` of ``slides`` (of a Presentation of the deck at
+    ``ppt_path``) across ``workers`` processes. ``run_styles``, ``images`` and
+    ``isolation`` of the parent are filled in with what the workers registered,
+    planned and recorded.
+    """
+    partnames = [slide.part.partname for slide in slides]
+    slide_count = len(partnames)
+    package = SharedPackage.share(ppt_path, slides.part.package)
+    try:
+        chunk = -(-slide_count // (workers * CHUNKS_PER_WORKER))
+        chunks = [range(start, min(start + chunk, slide_count)) for start in range(0, slide_count, chunk)]
+        settings = {
+            'name': metrics.name,
+            'slide_options': slide_options,
+            'slide_class': slide_class,
+            'isolate': isolation.enabled,
+            'timeout': isolation.timeout,
+            # Still empty here: each worker gets its own copy to fill
+            'run_styles': run_styles,
+            'images': images,
+        }
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker,
+                                 initargs=(package.segment.name, package.index, partnames, render, settings)) as pool:
+            for results, errors, chunk_metrics, planned, output in pool.map(_render_chunk, chunks):
+                sys.stdout.write(output)
+                metrics.merge(chunk_metrics)
+                isolation.errors.extend(errors)
+                if images is not None:
+                    images.adopt(planned, package)
+                for signature, parts, rules in results:
+                    if run_styles is not None:
+                        run_styles.adopt(rules)
+                    yield signature, parts
+    finally:
+        package.close()
+        package.segment.unlink()
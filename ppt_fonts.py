@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Deck-wide font subsetting for the HTML converters
+
+The converters used to hard-code ``font-family: Arial``. ``deck_font_css``
+collects the exact characters each typeface renders across a deck (theme
+fonts resolved, East Asian text attributed to the ``a:ea`` font), finds the
+font files on this machine, subsets them to those characters and writes
+WOFF2 files referenced from ``@font-face`` rules.
+
+Subsets are cached by (font file hash, glyph set hash): a second conversion
+of the same deck, or a sibling deck using the same characters, reuses the
+file already in the cache directory. fontTools (and brotli for WOFF2) are
+optional; without them the CSS still names the deck's fonts so browsers use
+locally installed copies.
+"""
+
+import os
+import re
+import json
+import logging
+import hashlib
+
+from atomic_io import atomic_writer
+from ppt_shape_walker import iter_leaf_shapes
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+
+RT_THEME = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme'
+
+# Where font files are looked up, in order; the repo's own src/fonts comes first
+FONT_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'fonts'),
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'),
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    '/Library/Fonts',
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+]
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc')
+
+FALLBACK_STACK = 'Arial, sans-serif'
+
+INDEX_FILE = 'font_index.json'
+# Bumped when the per-face data kept in the index changes
+INDEX_VERSION = 2
+
+REGULAR, BOLD = 400, 700
+
+
+def _is_east_asian(char):
+    code = ord(char)
+    return (0x2E80 <= code <= 0x9FFF or 0xAC00 <= code <= 0xD7AF or
+            0xF900 <= code <= 0xFAFF or 0xFE30 <= code <= 0xFE4F or
+            0xFF00 <= code <= 0xFFEF or code >= 0x20000)
+
+
+def theme_fonts(prs):
+    """{'+mj-lt': typeface, '+mj-ea': ..., '+mn-lt': ..., '+mn-ea': ...} from the first master's theme"""
+    fonts = {}
+    try:
+        theme_part = prs.slide_masters[0].part.part_related_by(RT_THEME)
+    except (IndexError, KeyError):
+        return fonts
+    from lxml import etree
+    theme = etree.fromstring(theme_part.blob)
+    for prefix, tag in (('+mj', 'majorFont'), ('+mn', 'minorFont')):
+        font = theme.find('.//' + _A + tag)
+        if font is None:
+            continue
+        for script, child in (('lt', 'latin'), ('ea', 'ea')):
+            el = font.find(_A + child)
+            if el is not None and el.get('typeface'):
+                fonts[f'{prefix}-{script}'] = el.get('typeface')
+    return fonts
+
+
+def _is_title(shape):
+    ph = shape._element.find('.//' + _P + 'ph')
+    return ph is not None and ph.get('type') in ('title', 'ctrTitle')
+
+
+def _flag(value, default):
+    return default if value is None else value in ('1', 'true')
+
+
+def collect_deck_glyphs(prs):
+    """
+    Map every (typeface, weight, italic) used in ``prs`` to the set of characters it renders.
+
+    Runs without an explicit typeface use the theme's major font in title
+    placeholders and the minor font elsewhere. Characters in CJK, kana and
+    hangul ranges are attributed to the East Asian font of the run. Titles
+    are bold unless the run says otherwise, as the converters' headings are.
+    """
+    theme = theme_fonts(prs)
+    glyphs = {}
+
+    def resolve(typeface, script, title):
+        if not typeface:
+            typeface = ('+mj-' if title else '+mn-') + script
+        return theme.get(typeface, None if typeface.startswith('+') else typeface)
+
+    for slide in prs.slides:
+        for shape, _box in iter_leaf_shapes(slide.shapes):
+            title = _is_title(shape)
+            for run in shape._element.iter(_A + 'r', _A + 'fld'):
+                t = run.find(_A + 't')
+                if t is None or not t.text:
+                    continue
+                rpr = run.find(_A + 'rPr')
+                latin = ea = None
+                bold, italic = title, False
+                if rpr is not None:
+                    bold = _flag(rpr.get('b'), title)
+                    italic = _flag(rpr.get('i'), False)
+                    el = rpr.find(_A + 'latin')
+                    latin = el.get('typeface') if el is not None else None
+                    el = rpr.find(_A + 'ea')
+                    ea = el.get('typeface') if el is not None else None
+                for char in t.text:
+                    if char.isspace():
+                        continue
+                    if _is_east_asian(char):
+                        face = resolve(ea, 'ea', title)
+                    else:
+                        face = resolve(latin, 'lt', title)
+                    if face:
+                        glyphs.setdefault((face, BOLD if bold else REGULAR, italic), set()).add(char)
+    return glyphs
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FontIndex:
+    """
+    Family name -> faces (font file, face index, weight, italic) of the fonts on this machine.
+
+    Reading name tables is slow, so the index is kept in ``cache_dir`` and
+    only files whose size or mtime changed are re-read.
+    """
+
+    def __init__(self, font_dirs=None, cache_dir=None):
+        self.font_dirs = [d for d in (font_dirs or FONT_DIRS) if os.path.isdir(d)]
+        self.cache_path = os.path.join(cache_dir, INDEX_FILE) if cache_dir else None
+        self._files = {}
+        self._families = None
+
+    def _load(self):
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._files = json.load(f)
+            except (OSError, ValueError):
+                self._files = {}
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with atomic_writer(self.cache_path) as f:
+            json.dump(self._files, f, ensure_ascii=False)
+
+    @staticmethod
+    def _read_families(path):
+        from fontTools.ttLib import TTCollection, TTFont
+        if path.lower().endswith(('.ttc', '.otc')):
+            fonts = TTCollection(path, lazy=True).fonts
+        else:
+            fonts = [TTFont(path, lazy=True)]
+        faces = []
+        for number, font in enumerate(fonts):
+            names = set()
+            for record in font['name'].names:
+                if record.nameID in (1, 4, 16):
+                    try:
+                        names.add(record.toUnicode())
+                    except UnicodeDecodeError:
+                        continue
+            mac_style = font['head'].macStyle if 'head' in font else 0
+            if 'OS/2' in font:
+                weight = font['OS/2'].usWeightClass
+                italic = bool(font['OS/2'].fsSelection & 1 or mac_style & 2)
+            else:
+                weight = BOLD if mac_style & 1 else REGULAR
+                italic = bool(mac_style & 2)
+            faces.append({'number': number, 'names': sorted(names), 'weight': weight, 'italic': italic})
+        return faces
+
+    def _scan(self):
+        self._load()
+        seen = {}
+        changed = False
+        for directory in self.font_dirs:
+            for root, _dirs, files in os.walk(directory):
+                for name in files:
+                    if not name.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    stamp = [st.st_size, st.st_mtime_ns]
+                    entry = self._files.get(path)
+                    if entry is None or entry['stamp'] != stamp or entry.get('version') != INDEX_VERSION:
+                        try:
+                            faces = self._read_families(path)
+                        except Exception:
+                            faces = []
+                        entry = {'version': INDEX_VERSION, 'stamp': stamp, 'faces': faces, 'sha256': None}
+                        changed = True
+                    seen[path] = entry
+        changed = changed or len(seen) != len(self._files)
+        self._files = seen
+        self._families = {}
+        for path, entry in self._files.items():
+            for face in entry['faces']:
+                found = (path, face['number'], face['weight'], face['italic'])
+                for family in face['names']:
+                    faces = self._families.setdefault(family.casefold(), [])
+                    if found not in faces:
+                        faces.append(found)
+        if changed:
+            self._save()
+
+    def find(self, family, weight=REGULAR, italic=False):
+        """
+        (path, face number, sha256, weight, italic) of the face of ``family``
+        closest to ``weight`` and ``italic``, or None if no face has that name.
+        """
+        if self._families is None:
+            self._scan()
+        faces = self._families.get(family.casefold())
+        if not faces:
+            return None
+        # The right slant first, then the nearest weight, the lighter one on a tie
+        path, number, face_weight, face_italic = min(
+            faces, key=lambda face: (face[3] != italic, abs(face[2] - weight), face[2], face[0]))
+        entry = self._files[path]
+        if entry['sha256'] is None:
+            entry['sha256'] = _file_digest(path)
+            self._save()
+        return path, number, entry['sha256'], face_weight, face_italic
+
+
+def glyph_set_digest(chars):
+    return hashlib.sha256(''.join(sorted(chars)).encode('utf-8')).hexdigest()
+
+
+def _slug(family):
+    return re.sub(r'[^A-Za-z0-9]+', '-', family).strip('-').lower() or 'font'
+
+
+def subset_font(font, family, chars, cache_dir):
+    """
+    Subset one font to ``chars`` and return the path of the WOFF2 (or WOFF) file.
+
+    ``font`` is a FontIndex.find result. An existing file for the same
+    (font hash, glyph set hash) is returned without touching the font.
+    """
+    path, number, font_digest = font[:3]
+    glyph_digest = glyph_set_digest(chars)
+    stem = f'{_slug(family)}-{font_digest[:12]}-{glyph_digest[:12]}'
+    for ext in ('.woff2', '.woff'):
+        cached = os.path.join(cache_dir, stem + ext)
+        if os.path.exists(cached):
+            return cached
+
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    # Tables fontTools cannot subset are dropped; that is expected for web fonts
+    logging.getLogger('fontTools.subset').setLevel(logging.ERROR)
+    try:
+        import brotli  # noqa: F401  (fontTools needs it to write WOFF2)
+        flavor = 'woff2'
+    except ImportError:
+        flavor = 'woff'
+
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    tt = TTFont(path, fontNumber=number, recalcBBoxes=False, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes={ord(char) for char in chars})
+    subsetter.subset(tt)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    output = os.path.join(cache_dir, f'{stem}.{flavor}')
+    with atomic_writer(output, 'wb') as f:
+        subset.save_font(tt, f, options)
+    return output
+
+
+def _family_stack(*families):
+    names = []
+    for family in families:
+        if family and family not in names:
+            names.append(family)
+    return ', '.join([f'"{name}"' for name in names] + [FALLBACK_STACK])
+
+
+def deck_font_css(prs, html_path, cache_dir=None, font_dirs=None, metrics=None):
+    """
+    CSS that embeds the subsetted fonts of ``prs`` into the HTML at ``html_path``.
+
+    ``cache_dir`` defaults to a ``fonts`` directory next to the HTML, which
+    sibling decks converted into the same directory share. Returns the CSS
+    text (``@font-face`` rules plus body and heading font stacks).
+    """
+    html_dir = os.path.dirname(os.path.abspath(html_path))
+    cache_dir = os.path.abspath(cache_dir or os.path.join(html_dir, 'fonts'))
+    glyphs = collect_deck_glyphs(prs)
+    theme = theme_fonts(prs)
+
+    rules = []
+    try:
+        import fontTools  # noqa: F401
+        index = FontIndex(font_dirs, cache_dir)
+    except ImportError:
+        index = None
+        print("⚠️  fontTools is not installed; fonts are referenced by name only")
+
+    families = sorted({family for family, _weight, _italic in glyphs})
+    # Styles without a face of their own share the nearest one, which the browser then synthesizes
+    faces = {}
+    missing = set()
+    for family, weight, italic in sorted(glyphs):
+        font = index.find(family, weight, italic) if index is not None else None
+        if font is None:
+            if index is not None and family not in missing:
+                print(f"⚠️  Font not found, using local fallback: {family}")
+            missing.add(family)
+            continue
+        faces.setdefault((family, font[:2]), [font, set()])[1].update(glyphs[family, weight, italic])
+
+    for (family, _face), (font, chars) in faces.items():
+        subset_path = subset_font(font, family, chars, cache_dir)
+        url = os.path.relpath(subset_path, html_dir).replace(os.sep, '/')
+        fmt = 'woff2' if subset_path.endswith('.woff2') else 'woff'
+        if metrics is not None:
+            metrics.count('font_subset_bytes', os.path.getsize(subset_path))
+        rules.append(f'''
+        @font-face {{
+            font-family: "{family}";
+            src: url("{url}") format("{fmt}");
+            font-weight: {font[3]};
+            font-style: {'italic' if font[4] else 'normal'};
+            font-display: swap;
+        }}''')
+
+    body_stack = _family_stack(theme.get('+mn-lt'), theme.get('+mn-ea'),
+                               *(f for f in families if f not in theme.values()))
+    heading_stack = _family_stack(theme.get('+mj-lt'), theme.get('+mj-ea'))
+    rules.append(f'''
+        body {{
+            font-family: {body_stack};
+        }}
+
+        h1, h2 {{
+            font-family: {heading_stack};
+        }}
+        ''')
+    return ''.join(rules)
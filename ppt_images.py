@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Export picture shapes at their displayed size
+
+Decks routinely embed multi-megapixel photos shown in a box a few hundred
+pixels wide. ``DeckImages`` gives every picture shape an output sized to its
+extent on the HTML canvas (times ``density``, never upscaled, after the
+shape's crop), encoded as WebP or AVIF with a JPEG fallback (PNG when the
+image has transparency) for browsers without the modern format.
+
+Outputs are named after the image content, crop and target size, so they are
+shared between slides and decks and only missing files are encoded. The
+markup is known as soon as a picture is planned; the encoding itself runs
+afterwards in ``run``, across a process pool. Under a memory budget the
+package's media is stripped; pictures are then read back through a
+``PackageMedia`` one at a time, and encoded one at a time in this process.
+"""
+
+import io
+import os
+import math
+import hashlib
+from collections import namedtuple
+from html import escape
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_io import atomic_write
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+HASH_LENGTH = 16
+
+# A planned image whose source is read back from the package when it is encoded
+MediaPart = namedtuple('MediaPart', 'partname decoded_bytes')
+
+# Encoder settings of each output format: (PIL format, file extension, MIME type, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 60}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'png', 'image/png', {'optimize': True}),
+}
+
+# Added to the converters' CSS when pictures are exported
+IMAGE_CSS = '''
+        .picture-box img {
+            display: block;
+            max-width: 100%;
+            height: auto;
+        }
+
+        .slide.positioned .picture-box img {
+            width: 100%;
+            height: 100%;
+            max-width: none;
+        }
+        '''
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def _crop(picture):
+    """The picture's crop as (left, top, right, bottom) fractions, clamped to the image"""
+    crop = []
+    for name in ('crop_left', 'crop_top', 'crop_right', 'crop_bottom'):
+        try:
+            value = getattr(picture, name) or 0.0
+        except (AttributeError, ValueError):
+            value = 0.0
+        crop.append(round(min(max(value, 0.0), 1.0), 4))
+    if crop[0] + crop[2] >= 1 or crop[1] + crop[3] >= 1:
+        return (0.0, 0.0, 0.0, 0.0)
+    return tuple(crop)
+
+
+def encode_image(job):
+    """
+    Worker: crop, resample and encode one image to each of its outputs.
+    ``job`` is (blob, crop, (width, height), [(path, format), ...]); returns bytes written.
+    """
+    blob, crop, size, outputs = job
+    with Image.open(io.BytesIO(blob)) as image:
+        alpha = _has_alpha(image)
+        # JPEG sources decode directly at a reduced scale when far larger than needed
+        image.draft('RGB', (math.ceil(size[0] / (1 - crop[0] - crop[2])),
+                            math.ceil(size[1] / (1 - crop[1] - crop[3]))))
+        image = image.convert('RGBA' if alpha else 'RGB')
+        if any(crop):
+            left, top, right, bottom = crop
+            width, height = image.size
+            image = image.crop((round(left * width), round(top * height),
+                                round(width * (1 - right)), round(height * (1 - bottom))))
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        written = 0
+        for path, image_format in outputs:
+            pil_format, _ext, _mime, options = FORMATS[image_format]
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            atomic_write(path, buffer.getvalue())
+            written += buffer.tell()
+    return written
+
+
+class DeckImages:
+    """
+    Pictures of one conversion: planned while walking slides, encoded by ``run``.
+    ``media`` (a PackageMedia) supplies the images of a package opened without them.
+    """
+
+    def __init__(self, image_dir, document_path, density=1.0, image_format='webp', media=None):
+        self.image_dir = os.path.abspath(image_dir)
+        self.media = media
+        self._base = os.path.dirname(os.path.abspath(document_path))
+        self.density = density
+        self.image_format = image_format
+        if Image is not None and not features.check(FORMATS[image_format][0].lower()):
+            print(f"⚠️  This Pillow build cannot write {image_format.upper()}; writing fallback images only")
+            self.image_format = None
+        self._sources = {}
+        self._jobs = {}
+        # Bytes of each source image read for the planned outputs, by sha256
+        self._read = {}
+
+    def _source(self, blob):
+        """(sha256, width, height, has alpha) of an image blob, or None if it cannot be decoded"""
+        digest = hashlib.sha256(blob).hexdigest()
+        if digest not in self._sources:
+            try:
+                # Only the header is read here
+                with Image.open(io.BytesIO(blob)) as image:
+                    self._sources[digest] = (digest, image.size[0], image.size[1], _has_alpha(image))
+            except Exception:
+                self._sources[digest] = None
+        return self._sources[digest]
+
+    def _url(self, path):
+        return os.path.relpath(path, self._base).replace(os.sep, '/')
+
+    def add(self, picture, box):
+        """
+        Plan the output of a picture shape displayed in ``box`` (x, y, width, height
+        on the canvas). Returns the image dict for ``picture_html``, or None when
+        the picture has no decodable raster image (SVG/EMF, media not loaded).
+        """
+        if Image is None:
+            return None
+        try:
+            blob = picture.image.blob
+            partname = picture.part.related_part(picture._element.blip_rId).partname if not blob else None
+        except Exception:
+            return None
+        if not blob and self.media is not None:
+            # Budget violations propagate: they concern the whole conversion
+            blob = self.media.read(partname)
+        source = self._source(blob) if blob else None
+        if source is None:
+            return None
+        digest, source_width, source_height, alpha = source
+        crop = _crop(picture)
+        visible_width = source_width * (1 - crop[0] - crop[2])
+        visible_height = source_height * (1 - crop[1] - crop[3])
+        size = (max(1, min(math.ceil(box[2] * self.density), round(visible_width))),
+                max(1, min(math.ceil(box[3] * self.density), round(visible_height))))
+        if any(crop):
+            digest = hashlib.sha256(f'{digest}:{crop}'.encode('ascii')).hexdigest()
+        stem = os.path.join(self.image_dir, f'img-{digest[:HASH_LENGTH]}-{size[0]}x{size[1]}')
+
+        fallback = 'png' if alpha else 'jpeg'
+        formats = [self.image_format, fallback] if self.image_format else [fallback]
+        outputs = [(f'{stem}.{FORMATS[image_format][1]}', image_format) for image_format in formats]
+        missing = [output for output in outputs if not os.path.exists(output[0])]
+        if missing and stem not in self._jobs:
+            if partname is not None:
+                # Not kept in memory until encoding; decoding takes about 4 bytes per pixel
+                self._jobs[stem] = (MediaPart(partname, source_width * source_height * 4), crop, size, missing)
+            else:
+                self._jobs[stem] = (blob, crop, size, missing)
+            self._read.setdefault(source[0], len(blob))
+
+        descr = picture._element.xpath('./p:nvPicPr/p:cNvPr/@descr')
+        return {
+            'sources': [(self._url(path), FORMATS[image_format][2]) for path, image_format in outputs[:-1]],
+            'src': self._url(outputs[-1][0]),
+            'width': size[0],
+            'height': size[1],
+            'alt': descr[0] if descr else '',
+        }
+
+    def encode(self, jobs=None):
+        """
+        Encode every planned image that is not on disk yet, in up to ``jobs``
+        processes. Returns (images encoded, source bytes read, bytes written).
+        """
+        pending = list(self._jobs.values())
+        self._jobs = {}
+        if not pending:
+            return (0, 0, 0)
+        os.makedirs(self.image_dir, exist_ok=True)
+        workers = min(jobs or os.cpu_count() or 1, len(pending))
+        if self.media is not None:
+            # Read back and encoded one at a time, within the memory budget
+            written = 0
+            for source, crop, size, outputs in pending:
+                if isinstance(source, MediaPart):
+                    source = self.media.read(source.partname, source.decoded_bytes)
+                written += encode_image((source, crop, size, outputs))
+                del source
+        elif workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                written = sum(pool.map(encode_image, pending))
+        else:
+            written = sum(encode_image(job) for job in pending)
+        encoded = (len(pending), sum(self._read.values()), written)
+        self._read = {}
+        return encoded
+
+    def planned(self):
+        """Hand over the images planned so far, as (jobs, source bytes read), and forget them"""
+        planned = (self._jobs, self._read)
+        self._jobs, self._read = {}, {}
+        return planned
+
+    def adopt(self, planned, media=None):
+        """
+        Add what another DeckImages ``planned``, for this one to encode; an image
+        planned by both is encoded once. ``media`` supplies MediaPart sources.
+        """
+        jobs, read = planned
+        for stem, job in jobs.items():
+            if stem in self._jobs:
+                continue
+            if isinstance(job[0], MediaPart) and media is not None:
+                job = (media.read(job[0].partname),) + job[1:]
+            self._jobs[stem] = job
+        for digest, size in read.items():
+            self._read.setdefault(digest, size)
+
+    def run(self, jobs=None, metrics=None):
+        """``encode`` and report the result"""
+        encoded = self.encode(jobs)
+        report_encoded(encoded, metrics)
+        return encoded[0]
+
+
+def report_encoded(encoded, metrics=None):
+    """Record and print an (images, source bytes, bytes written) result of ``DeckImages.encode``"""
+    count, source_bytes, written = encoded
+    if not count:
+        return
+    if metrics is not None:
+        metrics.count('images_encoded', count)
+        metrics.count('image_source_bytes', source_bytes)
+        metrics.count('image_output_bytes', written)
+    print(f"🖼️  Encoded {count} images: {source_bytes / 1024:.0f} KB of sources -> {written / 1024:.0f} KB")
+
+
+def resolve_pictures(blocks, images):
+    """Replace the shape of each picture block by its planned image dict (None without ``images``)"""
+    return [(block_type, (images.add(content, box) if images is not None else None)
+             if block_type == 'picture' else content, box)
+            for block_type, content, box in blocks]
+
+
+def picture_html(image, style=''):
+    """Markup of an exported picture: modern format sources with an <img> fallback"""
+    sources = ''.join(f'<source srcset="{escape(url)}" type="{mime}">' for url, mime in image['sources'])
+    return (f'            <div class="picture-box"{style}>\n'
+            f'                <picture>{sources}<img src="{escape(image["src"])}" width="{image["width"]}" '
+            f'height="{image["height"]}" alt="{escape(image["alt"])}" loading="lazy" decoding="async"></picture>\n'
+            f'            </div>')
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Theme palette extraction from a deck's embedded images
+
+Many templates carry their identity in background and decoration images
+rather than in theme XML, while the converters' theme colours (``#1a365d``
+and friends) are typed in by hand. ``deck_palette`` downsamples every raster
+image of a deck, clusters its pixels with a NumPy-vectorised k-means and
+merges the per-image clusters into one palette with dominant, accent and
+background roles; ``themed_styles`` maps those roles onto the converters'
+theme dict.
+
+Per-image palettes are cached by image content hash in ``cache_dir``, so a
+background shared by every template of a library is analysed once.
+NumPy and Pillow are optional; without them no palette is derived.
+"""
+
+import os
+import io
+import copy
+import json
+import hashlib
+
+from atomic_io import atomic_write
+
+# Images are reduced to at most this many pixels per side before clustering
+SAMPLE_SIZE = 64
+CLUSTERS = 5
+MAX_ITERATIONS = 20
+CACHE_VERSION = 1
+
+RASTER_TYPES = ('image/png', 'image/jpeg', 'image/gif', 'image/bmp', 'image/tiff', 'image/webp')
+
+
+def kmeans(points, k, weights=None, iterations=MAX_ITERATIONS, seed=0):
+    """
+    Weighted k-means over an (n, 3) array, k-means++ seeded and deterministic.
+    Returns (centers, shares) with shares summing to 1, largest first.
+    """
+    import numpy as np
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=np.float64)
+    k = min(k, len(points))
+    rng = np.random.default_rng(seed)
+
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    nearest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        probabilities = nearest * weights
+        if probabilities.sum() <= 0:
+            break
+        centers.append(points[rng.choice(len(points), p=probabilities / probabilities.sum())])
+        nearest = np.minimum(nearest, ((points - centers[-1]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=weights * points[:, c], minlength=len(centers))
+                         for c in range(3)], axis=1)
+        updated = np.where(totals[:, None] > 0, sums / np.maximum(totals, 1e-12)[:, None], centers)
+        converged = np.abs(updated - centers).max() < 0.5
+        centers = updated
+        if converged:
+            break
+
+    distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    totals = np.bincount(distances.argmin(axis=1), weights=weights, minlength=len(centers))
+    order = np.argsort(-totals)
+    return centers[order], totals[order] / totals.sum()
+
+
+def _to_hex(rgb):
+    return '#{:02x}{:02x}{:02x}'.format(*(int(round(min(max(c, 0), 255))) for c in rgb))
+
+
+def _to_rgb(hex_color):
+    return tuple(int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def image_palette(blob, k=CLUSTERS):
+    """[{'color': '#rrggbb', 'share': float}] of one image, or [] if it cannot be decoded"""
+    import numpy as np
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(blob)) as image:
+            image.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+            image = image.convert('RGBA')
+            image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+            pixels = np.asarray(image, dtype=np.uint8).reshape(-1, 4)
+    except Exception:
+        return []
+    # Transparent pixels show whatever is behind the image
+    pixels = pixels[pixels[:, 3] >= 128, :3]
+    if not len(pixels):
+        return []
+    # Cluster distinct colours weighted by their pixel counts
+    packed = (pixels[:, 0].astype(np.uint32) << 16) | (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 2]
+    colors, counts = np.unique(packed, return_counts=True)
+    points = np.stack([(colors >> 16) & 255, (colors >> 8) & 255, colors & 255], axis=1)
+    centers, shares = kmeans(points, k, counts)
+    return [{'color': _to_hex(center), 'share': round(float(share), 4)}
+            for center, share in zip(centers, shares)]
+
+
+class PaletteCache:
+    """Per-image palettes stored as ``<sha256>.json`` files in ``cache_dir``"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._memory = {}
+
+    def get(self, blob, k=CLUSTERS, metrics=None):
+        digest = hashlib.sha256(blob).hexdigest()
+        key = f'{digest}-k{k}-v{CACHE_VERSION}'
+        if key in self._memory:
+            return self._memory[key]
+        path = os.path.join(self.cache_dir, f'{key}.json') if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    palette = self._memory[key] = json.load(f)
+                return palette
+            except (OSError, ValueError):
+                pass
+        palette = self._memory[key] = image_palette(blob, k)
+        if metrics is not None:
+            metrics.count('palette_images_analyzed')
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(path, json.dumps(palette))
+        return palette
+
+
+def _luminance(rgb):
+    return (0.2126 * rgb[0] + 0.7152 * rgb[1] + 0.0722 * rgb[2]) / 255
+
+
+def _saturation(rgb):
+    high, low = max(rgb), min(rgb)
+    return (high - low) / high if high else 0.0
+
+
+def deck_images(prs):
+    """Distinct raster image blobs of a deck (slides, layouts and masters)"""
+    seen = set()
+    for part in prs.part.package.iter_parts():
+        # Slide media only; the package thumbnail is a rendering of the first slide
+        if (part.content_type in RASTER_TYPES and part.partname.startswith('/ppt/media/')
+                and part.partname not in seen):
+            seen.add(part.partname)
+            blob = part.blob
+            # Media stripped by a memory-budgeted load
+            if blob:
+                yield blob
+
+
+def deck_palette(prs, cache_dir=None, k=CLUSTERS, metrics=None):
+    """
+    Palette of a deck's imagery, or None when it has no usable images or
+    NumPy/Pillow are missing:
+    {'colors': [{'color', 'share'}], 'dominant', 'accent', 'background'}
+    """
+    try:
+        import numpy as np
+        import PIL  # noqa: F401
+    except ImportError:
+        print("⚠️  numpy and Pillow are needed to derive a palette; keeping the default theme")
+        return None
+    cache = PaletteCache(cache_dir)
+    points, weights = [], []
+    for blob in deck_images(prs):
+        # Every image counts equally, whatever its pixel count
+        for entry in cache.get(blob, k, metrics):
+            points.append(_to_rgb(entry['color']))
+            weights.append(entry['share'])
+    if not points:
+        return None
+    centers, shares = kmeans(np.array(points), k, np.array(weights))
+    colors = [{'color': _to_hex(center), 'share': round(float(share), 4)}
+              for center, share in zip(centers, shares)]
+    rgbs = [_to_rgb(entry['color']) for entry in colors]
+
+    light = [i for i, rgb in enumerate(rgbs) if _luminance(rgb) > 0.85]
+    chromatic = [i for i, rgb in enumerate(rgbs) if 0.08 < _luminance(rgb) < 0.85 and _saturation(rgb) > 0.2]
+    dominant = chromatic[0] if chromatic else None
+    accent = None
+    if chromatic:
+        candidates = [i for i in chromatic[1:] if colors[i]['share'] >= 0.05
+                      and sum((a - b) ** 2 for a, b in zip(rgbs[i], rgbs[dominant])) > 60 ** 2]
+        if candidates:
+            accent = max(candidates, key=lambda i: _saturation(rgbs[i]))
+    return {
+        'colors': colors,
+        'dominant': colors[dominant]['color'] if dominant is not None else None,
+        'accent': colors[accent]['color'] if accent is not None else None,
+        'background': colors[light[0]]['color'] if light else None,
+    }
+
+
+def _rgba(hex_color, alpha):
+    r, g, b = _to_rgb(hex_color)
+    return f'rgba({r}, {g}, {b}, {alpha})'
+
+
+def themed_styles(palette, base):
+    """Copy of the theme dict ``base`` with its colours taken from ``palette`` where it has them"""
+    styles = copy.deepcopy(base)
+    if not palette:
+        return styles
+    dominant = palette.get('dominant')
+    if dominant:
+        on_dominant = '#ffffff' if _luminance(_to_rgb(dominant)) < 0.6 else '#1a1a1a'
+        styles['title_box'].update(background_color=dominant, font_color=on_dominant)
+        styles['subtitle_box'].update(background_color=_rgba(dominant, 0.1), font_color=dominant,
+                                      border_left=f'4px solid {dominant}', border_right=f'4px solid {dominant}')
+        styles['info_box'].update(background_color=_rgba(dominant, 0.05), border=f'1px solid {_rgba(dominant, 0.2)}')
+    accent = palette.get('accent')
+    if accent:
+        styles['content_box']['border'] = f'1px solid {_rgba(accent, 0.4)}'
+    if palette.get('background'):
+        styles['background_color'] = palette['background']
+    return styles
+
+
+def styles_css(styles):
+    """CSS overriding the converter's theme colours with those of ``styles``"""
+    title, subtitle = styles['title_box'], styles['subtitle_box']
+    content, info = styles['content_box'], styles['info_box']
+    return f'''
+        .slide {{
+            background-color: {styles['background_color']};
+        }}
+
+        .title-box {{
+            background-color: {title['background_color']};
+            color: {title['font_color']};
+        }}
+
+        .subtitle-box {{
+            background-color: {subtitle['background_color']};
+            color: {subtitle['font_color']};
+            border-left: {subtitle['border_left']};
+            border-right: {subtitle['border_right']};
+        }}
+
+        .content-box {{
+            border: {content['border']};
+        }}
+
+        .info-box {{
+            background-color: {info['background_color']};
+            border: {info['border']};
+        }}
+        '''
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Flatten slide shape trees into absolutely positioned leaf shapes
+
+``slide.shapes`` only lists top-level shapes, so anything inside a group shape
+is invisible to a plain loop. ``iter_leaf_shapes`` walks the tree with an
+explicit stack (no recursion limit, however deep the nesting) and composes
+each group's child-offset/extent mapping into a scale+translate transform that
+is computed once per group, yielding every leaf with its box in slide EMU.
+"""
+
+from collections import namedtuple
+
+from pptx.shapes.group import GroupShape
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+# Slide geometry in EMU
+Box = namedtuple('Box', 'left top width height')
+
+# x' = sx * x + tx, y' = sy * y + ty
+Transform = namedtuple('Transform', 'sx sy tx ty')
+
+IDENTITY = Transform(1.0, 1.0, 0.0, 0.0)
+
+
+def _xfrm_values(xfrm):
+    """(off_x, off_y, ext_cx, ext_cy, ch_off_x, ch_off_y, ch_ext_cx, ch_ext_cy) of a group a:xfrm"""
+    values = []
+    for tag, attrs in (('off', ('x', 'y')), ('ext', ('cx', 'cy')),
+                       ('chOff', ('x', 'y')), ('chExt', ('cx', 'cy'))):
+        el = xfrm.find(_A + tag)
+        values.extend(int(el.get(a, 0)) if el is not None else 0 for a in attrs)
+    return values
+
+
+def group_transform(group, parent=IDENTITY):
+    """
+    Compose the transform of ``group`` onto ``parent``.
+
+    A group maps its child coordinate space (chOff/chExt) onto its own box
+    (off/ext) in the parent's space; the result maps child coordinates
+    straight to slide coordinates.
+    """
+    xfrm = group._element.find('{http://schemas.openxmlformats.org/presentationml/2006/main}grpSpPr/'
+                               + _A + 'xfrm')
+    if xfrm is None:
+        return parent
+    off_x, off_y, ext_cx, ext_cy, ch_x, ch_y, ch_cx, ch_cy = _xfrm_values(xfrm)
+    # A zero child extent means the group was never resized: children map 1:1
+    sx = ext_cx / ch_cx if ch_cx else 1.0
+    sy = ext_cy / ch_cy if ch_cy else 1.0
+    local = Transform(sx, sy, off_x - ch_x * sx, off_y - ch_y * sy)
+    return Transform(parent.sx * local.sx, parent.sy * local.sy,
+                     parent.sx * local.tx + parent.tx, parent.sy * local.ty + parent.ty)
+
+
+def apply_transform(transform, left, top, width, height):
+    return Box(transform.sx * left + transform.tx, transform.sy * top + transform.ty,
+               transform.sx * width, transform.sy * height)
+
+
+def iter_leaf_shapes(shapes):
+    """
+    Yield ``(shape, Box)`` for every non-group shape below ``shapes`` in z-order.
+
+    Each group's transform is composed once, when the walk enters the group,
+    and shared by all of its children.
+    """
+    # Stack of (shapes iterator, transform); children are consumed lazily so
+    # sibling order is kept without materialising whole subtrees
+    stack = [(iter(shapes), IDENTITY)]
+    while stack:
+        iterator, transform = stack[-1]
+        shape = next(iterator, None)
+        if shape is None:
+            stack.pop()
+            continue
+        if isinstance(shape, GroupShape):
+            stack.append((iter(shape.shapes), group_transform(shape, transform)))
+            continue
+        box = apply_transform(transform, shape.left or 0, shape.top or 0,
+                              shape.width or 0, shape.height or 0)
+        yield shape, box
+
+
+def to_canvas(box, slide_width, slide_height, canvas=(1280, 720)):
+    """Scale an EMU box to (left, top, width, height) pixels on the HTML canvas"""
+    sx = canvas[0] / slide_width
+    sy = canvas[1] / slide_height
+    return (round(box.left * sx, 1), round(box.top * sy, 1),
+            round(box.width * sx, 1), round(box.height * sy, 1))
+
+
+def box_style(box):
+    """Inline style placing an element at a canvas box, for ``.slide.positioned`` slides"""
+    left, top, width, height = box
+    return f' style="left: {left:g}px; top: {top:g}px; width: {width:g}px; height: {height:g}px;"'
+
+
+# Added to the converters' CSS so positioned slides lay blocks out by their boxes
+POSITIONED_CSS = '''
+        .slide.positioned .slide-content > * {
+            position: absolute;
+            margin: 0;
+            max-width: none;
+            overflow: hidden;
+        }
+        '''
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Derive a template's slot configuration from the geometry of its deck
+
+The template builders emit sample HTML, so which parts of a template are
+fillable (title, subtitle, body, picture...) had to be written by hand for
+every template. ``extract_slot_config`` walks each slide once with the shared
+shape walker, classifies every leaf shape from its placeholder type (or its
+position and text when it is not a placeholder), and returns slot ids with
+percent positions plus a page-type guess per slide. It only reads the shape
+tree XML, so a library of hundreds of templates is processed in seconds.
+"""
+
+import sys
+import json
+import argparse
+
+from ppt_shape_walker import iter_leaf_shapes
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_C = '{http://schemas.openxmlformats.org/drawingml/2006/chart}'
+
+SLOT_CONFIG_VERSION = 1
+
+# Placeholder type -> slot kind; None means the placeholder is not a content slot
+PLACEHOLDER_KINDS = {
+    'title': 'title', 'ctrTitle': 'title', 'subTitle': 'subtitle',
+    'body': 'body', 'obj': 'body', 'pic': 'picture', 'clipArt': 'picture',
+    'tbl': 'table', 'chart': 'chart', 'dgm': 'diagram', 'media': 'media',
+    'dt': None, 'ftr': None, 'sldNum': None, 'hdr': None, 'sldImg': None,
+}
+
+TOC_KEYWORDS = ('目录', '目 录', 'contents', 'agenda', 'outline')
+ENDING_KEYWORDS = ('谢谢', '感谢', 'thank', 'q&a', 'the end')
+
+# A non-placeholder text box counts as a title when it is one short line
+# in the top quarter of the slide
+TITLE_MAX_TOP = 0.25
+TITLE_MAX_CHARS = 50
+
+
+def _percent(value, total):
+    return round(value * 100.0 / total, 2) if total else 0.0
+
+
+def _shape_text(element):
+    """Paragraph texts of a shape, read straight from its a:p/a:t elements"""
+    paragraphs = []
+    for p in element.iter(_A + 'p'):
+        paragraphs.append(''.join(t.text or '' for t in p.iter(_A + 't')))
+    return paragraphs
+
+
+def _max_font_pt(element):
+    sizes = [int(rpr.get('sz')) for rpr in element.iter(_A + 'rPr', _A + 'endParaRPr') if rpr.get('sz')]
+    return max(sizes) / 100 if sizes else None
+
+
+def _classify(element, paragraphs, box, slide_height):
+    """Slot kind of one leaf shape, or None for decoration"""
+    ph = element.find('./*/' + _P + 'nvPr/' + _P + 'ph')
+    if ph is not None:
+        return PLACEHOLDER_KINDS.get(ph.get('type', 'obj'), 'body')
+    tag = element.tag
+    if tag == _P + 'pic':
+        return 'picture'
+    if tag == _P + 'graphicFrame':
+        uri = element.find('.//' + _A + 'graphicData')
+        uri = uri.get('uri', '') if uri is not None else ''
+        if uri.endswith('/table'):
+            return 'table'
+        if uri == _C[1:-1]:
+            return 'chart'
+        return 'diagram'
+    text = '\n'.join(paragraphs).strip()
+    if not text:
+        return None
+    lines = [line for line in text.split('\n') if line.strip()]
+    if len(lines) == 1 and len(text) <= TITLE_MAX_CHARS and box.top <= slide_height * TITLE_MAX_TOP:
+        return 'title'
+    return 'body'
+
+
+def _page_type(index, count, slots):
+    """Guess cover / toc / section / ending / content from a slide's slots"""
+    kinds = [slot['kind'] for slot in slots]
+    text = ' '.join(slot.get('sample', '') for slot in slots).lower()
+    if index == count and count > 1 and any(keyword in text for keyword in ENDING_KEYWORDS):
+        return 'ending'
+    if any(keyword in text for keyword in TOC_KEYWORDS):
+        return 'toc'
+    if index == 1 and 'title' in kinds:
+        return 'cover'
+    if 'subtitle' in kinds and 'body' not in kinds:
+        return 'cover' if index == 1 else 'section'
+    content = [kind for kind in kinds if kind not in ('title', 'subtitle')]
+    if 'title' in kinds and not content:
+        return 'section'
+    return 'content'
+
+
+def slide_slots(slide, slide_width, slide_height, index):
+    """Slots of one slide in z-order: [{'id', 'kind', 'left', 'top', 'width', 'height', ...}]"""
+    slots = []
+    counters = {}
+    for shape, box in iter_leaf_shapes(slide.shapes):
+        element = shape._element
+        paragraphs = _shape_text(element)
+        kind = _classify(element, paragraphs, box, slide_height)
+        if kind is None:
+            continue
+        counters[kind] = counters.get(kind, 0) + 1
+        slot = {
+            'id': f's{index}-{kind}-{counters[kind]}',
+            'kind': kind,
+            'left': _percent(box.left, slide_width),
+            'top': _percent(box.top, slide_height),
+            'width': _percent(box.width, slide_width),
+            'height': _percent(box.height, slide_height),
+        }
+        ph = element.find('./*/' + _P + 'nvPr/' + _P + 'ph')
+        if ph is not None:
+            slot['placeholder'] = {'type': ph.get('type', 'obj'), 'idx': int(ph.get('idx', 0))}
+        text = '\n'.join(paragraphs).strip()
+        if text:
+            slot['sample'] = text
+            slot['lines'] = len([p for p in paragraphs if p.strip()])
+        font_pt = _max_font_pt(element)
+        if font_pt:
+            slot['font_size_pt'] = font_pt
+        slots.append(slot)
+    return slots
+
+
+def extract_slot_config(prs, metrics=None):
+    """
+    ``slot_config`` of a parsed deck: slide size, and per slide its layout
+    name, a page-type guess and its slots with percent positions.
+    """
+    width, height = prs.slide_width, prs.slide_height
+    slides = []
+    count = len(prs.slides)
+    for index, slide in enumerate(prs.slides, start=1):
+        slots = slide_slots(slide, width, height, index)
+        slides.append({
+            'index': index,
+            'layout': slide.slide_layout.name,
+            'page_type': _page_type(index, count, slots),
+            'slots': slots,
+        })
+        if metrics is not None:
+            metrics.count('slots', len(slots))
+    return {
+        'version': SLOT_CONFIG_VERSION,
+        'slide_size': {'width_emu': width, 'height_emu': height, 'aspect': round(width / height, 4)},
+        'slides': slides,
+    }
+
+
+def deck_slot_config(pptx_file, prs=None, metrics=None):
+    """``extract_slot_config`` for a file, parsing it unless ``prs`` is already loaded"""
+    if prs is None:
+        from pptx import Presentation
+        prs = Presentation(str(pptx_file))
+    if metrics is None:
+        return extract_slot_config(prs)
+    with metrics.stage('slot_config'):
+        return extract_slot_config(prs, metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the slot configuration derived from a PPTX file')
+    parser.add_argument('pptx_file')
+    parser.add_argument('-o', '--output', help='Write the JSON here instead of stdout')
+    args = parser.parse_args()
+
+    config = deck_slot_config(args.pptx_file)
+    text = json.dumps(config, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        total = sum(len(slide['slots']) for slide in config['slides'])
+        print(f"✅ {total} slots on {len(config['slides'])} slides written to {args.output}")
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
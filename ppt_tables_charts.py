@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Table and chart extraction straight from slide and chart XML
+
+python-pptx exposes tables as cell proxies and charts through plot, series
+and point objects, which is slow for large tables and charts. The functions
+here read the underlying ``a:tbl`` and ``c:chartSpace`` elements in one pass
+and return plain dicts, which are rendered as HTML tables and inline SVG.
+"""
+
+import math
+from html import escape
+
+NS = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'c': 'http://schemas.openxmlformats.org/drawingml/2006/chart',
+}
+
+_A = '{%s}' % NS['a']
+_C = '{%s}' % NS['c']
+
+TAG_TR = _A + 'tr'
+TAG_TC = _A + 'tc'
+TAG_P = _A + 'p'
+TAG_T = _A + 't'
+TAG_BR = _A + 'br'
+
+# Business blue series colors, in the order series are drawn
+CHART_COLORS = ['#0066cc', '#1a365d', '#4da6ff', '#003366', '#7fb3e6', '#4a5568', '#99c2ff', '#2c5282']
+
+CHART_TYPES = {
+    'barChart': 'bar',
+    'bar3DChart': 'bar',
+    'lineChart': 'line',
+    'line3DChart': 'line',
+    'areaChart': 'line',
+    'area3DChart': 'line',
+    'scatterChart': 'line',
+    'radarChart': 'line',
+    'pieChart': 'pie',
+    'pie3DChart': 'pie',
+    'doughnutChart': 'pie',
+    'ofPieChart': 'pie',
+}
+
+# CSS used by the converters for extracted tables and charts
+TABLE_CHART_CSS = '''
+        .table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+        }
+
+        .table th, .table td {
+            border: 1px solid #dddddd;
+            padding: 8px;
+            text-align: left;
+            vertical-align: top;
+        }
+
+        .table th {
+            background-color: #f2f2f2;
+        }
+
+        .chart {
+            display: block;
+            max-width: 100%;
+            height: auto;
+            margin: 20px auto;
+        }
+        '''
+
+
+def _paragraph_texts(element):
+    """Text of every a:p below ``element``, line breaks kept as newlines"""
+    paragraphs = []
+    for p in element.iter(TAG_P):
+        parts = []
+        for node in p.iter(TAG_T, TAG_BR):
+            parts.append('\n' if node.tag == TAG_BR else (node.text or ''))
+        paragraphs.append(''.join(parts))
+    return paragraphs
+
+
+def extract_table(shape):
+    """
+    Read a table graphic frame into ``{'header': bool, 'rows': [[cell, ...], ...]}``.
+
+    Cells covered by a merge are dropped; the origin cell carries ``colspan`` and
+    ``rowspan``. Each cell is ``{'paragraphs': [str], 'colspan': int, 'rowspan': int}``.
+    """
+    tbl = shape._element.find('.//' + _A + 'tbl')
+    if tbl is None:
+        return None
+    tbl_pr = tbl.find(_A + 'tblPr')
+    header = tbl_pr is not None and tbl_pr.get('firstRow') in ('1', 'true')
+    rows = []
+    for tr in tbl.iterchildren(TAG_TR):
+        row = []
+        for tc in tr.iterchildren(TAG_TC):
+            if tc.get('hMerge') in ('1', 'true') or tc.get('vMerge') in ('1', 'true'):
+                continue
+            row.append({
+                'paragraphs': _paragraph_texts(tc),
+                'colspan': int(tc.get('gridSpan', 1)),
+                'rowspan': int(tc.get('rowSpan', 1)),
+            })
+        rows.append(row)
+    return {'header': header, 'rows': rows}
+
+
+def render_table_html(table, indent='                '):
+    """Render an extracted table as ``<table class="table">`` markup"""
+    lines = [indent + '<table class="table">']
+    for row_index, row in enumerate(table['rows']):
+        cell_tag = 'th' if table['header'] and row_index == 0 else 'td'
+        cells = []
+        for cell in row:
+            attrs = ''
+            if cell['colspan'] > 1:
+                attrs += f' colspan="{cell["colspan"]}"'
+            if cell['rowspan'] > 1:
+                attrs += f' rowspan="{cell["rowspan"]}"'
+            text = '<br>'.join(escape(p).replace('\n', '<br>') for p in cell['paragraphs'])
+            cells.append(f'<{cell_tag}{attrs}>{text}</{cell_tag}>')
+        lines.append(f'{indent}    <tr>{"".join(cells)}</tr>')
+    lines.append(indent + '</table>')
+    return '\n'.join(lines)
+
+
+def _cached_points(element):
+    """Values of a c:strCache / c:numCache (or literal) below ``element``, by point index"""
+    if element is None:
+        return []
+    points = {}
+    count = 0
+    for cache in element.iter(_C + 'strCache', _C + 'numCache', _C + 'strLit', _C + 'numLit'):
+        pt_count = cache.find(_C + 'ptCount')
+        if pt_count is not None:
+            count = max(count, int(pt_count.get('val', 0)))
+        for pt in cache.iterchildren(_C + 'pt'):
+            v = pt.find(_C + 'v')
+            points[int(pt.get('idx', 0))] = v.text if v is not None else None
+        break
+    else:
+        # A series name can also be a bare c:v
+        v = element.find(_C + 'v')
+        if v is not None:
+            return [v.text]
+    count = max(count, max(points) + 1 if points else 0)
+    return [points.get(i) for i in range(count)]
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_chart(shape):
+    """
+    Read a chart graphic frame into a dict::
+
+        {'type': 'bar'|'line'|'pie', 'horizontal': bool, 'title': str,
+         'categories': [str], 'series': [{'name': str, 'values': [float|None]}]}
+
+    Only the first plot of a combo chart is read. Returns None for charts
+    whose plot type is not supported.
+    """
+    chart_space = shape.chart_part._element
+    plot_area = chart_space.find('.//' + _C + 'plotArea')
+    if plot_area is None:
+        return None
+    plot = None
+    for child in plot_area.iterchildren():
+        local = child.tag.rsplit('}', 1)[-1]
+        if local in CHART_TYPES:
+            plot = child
+            break
+    if plot is None:
+        return None
+    local = plot.tag.rsplit('}', 1)[-1]
+    bar_dir = plot.find(_C + 'barDir')
+
+    title_el = chart_space.find(_C + 'chart/' + _C + 'title')
+    title = ' '.join(t for t in _paragraph_texts(title_el) if t) if title_el is not None else ''
+
+    categories = []
+    series = []
+    for ser in plot.iterchildren(_C + 'ser'):
+        name_values = _cached_points(ser.find(_C + 'tx'))
+        name = name_values[0] if name_values and name_values[0] else f'Series {len(series) + 1}'
+        cat = ser.find(_C + 'cat')
+        if cat is None:
+            cat = ser.find(_C + 'xVal')
+        values_el = ser.find(_C + 'val')
+        if values_el is None:
+            values_el = ser.find(_C + 'yVal')
+        values = [_to_number(v) for v in _cached_points(values_el)]
+        if not categories:
+            categories = [c if c is not None else '' for c in _cached_points(cat)]
+        series.append({'name': name, 'values': values})
+
+    if not categories and series:
+        categories = [str(i + 1) for i in range(max(len(s['values']) for s in series))]
+    return {
+        'type': CHART_TYPES[local],
+        'horizontal': bar_dir is not None and bar_dir.get('val') == 'bar',
+        'title': title,
+        'categories': categories,
+        'series': series,
+    }
+
+
+def _fmt(value):
+    return f'{value:.1f}'.rstrip('0').rstrip('.')
+
+
+def render_chart_svg(chart, width=640, height=360):
+    """
+    Render an extracted chart as an inline ``<svg class="chart">``.
+
+    Bar charts are drawn as columns whatever their ``barDir``.
+    """
+    label = escape(f'[Chart: {chart["title"]}]' if chart['title'] else '[Chart]')
+    parts = [f'<svg class="chart" xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'role="img" aria-label="{label}" viewBox="0 0 {width} {height}" font-family="Arial, sans-serif" font-size="12">']
+    top = 10
+    if chart['title']:
+        parts.append(f'<text x="{width / 2}" y="22" text-anchor="middle" font-size="16" font-weight="bold" '
+                     f'fill="#1a365d">{escape(chart["title"])}</text>')
+        top = 36
+
+    legend_h = 22 if chart['series'] else 0
+    if chart['type'] == 'pie':
+        parts.extend(_pie_svg(chart, width, height, top))
+    else:
+        parts.extend(_axis_chart_svg(chart, width, height - legend_h, top))
+        x = 50
+        for i, ser in enumerate(chart['series']):
+            color = CHART_COLORS[i % len(CHART_COLORS)]
+            y = height - 8
+            parts.append(f'<rect x="{x}" y="{y - 10}" width="10" height="10" fill="{color}"/>')
+            parts.append(f'<text x="{x + 14}" y="{y}" fill="#4a5568">{escape(ser["name"])}</text>')
+            x += 24 + 7 * len(ser['name'])
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def _axis_chart_svg(chart, width, height, top):
+    left, right, bottom = 50, 15, 30
+    plot_w = max(width - left - right, 1)
+    plot_h = max(height - top - bottom, 1)
+    values = [v for ser in chart['series'] for v in ser['values'] if v is not None]
+    vmax = max(values + [0])
+    vmin = min(values + [0])
+    span = (vmax - vmin) or 1.0
+    categories = chart['categories'] or ['']
+    n_cat = len(categories)
+    out = []
+
+    def scale(v):
+        return top + plot_h - (v - vmin) / span * plot_h
+
+    # Gridlines and value labels
+    for step in range(5):
+        v = vmin + span * step / 4
+        y = scale(v)
+        out.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_w}" y2="{y:.1f}" stroke="#e2e8f0"/>')
+        out.append(f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end" fill="#4a5568">{_fmt(v)}</text>')
+    zero_y = scale(0)
+    out.append(f'<line x1="{left}" y1="{zero_y:.1f}" x2="{left + plot_w}" y2="{zero_y:.1f}" stroke="#4a5568"/>')
+
+    band = plot_w / n_cat
+    for i, name in enumerate(categories):
+        cx = left + band * (i + 0.5)
+        out.append(f'<text x="{cx:.1f}" y="{top + plot_h + 18}" text-anchor="middle" '
+                   f'fill="#4a5568">{escape(str(name))}</text>')
+
+    n_ser = max(len(chart['series']), 1)
+    for s_index, ser in enumerate(chart['series']):
+        color = CHART_COLORS[s_index % len(CHART_COLORS)]
+        if chart['type'] == 'bar':
+            bar_w = band * 0.8 / n_ser
+            for i, v in enumerate(ser['values'][:n_cat]):
+                if v is None:
+                    continue
+                x = left + band * i + band * 0.1 + bar_w * s_index
+                y = min(scale(v), zero_y)
+                out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{bar_w:.1f}" '
+                           f'height="{abs(zero_y - scale(v)):.1f}" fill="{color}"/>')
+        else:
+            points = [f'{left + band * (i + 0.5):.1f},{scale(v):.1f}'
+                      for i, v in enumerate(ser['values'][:n_cat]) if v is not None]
+            if points:
+                out.append(f'<polyline points="{" ".join(points)}" fill="none" stroke="{color}" stroke-width="2"/>')
+    return out
+
+
+def _pie_svg(chart, width, height, top):
+    if not chart['series']:
+        return []
+    values = [max(v or 0, 0) for v in chart['series'][0]['values']]
+    total = sum(values)
+    if total <= 0:
+        return []
+    # Small frames leave no room below the title; keep a minimal visible pie
+    radius = max(min(width * 0.6, height - top - 10) / 2, 4)
+    cx, cy = radius + 20, top + (height - top) / 2
+    out = []
+    angle = -math.pi / 2
+    for i, v in enumerate(values):
+        color = CHART_COLORS[i % len(CHART_COLORS)]
+        sweep = v / total * 2 * math.pi
+        if sweep >= 2 * math.pi - 1e-9:
+            out.append(f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{radius:.1f}" fill="{color}"/>')
+        elif sweep > 0:
+            x1, y1 = cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+            x2, y2 = cx + radius * math.cos(angle + sweep), cy + radius * math.sin(angle + sweep)
+            large = 1 if sweep > math.pi else 0
+            out.append(f'<path d="M{cx:.1f},{cy:.1f} L{x1:.1f},{y1:.1f} A{radius:.1f},{radius:.1f} 0 {large} 1 '
+                       f'{x2:.1f},{y2:.1f} Z" fill="{color}" stroke="#ffffff"/>')
+        angle += sweep
+        label = chart['categories'][i] if i < len(chart['categories']) else str(i + 1)
+        ly = top + 20 + i * 18
+        out.append(f'<rect x="{cx + radius + 30:.1f}" y="{ly - 10}" width="10" height="10" fill="{color}"/>')
+        out.append(f'<text x="{cx + radius + 44:.1f}" y="{ly}" fill="#4a5568">{escape(str(label))} '
+                   f'({v / total * 100:.0f}%)</text>')
+    return out
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Split a converted deck into per-slide fragments with a manifest
+
+Frontend previews usually show one slide at a time, but a converted deck is a
+single HTML file holding every ``div.slide``. ``write_fragments`` splits that
+document into a shared CSS bundle, one fragment file per slide and a
+``manifest.json`` listing slide ids, titles, sizes and content hashes, so a
+client can fetch the bundle once and then only the slides it displays.
+"""
+
+import os
+import re
+import glob
+import json
+import hashlib
+import argparse
+from html.parser import HTMLParser
+
+from artifact_output import write_artifact
+
+MANIFEST_VERSION = 1
+TITLE_TAGS = ('h1', 'h2', 'h3')
+
+# URLs of CSS (url() values) and of slide markup (src/srcset attributes)
+_CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')]+)\1\s*\)''')
+_SRC_ATTRIBUTE = re.compile(r'''(\s(?:src|srcset)=)(["'])(.*?)\2''', re.S)
+
+
+class _DeckSplitter(HTMLParser):
+    """Locate ``<style>`` blocks, stylesheet links and top-level ``div.slide`` spans by offset"""
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.html = html
+        self._line_starts = [0]
+        newline = html.find('\n')
+        while newline != -1:
+            self._line_starts.append(newline + 1)
+            newline = html.find('\n', newline + 1)
+        self.styles = []
+        self.stylesheets = []
+        self.title = None
+        self.lang = None
+        self.slides = []
+        self._stack = []
+        self._slide = None
+        self._in_style = False
+        self._in_title = False
+        self._heading = None
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'html':
+            self.lang = attrs.get('lang')
+        elif tag == 'style':
+            self._in_style = True
+        elif tag == 'title' and self._slide is None:
+            self._in_title = True
+        elif tag == 'link' and 'stylesheet' in (attrs.get('rel') or '').split():
+            self.stylesheets.append(attrs.get('href'))
+        if tag in ('meta', 'link', 'br', 'img', 'hr', 'input'):
+            return
+        self._stack.append(tag)
+        classes = (attrs.get('class') or '').split()
+        if self._slide is None and tag == 'div' and 'slide' in classes:
+            self._slide = {'id': attrs.get('id'), 'start': self._offset(), 'depth': len(self._stack),
+                           'title': None}
+        elif self._slide is not None and self._slide['title'] is None and tag in TITLE_TAGS:
+            self._heading = []
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'link':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+        elif tag == 'title':
+            self._in_title = False
+        if tag not in self._stack:
+            return
+        while self._stack[-1] != tag:
+            self._stack.pop()
+        if self._heading is not None and tag in TITLE_TAGS:
+            self._slide['title'] = ' '.join(''.join(self._heading).split()) or None
+            self._heading = None
+        if self._slide is not None and self._slide['depth'] == len(self._stack):
+            end = self.html.index('>', self._offset()) + 1
+            self.slides.append({'id': self._slide['id'], 'title': self._slide['title'],
+                                'html': self.html[self._slide['start']:end]})
+            self._slide = None
+        self._stack.pop()
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.styles.append(data)
+        elif self._in_title:
+            self.title = (self.title or '') + data
+        elif self._heading is not None:
+            self._heading.append(data)
+
+
+def split_deck(html):
+    """Return (css, stylesheet hrefs, deck title, lang, [{'id', 'title', 'html'}])"""
+    splitter = _DeckSplitter(html)
+    splitter.feed(html)
+    splitter.close()
+    title = ' '.join((splitter.title or '').split()) or None
+    return '\n'.join(splitter.styles), splitter.stylesheets, title, splitter.lang, splitter.slides
+
+
+def _entry(path, text):
+    data = text.encode('utf-8')
+    return {'path': os.path.basename(path), 'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def _rebase(url, html_dir, output_dir):
+    """``url``, relative to the HTML in ``html_dir``, made relative to ``output_dir``"""
+    url = url.strip()
+    if not url or '://' in url or url.startswith(('/', '#', 'data:', 'mailto:')):
+        return url
+    return os.path.relpath(os.path.join(html_dir, url), output_dir).replace(os.sep, '/')
+
+
+def _rebase_css(css, html_dir, output_dir):
+    return _CSS_URL.sub(lambda m: f'url({m.group(1)}{_rebase(m.group(2), html_dir, output_dir)}{m.group(1)})', css)
+
+
+def _rebase_markup(html, html_dir, output_dir):
+    def attribute(match):
+        name, quote, value = match.groups()
+        if name.strip() == 'srcset=' and not value.lstrip().startswith('data:'):
+            # "url 2x, url 1x": only the first token of each candidate is a URL
+            candidates = [candidate.split() for candidate in value.split(',') if candidate.strip()]
+            value = ', '.join(' '.join([_rebase(url, html_dir, output_dir)] + descriptors)
+                              for url, *descriptors in candidates)
+        else:
+            value = _rebase(value, html_dir, output_dir)
+        return f'{name}{quote}{value}{quote}'
+    return _rebase_css(_SRC_ATTRIBUTE.sub(attribute, html), html_dir, output_dir)
+
+
+def write_fragments(html, output_dir, html_path=None, production=False, report=None):
+    """
+    Write ``deck.css``, ``slide-NNN.html`` fragments and ``manifest.json`` to ``output_dir``.
+
+    ``html_path`` is where ``html`` lives; relative stylesheet links, CSS
+    ``url()`` values (background layers, fonts) and image ``src``/``srcset``
+    are rewritten to be relative to ``output_dir``. Returns the manifest dict.
+    """
+    css, stylesheets, title, lang, slides = split_deck(html)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if html_path is not None:
+        html_dir = os.path.dirname(os.path.abspath(html_path))
+        stylesheets = [_rebase(href, html_dir, output_dir) for href in stylesheets if href]
+        css = _rebase_css(css, html_dir, output_dir)
+        slides = [dict(slide, html=_rebase_markup(slide['html'], html_dir, output_dir)) for slide in slides]
+
+    css_path = os.path.join(output_dir, 'deck.css')
+    write_artifact(css_path, css, production, report)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'title': title,
+        'lang': lang,
+        'css': _entry(css_path, css),
+        'stylesheets': stylesheets,
+        'slides': [],
+    }
+    width = len(str(len(slides)))
+    for index, slide in enumerate(slides, start=1):
+        path = os.path.join(output_dir, f'slide-{index:0{max(width, 3)}d}.html')
+        write_artifact(path, slide['html'], production, report)
+        entry = _entry(path, slide['html'])
+        entry.update({'index': index, 'id': slide['id'] or f'slide-{index}', 'title': slide['title']})
+        manifest['slides'].append(entry)
+
+    # Fragments of slides a previous conversion had beyond the current count
+    current = {os.path.join(output_dir, entry['path']) for entry in manifest['slides']}
+    for path in glob.glob(os.path.join(glob.escape(output_dir), 'slide-*.html*')):
+        if path.split('.html')[0] + '.html' not in current:
+            os.remove(path)
+
+    text = json.dumps(manifest, ensure_ascii=False, indent=None if production else 2,
+                      separators=(',', ':') if production else None)
+    write_artifact(os.path.join(output_dir, 'manifest.json'), text, production, report)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split a converted HTML deck into per-slide fragments')
+    parser.add_argument('html_path', help='HTML file produced by convert_ppt_to_html_*')
+    parser.add_argument('output_dir', nargs='?', help='Fragment directory (default: <html stem>.slides/)')
+    parser.add_argument('--production', action='store_true', help='Also write .gz/.br siblings')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.splitext(args.html_path)[0] + '.slides'
+    with open(args.html_path, 'r', encoding='utf-8') as f:
+        manifest = write_fragments(f.read(), output_dir, args.html_path, production=args.production)
+    print(f"✅ Wrote {len(manifest['slides'])} slide fragments and manifest.json to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
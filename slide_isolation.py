@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Per-slide fault isolation for the converters
+
+A malformed shape used to abort the whole conversion with no output at all.
+With isolation enabled each slide is converted inside ``SlideIsolation.slide``:
+an exception on that slide is recorded with its location, the slide's partial
+markup is dropped and a marked placeholder slide is emitted instead, and the
+conversion carries on with the next slide.
+
+A per-slide time limit stops one pathological slide from stalling a worker.
+On the main thread of a Unix process (command line runs, batch and daemon
+workers) it is enforced with ``SIGALRM``, which interrupts the slide wherever
+it is; elsewhere the converters' shape walk checks the deadline between shapes.
+
+Failures are written to ``<output>.errors.json`` next to the HTML.
+"""
+
+import os
+import json
+import time
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+
+from atomic_io import atomic_write
+
+ERRORS_SUFFIX = '.errors.json'
+
+# Added to the converters' CSS when slides are isolated
+FAILED_SLIDE_CSS = '''
+        .slide.failed-slide .placeholder {
+            border: 2px dashed #c53030;
+            color: #c53030;
+        }
+        '''
+
+
+class SlideTimeout(Exception):
+    """A slide took longer than the per-slide time limit"""
+
+
+def errors_path(output_html_path):
+    """The error report written next to ``output_html_path``"""
+    return os.path.splitext(output_html_path)[0] + ERRORS_SUFFIX
+
+
+class SlideAttempt:
+    """Outcome of one slide; ``checkpoint`` raises SlideTimeout once its deadline has passed"""
+
+    def __init__(self, number, timeout):
+        self.number = number
+        self.failed = False
+        self.error = None
+        self.started = time.perf_counter()
+        self.deadline = self.started + timeout if timeout else None
+
+    def checkpoint(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SlideTimeout(f'slide {self.number} exceeded its time limit')
+
+
+def _alarm_available():
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+class SlideIsolation:
+    """
+    Per-slide error isolation of one conversion. Disabled, ``slide`` lets
+    exceptions through as before. Exceptions in ``passthrough`` (e.g. memory
+    budget violations, which concern the whole process) are never isolated.
+    """
+
+    def __init__(self, enabled=False, timeout=None, passthrough=()):
+        self.enabled = enabled
+        self.timeout = timeout if enabled else None
+        self.passthrough = tuple(passthrough)
+        self.errors = []
+
+    @contextmanager
+    def _alarm(self, attempt):
+        if not self.timeout or not _alarm_available():
+            yield
+            return
+
+        def expire(signum, frame):
+            raise SlideTimeout(f'slide {attempt.number} exceeded its {self.timeout:g}s time limit')
+
+        previous = signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    @contextmanager
+    def slide(self, number):
+        """Convert one slide in the block; the yielded SlideAttempt tells whether it failed"""
+        attempt = SlideAttempt(number, self.timeout)
+        if not self.enabled:
+            yield attempt
+            return
+        try:
+            with self._alarm(attempt):
+                yield attempt
+        except self.passthrough:
+            raise
+        except Exception as e:
+            attempt.failed = True
+            attempt.error = e
+            # Where the slide was when it failed, not where a timeout was raised
+            frames = [frame for frame in traceback.extract_tb(e.__traceback__)
+                      if os.path.basename(frame.filename) != os.path.basename(__file__)]
+            frame = (frames or traceback.extract_tb(e.__traceback__))[-1]
+            self.errors.append({
+                'slide': number,
+                'error': type(e).__name__,
+                'message': str(e),
+                'location': f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}',
+                'seconds': round(time.perf_counter() - attempt.started, 3),
+            })
+            print(f"⚠️  Slide {number} failed ({type(e).__name__}: {e}); emitting a placeholder")
+
+    def write_report(self, output_html_path, deck_name, slide_count):
+        """Write the error report next to the HTML, or remove a stale one; returns its path or None"""
+        path = errors_path(output_html_path)
+        if not self.errors:
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        atomic_write(path, json.dumps({'deck': deck_name, 'slides': slide_count, 'failed': self.errors},
+                                      ensure_ascii=False, indent=2))
+        return path
+
+
+def failed_slide_html(number, error, slide_class='slide'):
+    """Marked placeholder standing in for a slide that could not be converted"""
+    return (f'\n    <div class="{slide_class} failed-slide" id="slide-{number}" data-error="{type(error).__name__}">'
+            f'\n        <div class="slide-content">'
+            f'\n            <div class="placeholder">[Slide {number} could not be converted]</div>'
+            f'\n        </div>\n    </div>')
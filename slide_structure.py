@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Share the geometry of structurally identical slides
+
+Positioned slides carry an inline ``left/top/width/height`` style on every
+block, so a deck of forty slides on the same layout repeats the same boxes
+forty times. ``SharedStructures`` fingerprints each slide's structure (the
+sequence of block types and boxes, ignoring text) and gives every distinct
+structure one ``st-<hash>`` class whose CSS places the blocks by position.
+Slides only carry that class and their own text, so the positioning CSS
+grows with the number of distinct layouts rather than with the slide count.
+
+Only that positioning CSS is shared. Every slide is still walked and
+rendered, and its blocks are emitted as their own markup, without the inline
+styles; render time still grows with the slide count.
+"""
+
+import hashlib
+
+HASH_LENGTH = 10
+
+
+def structure_signature(blocks):
+    """Structural signature of classified ``(block_type, content, box)`` blocks: types and boxes only"""
+    return tuple((block_type, box) for block_type, _content, box in blocks)
+
+
+class SharedStructures:
+    """Registry of the distinct slide structures of one deck and their CSS"""
+
+    def __init__(self):
+        self._classes = {}
+        self._rules = []
+
+    def __len__(self):
+        return len(self._classes)
+
+    def class_for(self, blocks):
+        """The ``st-<hash>`` class placing ``blocks``; registers the structure on first use"""
+        return self.class_for_signature(structure_signature(blocks))
+
+    def class_for_signature(self, signature):
+        """``class_for`` of blocks with the ``structure_signature`` ``signature``"""
+        name = self._classes.get(signature)
+        if name is None:
+            digest = hashlib.sha256(repr(signature).encode('utf-8')).hexdigest()[:HASH_LENGTH]
+            name = self._classes[signature] = f'st-{digest}'
+            for index, (_block_type, box) in enumerate(signature, start=1):
+                left, top, width, height = box
+                self._rules.append(f'''
+        .slide.{name} > .slide-content > :nth-child({index}) {{
+            left: {left:g}px; top: {top:g}px; width: {width:g}px; height: {height:g}px;
+        }}''')
+        return name
+
+    def css(self):
+        return ''.join(self._rules) + '\n        ' if self._rules else ''
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Inverted index over the template library for fast search and selection
+
+Finding a template used to mean loading and scanning every JSON file. The
+index is a SQLite database of postings (term -> template, field weight),
+filled from each deck's template JSON files (names, descriptions, tags) and
+the deck itself (slide text and speaker notes). Latin text is indexed by
+word; CJK text has no spaces, so runs of CJK characters are indexed as
+overlapping bigrams, which matches any query of two or more characters.
+
+A deck is re-indexed only when the deck or one of its JSON files changed,
+so build_template can update the index on every build and
+``template_index.py update`` over a whole library only reads what is new.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+DEFAULT_INDEX_NAME = 'template_index.sqlite'
+
+# Score of one occurrence of a term, by field
+FIELD_WEIGHTS = {'name': 8, 'tags': 6, 'description': 4, 'slides': 1, 'notes': 1}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS templates (
+    id INTEGER PRIMARY KEY,
+    pptx_path TEXT NOT NULL UNIQUE,
+    stamp TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    tags TEXT,
+    files TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    template INTEGER NOT NULL REFERENCES templates(id) ON DELETE CASCADE,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (term, template)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    template INTEGER NOT NULL REFERENCES templates(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, template)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_template ON postings (template);
+CREATE INDEX IF NOT EXISTS tags_template ON tags (template);
+'''
+
+_CJK = (r'\u2e80-\u2fdf\u3040-\u30ff\u3100-\u312f\u3190-\u31ff\u3400-\u4dbf'
+        r'\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff')
+_TOKEN = re.compile(rf'[{_CJK}]+|[^\W{_CJK}_]+')
+_CJK_RUN = re.compile(rf'[{_CJK}]')
+
+
+def tokenize(text):
+    """
+    Index terms of ``text``: casefolded words, and overlapping bigrams of CJK runs
+    (a lone CJK character is kept as a unigram).
+    """
+    terms = []
+    for token in _TOKEN.findall(text or ''):
+        if _CJK_RUN.match(token):
+            if len(token) == 1:
+                terms.append(token)
+            else:
+                terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.append(token.casefold())
+    return terms
+
+
+def _stamp(paths):
+    parts = []
+    for path in paths:
+        st = os.stat(path)
+        parts.append(f'{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}')
+    return '|'.join(parts)
+
+
+def _deck_json_entries(stem, entries):
+    """
+    Template JSON files among directory ``entries`` that belong to the deck
+    ``stem``: ``<stem>_*.json``, except those of a sibling deck whose name
+    extends it (``<stem>_2.pptx`` owns ``<stem>_2_fixed.json``).
+    """
+    prefix = stem + '_'
+    longer = [os.path.splitext(entry)[0] + '_' for entry in entries
+              if entry.lower().endswith('.pptx') and entry.startswith(prefix)]
+    return [entry for entry in entries
+            if entry.startswith(prefix) and entry.endswith('.json')
+            and not any(entry.startswith(other) for other in longer)]
+
+
+def template_json_files(pptx_path):
+    directory, name = os.path.split(os.path.abspath(pptx_path))
+    entries = sorted(os.listdir(directory))
+    return [os.path.join(directory, entry) for entry in _deck_json_entries(os.path.splitext(name)[0], entries)]
+
+
+def deck_text(prs):
+    """(slide text, speaker notes text) of a parsed deck, read from the a:t runs"""
+    slides = []
+    notes = []
+    for slide in prs.slides:
+        for p in slide._element.iter(_A + 'p'):
+            slides.append(''.join(t.text or '' for t in p.iter(_A + 't')))
+        if slide.has_notes_slide:
+            notes.append(slide.notes_slide.notes_text_frame.text if slide.notes_slide.notes_text_frame else '')
+    return '\n'.join(slides), '\n'.join(notes)
+
+
+class TemplateIndex:
+    """The index database; one row per deck, covering all of its template JSON files"""
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+        self._db.execute('PRAGMA foreign_keys = ON')
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def index_deck(self, pptx_path, prs=None, force=False, json_files=None):
+        """
+        (Re)index ``pptx_path`` unless it and its JSON files are unchanged.
+        ``prs`` is an already parsed deck; ``json_files`` its template files if
+        already known. Returns True if the deck was indexed.
+        """
+        pptx_path = os.path.abspath(pptx_path)
+        if json_files is None:
+            json_files = template_json_files(pptx_path)
+        stamp = _stamp([pptx_path] + json_files)
+        row = self._db.execute('SELECT stamp FROM templates WHERE pptx_path = ?', (pptx_path,)).fetchone()
+        if row is not None and row[0] == stamp and not force:
+            return False
+
+        names, descriptions, tags = [], [], []
+        for path in json_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Not indexing unreadable template {os.path.basename(path)}: {e}")
+                continue
+            if data.get('template_name'):
+                names.append(data['template_name'])
+            if data.get('description'):
+                descriptions.append(data['description'])
+            tags.extend(tag for tag in data.get('tags') or [] if tag not in tags)
+        if prs is None:
+            from pptx import Presentation
+            prs = Presentation(pptx_path)
+        slides, notes = deck_text(prs)
+        name = os.path.splitext(os.path.basename(pptx_path))[0]
+
+        scores = {}
+        for field, text in (('name', ' '.join(names + [os.path.basename(pptx_path)])),
+                            ('tags', ' '.join(tags)), ('description', ' '.join(descriptions)),
+                            ('slides', slides), ('notes', notes)):
+            for term in tokenize(text):
+                scores[term] = scores.get(term, 0) + FIELD_WEIGHTS[field]
+
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            self._db.execute('DELETE FROM templates WHERE pptx_path = ?', (pptx_path,))
+            cursor = self._db.execute(
+                'INSERT INTO templates (pptx_path, stamp, name, description, tags, files, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (pptx_path, stamp, name, descriptions[0] if descriptions else None,
+                 json.dumps(tags, ensure_ascii=False), json.dumps(json_files, ensure_ascii=False), time.time()))
+            template_id = cursor.lastrowid
+            self._db.executemany('INSERT INTO postings (term, template, score) VALUES (?, ?, ?)',
+                                 [(term, template_id, score) for term, score in scores.items()])
+            self._db.executemany('INSERT INTO tags (tag, template) VALUES (?, ?)',
+                                 [(tag, template_id) for tag in dict.fromkeys(t.casefold() for t in tags)])
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return True
+
+    def prune(self):
+        """Drop decks whose file no longer exists; returns how many were dropped"""
+        missing = [(path,) for (path,) in self._db.execute('SELECT pptx_path FROM templates')
+                   if not os.path.exists(path)]
+        self._db.executemany('DELETE FROM templates WHERE pptx_path = ?', missing)
+        return len(missing)
+
+    def search(self, query='', tags=(), limit=20):
+        """
+        Decks matching every term of ``query`` and every tag in ``tags``, best first:
+        [{'pptx_path', 'name', 'description', 'tags', 'files', 'score'}]
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        tags = [tag.casefold() for tag in tags]
+        if not terms and not tags:
+            return []
+        joins, params = [], []
+        score = '0'
+        for n, term in enumerate(terms):
+            joins.append(f'JOIN postings p{n} ON p{n}.template = t.id AND p{n}.term = ?')
+            params.append(term)
+            score += f' + p{n}.score'
+        for n, tag in enumerate(tags):
+            joins.append(f'JOIN tags g{n} ON g{n}.template = t.id AND g{n}.tag = ?')
+            params.append(tag)
+        rows = self._db.execute(
+            f'SELECT t.pptx_path, t.name, t.description, t.tags, t.files, {score} AS score '
+            f'FROM templates t {" ".join(joins)} ORDER BY score DESC, t.name LIMIT ?', params + [limit])
+        return [{'pptx_path': path, 'name': name, 'description': description, 'tags': json.loads(tag_list),
+                 'files': json.loads(files), 'score': total}
+                for path, name, description, tag_list, files, total in rows]
+
+    def count(self):
+        return self._db.execute('SELECT COUNT(*) FROM templates').fetchone()[0]
+
+
+def default_index_path(pptx_path):
+    """The library index next to a deck: ``template_index.sqlite`` in its directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(pptx_path)), DEFAULT_INDEX_NAME)
+
+
+def _find_decks(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith('.pptx') and not name.startswith(('~$', '.')):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def iter_library(paths):
+    """(deck path, its template JSON files) for every deck under ``paths``, listing each directory once"""
+    # One listing per directory instead of one glob per deck
+    listings = {}
+    for path in _find_decks(paths):
+        directory, name = os.path.split(os.path.abspath(path))
+        if directory not in listings:
+            listings[directory] = sorted(os.listdir(directory))
+        yield path, [os.path.join(directory, entry)
+                     for entry in _deck_json_entries(os.path.splitext(name)[0], listings[directory])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index and search the template library')
+    parser.add_argument('--db', help=f'Index database (default: {DEFAULT_INDEX_NAME} in the current directory)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help='Index new and changed decks (files or directories)')
+    update.add_argument('paths', nargs='+')
+    update.add_argument('--force', action='store_true', help='Re-index unchanged decks too')
+    search = commands.add_parser('search', help='Search by keywords and tags')
+    search.add_argument('query', nargs='*')
+    search.add_argument('--tag', action='append', default=[], help='Required tag; may be repeated')
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with TemplateIndex(args.db or DEFAULT_INDEX_NAME) as index:
+        if args.command == 'update':
+            start = time.perf_counter()
+            decks = list(iter_library(args.paths))
+            indexed = 0
+            for path, json_files in decks:
+                try:
+                    indexed += index.index_deck(path, force=args.force, json_files=json_files)
+                except Exception as e:
+                    print(f"❌ {path}: {e}")
+            pruned = index.prune()
+            print(f"🗂️  Indexed {indexed} of {len(decks)} decks ({pruned} removed) in "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms; {index.count()} decks in the index")
+            return
+        start = time.perf_counter()
+        results = index.search(' '.join(args.query), args.tag, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+            sys.stdout.write('\n')
+            return
+        for result in results:
+            print(f"{result['score']:>6}  {result['name']}  [{', '.join(result['tags'])}]  {result['pptx_path']}")
+        print(f"🔎 {len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Packed, memory-mapped template library
+
+Loading the library used to mean opening and decoding every template JSON
+file, each with its inlined ``html_template``, so service start-up grew with
+the library. A pack bundles every template of a library into one file:
+
+    header   magic, version, template count, index offset and length
+    blobs    per template: its JSON without the HTML, and the HTML;
+             every asset the HTML references (CSS, layers, images, fonts), once
+    index    JSON: per template its name, summary (name, description, tags),
+             source stamp and the (offset, length) of its blobs; the assets table
+
+``TemplatePack`` memory-maps the file and decodes only the index, so listing
+templates costs the same for ten templates or ten thousand; a template's
+JSON and HTML are read from the mapping when it is first used.
+
+``pack_library`` rewrites the pack incrementally: templates and assets whose
+source file is unchanged are copied from the previous pack as raw bytes, and
+only new or modified JSON files are read and decoded. The new pack replaces
+the old one atomically, so running services keep reading their mapping.
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+
+from atomic_io import advisory_lock, atomic_writer
+from template_index import iter_library
+
+MAGIC = b'PPTPACK\0'
+VERSION = 1
+# magic, version, template count, index offset, index length
+HEADER = struct.Struct('<8sIIQQ')
+
+DEFAULT_PACK_NAME = 'templates.pack'
+
+# Relative references of a template's HTML that are packed as assets
+_REFERENCE = re.compile(r'''(?:href|src|srcset)\s*=\s*"([^"]+)"|url\(\s*["']?([^"')]+)["']?\s*\)''')
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+def _asset_references(html):
+    """Relative URLs referenced by ``html`` (links, sources, CSS url())"""
+    references = []
+    for match in _REFERENCE.finditer(html):
+        url = (match.group(1) or match.group(2)).strip().split('#')[0].split('?')[0]
+        if url and not url.startswith(('data:', 'http:', 'https:', '//', '/', 'mailto:')):
+            references.append(url)
+    return list(dict.fromkeys(references))
+
+
+class TemplatePack:
+    """A memory-mapped pack; only its index is decoded on open"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _count, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path} is not a version {VERSION} template pack')
+            index = json.loads(self._map[index_offset:index_offset + index_length])
+        except BaseException:
+            self.close()
+            raise
+        self.templates = {entry['name']: entry for entry in index['templates']}
+        self.assets = index['assets']
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.templates)
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def blob(self, span):
+        offset, length = span
+        return self._map[offset:offset + length]
+
+    def list(self):
+        """Summary of every template, straight from the index"""
+        return [dict(entry['summary'], name=name, deck=entry['deck']) for name, entry in self.templates.items()]
+
+    def html(self, name):
+        """The ``html_template`` of template ``name``"""
+        span = self.templates[name]['html']
+        return self.blob(span).decode('utf-8') if span else None
+
+    def template(self, name):
+        """Template ``name`` as the dict its JSON file holds"""
+        entry = self.templates[name]
+        data = json.loads(self.blob(entry['json']))
+        if entry['html']:
+            data['html_template'] = self.html(name)
+        return data
+
+    def asset(self, path):
+        """Bytes of a packed asset, by its path relative to the library root"""
+        return self.blob(self.assets[path]['span'])
+
+
+class _Writer:
+    def __init__(self, f):
+        self._f = f
+        self.offset = HEADER.size
+        f.write(b'\0' * HEADER.size)
+
+    def add(self, data):
+        span = [self.offset, len(data)]
+        self._f.write(data)
+        self.offset += len(data)
+        return span
+
+
+def _library_templates(paths):
+    """(name, JSON path, deck path, library root) of every template under ``paths``"""
+    for path in paths:
+        root = os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path))
+        for deck, json_files in iter_library([path]):
+            for json_path in json_files:
+                name = os.path.splitext(os.path.relpath(json_path, root))[0].replace(os.sep, '/')
+                yield name, json_path, os.path.relpath(deck, root).replace(os.sep, '/'), root
+
+
+def pack_library(paths, pack_path, full=False):
+    """
+    Write the templates under ``paths`` to ``pack_path``, reusing the unchanged
+    entries of an existing pack unless ``full``. Returns a stats dict.
+    """
+    stats = {'templates': 0, 'reused': 0, 'read': 0, 'assets': 0, 'invalid': 0}
+    with advisory_lock(pack_path + '.lock'):
+        previous = None
+        if not full and os.path.exists(pack_path):
+            try:
+                previous = TemplatePack(pack_path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Rebuilding unreadable pack {pack_path}: {e}")
+        try:
+            with atomic_writer(pack_path, 'wb') as f:
+                writer = _Writer(f)
+                entries = []
+                assets = {}
+                by_digest = {}
+
+                def add_asset(key, source_path):
+                    if key in assets or not os.path.isfile(source_path):
+                        return
+                    stamp = _stamp(source_path)
+                    old = previous.assets.get(key) if previous is not None else None
+                    if old is not None and old['stamp'] == stamp:
+                        digest, data = old['sha256'], None
+                    else:
+                        with open(source_path, 'rb') as asset_file:
+                            data = asset_file.read()
+                        digest = hashlib.sha256(data).hexdigest()
+                    if digest not in by_digest:
+                        by_digest[digest] = writer.add(data if data is not None else previous.blob(old['span']))
+                    assets[key] = {'stamp': stamp, 'sha256': digest, 'span': by_digest[digest]}
+
+                for name, json_path, deck, root in _library_templates(paths):
+                    stamp = _stamp(json_path)
+                    old = previous.templates.get(name) if previous is not None else None
+                    if old is not None and old['stamp'] == stamp:
+                        entry = dict(old, json=writer.add(previous.blob(old['json'])),
+                                     html=writer.add(previous.blob(old['html'])) if old['html'] else None)
+                        stats['reused'] += 1
+                    else:
+                        try:
+                            with open(json_path, 'r', encoding='utf-8') as json_file:
+                                data = json.load(json_file)
+                        except (OSError, ValueError) as e:
+                            print(f"⚠️  Not packing unreadable template {json_path}: {e}")
+                            stats['invalid'] += 1
+                            continue
+                        if not isinstance(data, dict):
+                            stats['invalid'] += 1
+                            continue
+                        html = data.get('html_template')
+                        if 'html_template' in data:
+                            # Kept as null so ``template`` restores the original key order
+                            data['html_template'] = None
+                        base = os.path.dirname(json_path)
+                        references = _asset_references(html) if isinstance(html, str) else []
+                        entry = {
+                            'name': name,
+                            'deck': deck,
+                            'stamp': stamp,
+                            'summary': {'template_name': data.get('template_name'),
+                                        'description': data.get('description'),
+                                        'tags': data.get('tags') or []},
+                            'json': writer.add(json.dumps(data, ensure_ascii=False).encode('utf-8')),
+                            'html': writer.add(html.encode('utf-8')) if isinstance(html, str) else None,
+                            # Asset keys are relative to the library root
+                            'assets': {url: os.path.relpath(os.path.normpath(os.path.join(base, url)),
+                                                            root).replace(os.sep, '/')
+                                       for url in references},
+                        }
+                        stats['read'] += 1
+                    for key in entry['assets'].values():
+                        add_asset(key, os.path.join(root, key))
+                    entries.append(entry)
+
+                index = json.dumps({'templates': entries, 'assets': assets}, ensure_ascii=False).encode('utf-8')
+                index_span = writer.add(index)
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, len(entries), *index_span))
+                if previous is not None:
+                    # Windows cannot replace a mapped file; open mappings elsewhere keep the old inode
+                    previous.close()
+                    previous = None
+            stats['templates'] = len(entries)
+            stats['assets'] = len(assets)
+        finally:
+            if previous is not None:
+                previous.close()
+    stats['bytes'] = os.path.getsize(pack_path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack the template library into one memory-mapped file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='Pack (or incrementally repack) templates under files or directories')
+    pack.add_argument('paths', nargs='+')
+    pack.add_argument('-o', '--output', default=DEFAULT_PACK_NAME, help=f'Pack file (default: {DEFAULT_PACK_NAME})')
+    pack.add_argument('--full', action='store_true', help='Re-read every template instead of reusing the old pack')
+    listing = commands.add_parser('list', help='List the templates of a pack')
+    listing.add_argument('pack')
+    listing.add_argument('--json', action='store_true', help='Print the list as JSON')
+    show = commands.add_parser('show', help='Print one template of a pack as JSON (or only its HTML)')
+    show.add_argument('pack')
+    show.add_argument('name')
+    show.add_argument('--html', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'pack':
+        stats = pack_library(args.paths, args.output, args.full)
+        print(f"📦 Packed {stats['templates']} templates ({stats['reused']} reused, {stats['read']} read) and "
+              f"{stats['assets']} assets into {args.output}: {stats['bytes'] / 1024:.0f} KB in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return
+    with TemplatePack(args.pack) as library:
+        if args.command == 'list':
+            templates = library.list()
+            if args.json:
+                json.dump(templates, sys.stdout, ensure_ascii=False, indent=2)
+                sys.stdout.write('\n')
+                return
+            for template in templates:
+                print(f"{template['name']}  {template['template_name'] or ''}  [{', '.join(template['tags'])}]")
+            print(f"📚 {len(templates)} templates, opened and listed in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return
+        if args.name not in library:
+            print(f"❌ No template named {args.name} in {args.pack}")
+            sys.exit(1)
+        if args.html:
+            sys.stdout.write(library.html(args.name) or '')
+        else:
+            json.dump(library.template(args.name), sys.stdout, ensure_ascii=False, indent=2)
+            sys.stdout.write('\n')
+
+
+if __name__ == "__main__":
+    main()
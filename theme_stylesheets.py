@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Content-hashed theme stylesheets shared by converted decks and templates
+
+Every converted deck and every ``html_template`` used to inline the same base
+CSS. ``publish_stylesheet`` writes a stylesheet once under a name derived
+from its content hash (``theme.<sha256 prefix>.css``), so any number of decks
+using the same theme link to a single, immutable file that browsers can cache
+indefinitely. Only CSS that depends on the deck itself stays inline.
+"""
+
+import os
+import re
+import hashlib
+
+from artifact_output import minify_css, write_artifact
+
+HASH_LENGTH = 16
+
+_STYLE_BLOCK = re.compile(r'(?P<indent>[ \t]*)<style>(?P<css>.*?)</style>', re.S)
+
+
+def publish_stylesheet(css, css_dir, name='theme', production=False):
+    """
+    Write ``css`` to ``css_dir/<name>.<hash>.css`` unless it already exists; return the path.
+
+    The file name changes whenever the content does, so an existing file is
+    never rewritten.
+    """
+    if production:
+        css = minify_css(css)
+    digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+    path = os.path.join(css_dir, f'{name}.{digest}.css')
+    if not os.path.exists(path):
+        os.makedirs(css_dir, exist_ok=True)
+        write_artifact(path, css, production)
+    return path
+
+
+def stylesheet_href(path, document_path=None, css_url=None):
+    """URL of a published stylesheet: under ``css_url`` if given, else relative to the document"""
+    if css_url:
+        return css_url.rstrip('/') + '/' + os.path.basename(path)
+    base = os.path.dirname(os.path.abspath(document_path)) if document_path else os.getcwd()
+    return os.path.relpath(os.path.abspath(path), base).replace(os.sep, '/')
+
+
+def stylesheet_markup(theme_css, deck_css, css_dir=None, document_path=None, css_url=None,
+                      production=False, indent='    '):
+    """
+    Head markup for a document's CSS.
+
+    Without ``css_dir`` everything is inlined in one ``<style>`` block, as
+    before. With it, ``theme_css`` is published as a shared hashed file and
+    linked, and only ``deck_css`` stays inline.
+    """
+    theme_css = ''.join(theme_css)
+    deck_css = ''.join(deck_css)
+    if not css_dir:
+        return f'\n{indent}<style>{theme_css}{deck_css}</style>'
+    path = publish_stylesheet(theme_css, css_dir, production=production)
+    markup = f'\n{indent}<link rel="stylesheet" href="{stylesheet_href(path, document_path, css_url)}">'
+    if deck_css.strip():
+        markup += f'\n{indent}<style>{deck_css}</style>'
+    return markup
+
+
+def externalize_styles(html, css_dir, document_path=None, css_url=None, production=False):
+    """Replace every ``<style>`` block of ``html`` with a link to its published, hashed stylesheet"""
+    def link(match):
+        path = publish_stylesheet(match.group('css'), css_dir, production=production)
+        href = stylesheet_href(path, document_path, css_url)
+        return f'{match.group("indent")}<link rel="stylesheet" href="{href}">'
+
+    return _STYLE_BLOCK.sub(link, html)
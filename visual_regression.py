@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Visual regression harness for the converters
+
+Converts every fixture deck with each converter variant, renders every
+generated ``.slide`` to a PNG and compares it with the golden image stored
+by a previous ``update`` run. All slides of a variant are compared at once as
+one NumPy array: the share of pixels whose colour moved by more than
+``--tolerance``, the mean absolute error, and the Hamming distance between
+DCT perceptual hashes (which ignores anti-aliasing noise but catches moved
+or missing blocks). A slide over either threshold, or a slide that appeared
+or disappeared, is a regression; the exit status is 1 if there is any.
+
+Slides are rendered with a headless Chromium through playwright when it is
+installed. Without it the ``wireframe`` renderer draws the positioned blocks
+(boxes, text and exported pictures) with Pillow: it does not apply the CSS,
+but it is deterministic and catches geometry, text and picture regressions
+wherever the harness runs. Golden images record the renderer that made them
+and are only compared with images from the same renderer.
+
+    python visual_regression.py update
+    python visual_regression.py check --report visual_report.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import zlib
+import argparse
+import tempfile
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = [os.path.join(REPO_DIR, 'export_test.pptx')]
+DEFAULT_GOLDEN_DIR = os.path.join(REPO_DIR, 'visual_golden')
+MANIFEST_NAME = 'manifest.json'
+
+# Converter variants: name -> (module, keyword arguments)
+VARIANTS = {
+    'v2': ('convert_ppt_to_html_v2', {'positioning': 'absolute', 'production': True}),
+    'advanced': ('convert_ppt_to_html_advanced', {'positioning': 'absolute', 'production': True}),
+}
+
+# A pixel counts as changed when a channel moved by more than this
+DEFAULT_TOLERANCE = 24
+# Regression thresholds: share of changed pixels, perceptual hash bits
+DEFAULT_PIXEL_THRESHOLD = 0.01
+DEFAULT_HASH_THRESHOLD = 6
+
+HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hashes(images):
+    """64-bit DCT hashes of an (n, h, w, 3) uint8 stack, as an (n, 64) bool array"""
+    small = np.stack([np.asarray(Image.fromarray(image).convert('L').resize((_DCT_SIZE, _DCT_SIZE),
+                                                                              Image.LANCZOS), dtype=np.float64)
+                      for image in images])
+    coefficients = _DCT @ small @ _DCT.T
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(images), -1)
+    # The DC term only carries the average brightness
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return low > median
+
+
+def compare_stacks(current, golden, tolerance=DEFAULT_TOLERANCE):
+    """
+    Per-slide scores of two (n, h, w, 3) uint8 stacks of the same shape:
+    (changed pixel share, mean absolute error, perceptual hash distance, changed mask)
+    """
+    delta = np.abs(current.astype(np.int16) - golden.astype(np.int16)).max(axis=3)
+    changed = delta > tolerance
+    ratios = changed.mean(axis=(1, 2))
+    errors = delta.mean(axis=(1, 2)) / 255
+    distances = (perceptual_hashes(current) != perceptual_hashes(golden)).sum(axis=1)
+    return ratios, errors, distances, changed
+
+
+class _SlideBlocks(HTMLParser):
+    """Blocks of each ``.slide``: [(classes, style dict, text, image src)]"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.slides = []
+        self._depth = 0
+        self._slide_depth = None
+        self._content_depth = None
+        self._block = None
+        self._block_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('img', 'br', 'source', 'meta', 'link'):
+            if tag == 'img' and self._block is not None:
+                self._block[3] = attrs.get('src')
+            elif tag == 'br' and self._block is not None:
+                self._block[2].append('\n')
+            return
+        self._depth += 1
+        classes = (attrs.get('class') or '').split()
+        if tag == 'div' and 'slide' in classes and self._slide_depth is None:
+            self._slide_depth = self._depth
+            self.slides.append([])
+        elif tag == 'div' and 'slide-content' in classes and self._slide_depth is not None:
+            self._content_depth = self._depth
+        elif self._content_depth is not None and self._depth == self._content_depth + 1:
+            style = {}
+            for declaration in (attrs.get('style') or '').split(';'):
+                name, _, value = declaration.partition(':')
+                if value.strip().endswith('px'):
+                    try:
+                        style[name.strip()] = float(value.strip()[:-2])
+                    except ValueError:
+                        pass
+            self._block = [classes, style, [], None]
+            self._block_depth = self._depth
+        elif tag in ('p', 'li', 'tr') and self._block is not None:
+            self._block[2].append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('img', 'br', 'source', 'meta', 'link'):
+            return
+        if self._block is not None and self._depth == self._block_depth:
+            classes, style, text, src = self._block
+            lines = (' '.join(line.split()) for line in ''.join(text).split('\n'))
+            self.slides[-1].append((classes, style, '\n'.join(line for line in lines if line), src))
+            self._block = None
+        if self._depth == self._content_depth:
+            self._content_depth = None
+        if self._depth == self._slide_depth:
+            self._slide_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._block is not None:
+            self._block[2].append(data)
+
+
+def _block_color(classes):
+    """A stable light fill per block class"""
+    crc = zlib.crc32(' '.join(sorted(c for c in classes if not c.startswith(('rt-', 'st-')))).encode())
+    return (160 + crc % 80, 160 + (crc >> 8) % 80, 160 + (crc >> 16) % 80)
+
+
+def render_wireframe(html_path, out_dir, canvas):
+    """Draw every slide of ``html_path`` as positioned boxes, text and pictures; returns PNG paths"""
+    parser = _SlideBlocks()
+    with open(html_path, 'r', encoding='utf-8') as f:
+        parser.feed(f.read())
+    font = ImageFont.load_default()
+    base = os.path.dirname(os.path.abspath(html_path))
+    width, height = canvas
+    paths = []
+    for number, blocks in enumerate(parser.slides, start=1):
+        image = Image.new('RGB', canvas, (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        # Flow output has no positions: stack its blocks in equal bands
+        band = height / max(sum('left' not in block[1] for block in blocks), 1)
+        stacked = 0
+        for classes, style, text, src in blocks:
+            if 'left' in style:
+                box = (style['left'], style['top'], style.get('width', 0), style.get('height', 0))
+            else:
+                box = (0, stacked * band, width, band)
+                stacked += 1
+            left, top = round(box[0]), round(box[1])
+            right, bottom = round(box[0] + box[2]) - 1, round(box[1] + box[3]) - 1
+            if right <= left or bottom <= top:
+                continue
+            picture = os.path.join(base, src) if src and not src.startswith(('data:', 'http')) else None
+            if picture and os.path.exists(picture):
+                with Image.open(picture) as source:
+                    image.paste(source.convert('RGB').resize((right - left + 1, bottom - top + 1)), (left, top))
+            else:
+                draw.rectangle((left, top, right, bottom), fill=_block_color(classes), outline=(64, 64, 64))
+            y = top + 4
+            for line in text.split('\n'):
+                if y > bottom - 10:
+                    break
+                # Clip the line to the box width
+                while line and draw.textlength(line, font=font) > right - left - 8:
+                    line = line[:-1]
+                draw.text((left + 4, y), line, fill=(0, 0, 0), font=font)
+                y += 12
+        path = os.path.join(out_dir, f'slide-{number}.png')
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def render_browser(html_path, out_dir, canvas):
+    """Screenshot every ``.slide`` of ``html_path`` in headless Chromium; returns PNG paths"""
+    paths = []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        try:
+            page = browser.new_page(viewport={'width': canvas[0] + 80, 'height': canvas[1] + 80})
+            page.goto('file://' + os.path.abspath(html_path))
+            page.add_style_tag(content='*, *::before, *::after { animation: none !important; '
+                                       'transition: none !important; }')
+            page.wait_for_load_state('networkidle')
+            for number, slide in enumerate(page.query_selector_all('.slide'), start=1):
+                path = os.path.join(out_dir, f'slide-{number}.png')
+                slide.screenshot(path=path)
+                paths.append(path)
+        finally:
+            browser.close()
+    return paths
+
+
+RENDERERS = {'wireframe': render_wireframe, 'browser': render_browser}
+
+
+def default_renderer():
+    return 'browser' if sync_playwright is not None else 'wireframe'
+
+
+def render_case(fixture, variant, out_dir, renderer):
+    """Worker: convert ``fixture`` with ``variant`` and render its slides into ``out_dir``"""
+    import importlib
+    module_name, options = VARIANTS[variant]
+    module = importlib.import_module(module_name)
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    html_path = os.path.join(out_dir, 'deck.html')
+    with contextlib.redirect_stdout(io.StringIO()):
+        converted = module.convert_ppt_to_html(fixture, html_path, images_dir=os.path.join(out_dir, 'images'),
+                                               image_jobs=1, **options)
+    if not converted:
+        raise RuntimeError(f'{variant} failed to convert {os.path.basename(fixture)}')
+    return RENDERERS[renderer](html_path, out_dir, module.CANVAS)
+
+
+def _case_key(fixture, variant):
+    return os.path.join(os.path.splitext(os.path.basename(fixture))[0], variant)
+
+
+def render_all(fixtures, variants, work_dir, renderer, jobs=None):
+    """{case key: [PNG paths]} for every fixture and variant, rendered in parallel"""
+    cases = [(fixture, variant) for fixture in fixtures for variant in variants]
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(cases))) as pool:
+        futures = {_case_key(fixture, variant): pool.submit(render_case, os.path.abspath(fixture), variant,
+                                                            os.path.join(work_dir, _case_key(fixture, variant)),
+                                                            renderer)
+                   for fixture, variant in cases}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def _load_stack(paths):
+    return np.stack([np.asarray(Image.open(path).convert('RGB')) for path in paths])
+
+
+def compare_case(key, current_paths, golden_dir, diff_dir, thresholds):
+    """Scores of one case against its golden images: [{'case', 'slide', 'status', ...}]"""
+    tolerance, pixel_threshold, hash_threshold = thresholds
+    golden_paths = []
+    case_dir = os.path.join(golden_dir, key)
+    number = 1
+    while os.path.exists(os.path.join(case_dir, f'slide-{number}.png')):
+        golden_paths.append(os.path.join(case_dir, f'slide-{number}.png'))
+        number += 1
+
+    results = []
+    pairs = list(zip(current_paths, golden_paths))
+    # Only slides whose size is unchanged can be compared pixel by pixel (headers only are read here)
+    comparable = [n for n, (c, g) in enumerate(pairs) if Image.open(c).size == Image.open(g).size]
+    scores = {}
+    if comparable:
+        ratios, errors, distances, changed = compare_stacks(_load_stack([pairs[n][0] for n in comparable]),
+                                                            _load_stack([pairs[n][1] for n in comparable]),
+                                                            tolerance)
+        for row, n in enumerate(comparable):
+            scores[n] = (float(ratios[row]), float(errors[row]), int(distances[row]), changed[row])
+
+    for n, (current_path, _golden_path) in enumerate(pairs):
+        slide = n + 1
+        if n not in scores:
+            results.append({'case': key, 'slide': slide, 'status': 'regression', 'reason': 'size changed'})
+            continue
+        ratio, error, distance, mask = scores[n]
+        regressed = ratio > pixel_threshold or distance > hash_threshold
+        result = {'case': key, 'slide': slide, 'status': 'regression' if regressed else 'ok',
+                  'similarity': round(1 - ratio, 5), 'changed_pixels': round(ratio, 5),
+                  'mean_error': round(error, 5), 'hash_distance': distance}
+        if regressed:
+            os.makedirs(os.path.join(diff_dir, key), exist_ok=True)
+            diff = np.asarray(Image.open(current_path).convert('RGB')).copy()
+            diff[mask] = (255, 0, 0)
+            diff_path = os.path.join(diff_dir, key, f'slide-{slide}-diff.png')
+            Image.fromarray(diff).save(diff_path)
+            result['diff'] = diff_path
+        results.append(result)
+    for n in range(len(pairs), len(current_paths)):
+        results.append({'case': key, 'slide': n + 1, 'status': 'regression', 'reason': 'new slide'})
+    for n in range(len(pairs), len(golden_paths)):
+        results.append({'case': key, 'slide': n + 1, 'status': 'regression', 'reason': 'slide missing'})
+    return results
+
+
+def _read_manifest(golden_dir):
+    path = os.path.join(golden_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update(fixtures, variants, golden_dir, renderer, jobs=None):
+    """Render every case and store the slides as the new golden images"""
+    rendered = render_all(fixtures, variants, golden_dir, renderer, jobs)
+    manifest = _read_manifest(golden_dir)
+    for key, paths in rendered.items():
+        case_dir = os.path.join(golden_dir, key)
+        # Keep the slide images only
+        for name in os.listdir(case_dir):
+            path = os.path.join(case_dir, name)
+            if name not in {os.path.basename(p) for p in paths}:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+        manifest[key] = {'renderer': renderer, 'slides': len(paths)}
+    with open(os.path.join(golden_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return rendered
+
+
+def check(fixtures, variants, golden_dir, renderer, diff_dir, thresholds, jobs=None):
+    """Render every case and compare it with its golden images; returns the per-slide results"""
+    manifest = _read_manifest(golden_dir)
+    with tempfile.TemporaryDirectory(prefix='visual-') as work_dir:
+        rendered = render_all(fixtures, variants, work_dir, renderer, jobs)
+        results = []
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            futures = []
+            for key, paths in rendered.items():
+                recorded = manifest.get(key)
+                if recorded is None:
+                    results.append({'case': key, 'slide': None, 'status': 'missing golden'})
+                    continue
+                if recorded['renderer'] != renderer:
+                    results.append({'case': key, 'slide': None, 'status': 'renderer mismatch',
+                                    'reason': f"golden images were rendered with {recorded['renderer']}"})
+                    continue
+                futures.append(pool.submit(compare_case, key, paths, golden_dir, diff_dir, thresholds))
+            for future in futures:
+                results.extend(future.result())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render converter output and compare it with golden images')
+    parser.add_argument('command', choices=('check', 'update'))
+    parser.add_argument('--fixture', action='append', dest='fixtures',
+                        help='Fixture deck; may be repeated (default: export_test.pptx)')
+    parser.add_argument('--variant', action='append', dest='variants', choices=sorted(VARIANTS),
+                        help='Converter variant; may be repeated (default: all)')
+    parser.add_argument('--golden', default=DEFAULT_GOLDEN_DIR, help='Golden image directory')
+    parser.add_argument('--renderer', choices=sorted(RENDERERS), default=default_renderer(),
+                        help='Slide renderer (default: browser if playwright is installed, else wireframe)')
+    parser.add_argument('--diffs', default='visual_diffs', help='Directory for diff images of regressions')
+    parser.add_argument('--tolerance', type=int, default=DEFAULT_TOLERANCE,
+                        help='Per-channel change a pixel may have without counting as changed')
+    parser.add_argument('--pixel-threshold', type=float, default=DEFAULT_PIXEL_THRESHOLD,
+                        help='Share of changed pixels that makes a slide a regression')
+    parser.add_argument('--hash-threshold', type=int, default=DEFAULT_HASH_THRESHOLD,
+                        help='Perceptual hash distance (bits) that makes a slide a regression')
+    parser.add_argument('--jobs', type=int, help='Parallel workers (default: one per CPU)')
+    parser.add_argument('--report', help='Write the per-slide results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.renderer == 'browser' and sync_playwright is None:
+        print("❌ The browser renderer needs playwright (pip install playwright && playwright install chromium)")
+        sys.exit(1)
+    fixtures = args.fixtures or DEFAULT_FIXTURES
+    variants = args.variants or sorted(VARIANTS)
+    for fixture in fixtures:
+        if not os.path.exists(fixture):
+            print(f"Error: fixture not found: {fixture}")
+            sys.exit(1)
+
+    start = time.perf_counter()
+    if args.command == 'update':
+        rendered = update(fixtures, variants, args.golden, args.renderer, args.jobs)
+        slides = sum(len(paths) for paths in rendered.values())
+        print(f"📸 Stored {slides} golden slides for {len(rendered)} cases in {args.golden} "
+              f"({args.renderer}, {time.perf_counter() - start:.1f}s)")
+        return
+
+    results = check(fixtures, variants, args.golden, args.renderer, args.diffs,
+                    (args.tolerance, args.pixel_threshold, args.hash_threshold), args.jobs)
+    for result in results:
+        icon = '✅' if result['status'] == 'ok' else '❌'
+        where = f"{result['case']} slide {result['slide']}" if result['slide'] else result['case']
+        if 'similarity' in result:
+            print(f"{icon} {where}: similarity {result['similarity']:.4f}, "
+                  f"hash distance {result['hash_distance']}" + (f" -> {result['diff']}" if 'diff' in result else ''))
+        else:
+            print(f"{icon} {where}: {result['status']}" + (f" ({result['reason']})" if 'reason' in result else ''))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    failures = [result for result in results if result['status'] != 'ok']
+    print(f"{'❌' if failures else '🎉'} {len(results) - len(failures)}/{len(results)} slides match "
+          f"({time.perf_counter() - start:.1f}s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Watch template directories and rebuild the artifacts of changed PPTX files
+
+Uses inotify on Linux and falls back to polling file stats elsewhere. Bursts
+of writes to the same file are debounced, and each changed deck is rebuilt on
+a worker pool through the build_template stage graph: its HTML previews and
+its JSON templates, and nothing else in the directory.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# A deck written in place is reported once closed, never while still being
+# written; one saved through a temporary file is reported when renamed in
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_template_source(path):
+    """True for .pptx files that are not Office lock or temp files"""
+    name = os.path.basename(path)
+    return name.lower().endswith('.pptx') and not name.startswith(('~$', '.'))
+
+
+class InotifyWatcher:
+    """Report changed template sources in a set of directories using inotify"""
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError(errno.ENOSYS, 'inotify is not available on this platform')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        for directory in directories:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'cannot watch {directory}')
+            self._dirs[wd] = directory
+
+    def poll(self, timeout):
+        """Wait up to ``timeout`` seconds and return the set of changed source paths"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: report everything in the watched directories
+                    for directory in self._dirs.values():
+                        changed.update(_scan(directory))
+                elif name and wd in self._dirs:
+                    path = os.path.join(self._dirs[wd], name)
+                    if is_template_source(path):
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher that compares (mtime, size) snapshots on each poll"""
+
+    def __init__(self, directories, interval=0.5):
+        self.directories = list(directories)
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for directory in self.directories:
+            for path in _scan(directory):
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._take_snapshot()
+        changed = {path for path, stat in snapshot.items() if self._snapshot.get(path) != stat}
+        changed.update(path for path in self._snapshot if path not in snapshot)
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def _scan(directory):
+    try:
+        return [entry.path for entry in os.scandir(directory)
+                if entry.is_file() and is_template_source(entry.path)]
+    except FileNotFoundError:
+        return []
+
+
+def create_watcher(directories, force_polling=False, interval=0.5):
+    if not force_polling:
+        try:
+            return InotifyWatcher(directories)
+        except OSError as e:
+            print(f"⚠️  inotify unavailable ({e}), falling back to polling every {interval}s")
+    return PollingWatcher(directories, interval=interval)
+
+
+class Debouncer:
+    """Release a path only after it has been quiet for ``delay`` seconds"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._pending = {}
+
+    def add(self, paths, now=None):
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            self._pending[path] = now
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        ready = [path for path, seen in self._pending.items() if now - seen >= self.delay]
+        for path in ready:
+            del self._pending[path]
+        return ready
+
+    def next_timeout(self, default, now=None):
+        if not self._pending:
+            return default
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(seen + self.delay - now for seen in self._pending.values()))
+
+
+def rebuild_template(pptx_path):
+    """
+    Rebuild every artifact derived from one PPTX file.
+
+    Runs in a worker process; returns (pptx_path, list of written paths).
+    """
+    from build_template import build_template
+
+    results = build_template(pptx_path)
+    results.pop('_metrics')
+    written = [path for result in results.values() if result['status'] == 'built'
+               for path in result['outputs']]
+    return pptx_path, written
+
+
+def watch(directories, debounce=0.3, workers=None, force_polling=False, poll_interval=0.5,
+          initial_build=False, rebuild=rebuild_template):
+    """Watch ``directories`` until interrupted, rebuilding changed templates"""
+    directories = [os.path.abspath(d) for d in directories]
+    watcher = create_watcher(directories, force_polling=force_polling, interval=poll_interval)
+    debouncer = Debouncer(debounce)
+    running = {}
+    rerun = set()
+
+    if initial_build:
+        for directory in directories:
+            debouncer.add(_scan(directory), now=0)
+
+    print(f"👀 Watching {len(directories)} template director{'y' if len(directories) == 1 else 'ies'} "
+          f"with {type(watcher).__name__}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                debouncer.add(watcher.poll(debouncer.next_timeout(0.1 if running else 1.0)))
+
+                for path in debouncer.due():
+                    if not os.path.exists(path):
+                        print(f"🗑️  {path} removed, nothing to rebuild")
+                        continue
+                    if path in running:
+                        # Rebuild again once the in-flight build finishes
+                        rerun.add(path)
+                        continue
+                    running[path] = (pool.submit(rebuild, path), time.perf_counter())
+
+                for path, (future, started) in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[path]
+                    try:
+                        _, written = future.result()
+                        print(f"✅ Rebuilt {os.path.basename(path)} in "
+                              f"{(time.perf_counter() - started) * 1000:.0f} ms ({len(written)} artifacts)")
+                    except Exception as e:
+                        print(f"❌ Rebuild failed for {path}: {e}")
+                    if path in rerun:
+                        rerun.discard(path)
+                        debouncer.add([path], now=0)
+        except KeyboardInterrupt:
+            print("\n👋 Stopping template watcher")
+        finally:
+            watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild template HTML/JSON when PPTX files change')
+    parser.add_argument('directories', nargs='*', default=['src/ppt'], help='Template directories to watch')
+    parser.add_argument('--debounce', type=float, default=0.3, help='Quiet period in seconds before rebuilding')
+    parser.add_argument('--workers', type=int, default=None, help='Rebuild worker processes')
+    parser.add_argument('--poll', action='store_true', help='Force the polling watcher')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--initial-build', action='store_true', help='Rebuild every template once on startup')
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"Error: template directory not found: {directory}")
+            sys.exit(1)
+
+    watch(args.directories, debounce=args.debounce, workers=args.workers, force_polling=args.poll,
+          poll_interval=args.poll_interval, initial_build=args.initial_build)
+
+
+if __name__ == "__main__":
+    main()